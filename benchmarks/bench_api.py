@@ -0,0 +1,92 @@
+"""End-to-end endpoint latency through the real FastAPI app, in-process.
+
+The LLM is replaced by a stub that answers immediately, and the vector store
+by an in-memory stand-in that returns synthetic documents, so the numbers
+measure the server's own overhead (routing, middleware, serialization,
+CourseDB work) rather than network or model latency.
+"""
+
+from __future__ import annotations
+
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.common import measure
+from benchmarks.synthetic import make_catalog, write_catalog
+
+
+class StubLLM:
+    """Drop-in for utils.llm.LiteLLM that returns a canned reply."""
+
+    def __init__(self, reply: str = "stub reply"):
+        self.reply = reply
+        self.calls = 0
+
+    def send_message(self, system_prompt: str, message: str) -> str:
+        self.calls += 1
+        return self.reply
+
+
+class StubVectorStore:
+    """Returns the same `n_results` synthetic documents for every query."""
+
+    def __init__(self, documents: List[str]):
+        self.documents = documents
+
+    def query_similar_documents(self, query_text, n_results, collection_name):
+        return [self.documents[:n_results]]
+
+    def collection_sizes(self):
+        return {"allData": len(self.documents)}
+
+
+def make_client(n_courses: int, workdir: Path, catalog_path: Optional[Path] = None):
+    """TestClient for the app on a synthetic `n_courses` catalog (or `catalog_path`),
+    with the vector store and LLM stubbed out."""
+    from fastapi.testclient import TestClient
+
+    from utils.api_server import create_app
+    from utils.course_db import CourseDB
+
+    if catalog_path is None:
+        catalog_path = write_catalog(n_courses, workdir / f"catalog_{n_courses}.json")
+    docs = [json.dumps(c, ensure_ascii=False) for c in make_catalog(20, seed=1)]
+    # a single benchmark client would trip a per-client rate limit set in the
+    # environment; the concurrency limits stay active
+    app = create_app(
+        course_db=CourseDB(catalog_path),
+        chroma=StubVectorStore(docs),
+        llm=StubLLM(),
+        admission={"rate_limit_per_minute": 0},
+    )
+    return TestClient(app)
+
+
+def run(n_courses: int = 10_000) -> Dict[str, Dict]:
+    try:
+        import fastapi  # noqa: F401
+        import httpx  # noqa: F401
+    except Exception as e:
+        return {"skipped": f"fastapi/httpx not available: {e}"}
+
+    with tempfile.TemporaryDirectory(prefix="bench_api_") as tmp:
+        client = make_client(n_courses, Path(tmp))
+        cases = {
+            "GET /health": lambda: client.get("/health"),
+            "GET /courses?limit=100&fields=code,name": lambda: client.get(
+                "/courses", params={"limit": 100, "fields": "code,name"}
+            ),
+            "GET /courses?limit=100": lambda: client.get("/courses", params={"limit": 100}),
+            "GET /courses/search?q=algorithms": lambda: client.get("/courses/search", params={"q": "algorithms"}),
+            "GET /courses/{code}": lambda: client.get("/courses/CS 100"),
+            "POST /llm (stub)": lambda: client.post("/llm", json={"message": "hello"}),
+            "POST /rag (stub)": lambda: client.post("/rag", json={"message": "data structures?"}),
+        }
+        results: Dict[str, Dict] = {"n_courses": {"value": n_courses}}
+        for name, fn in cases.items():
+            status = fn().status_code
+            results[name] = measure(fn, repeat=50)
+            results[name]["status"] = status
+    return results
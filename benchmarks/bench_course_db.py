@@ -0,0 +1,46 @@
+"""CourseDB micro-benchmarks on synthetic catalogs (10^2 .. 10^5 courses)."""
+
+from __future__ import annotations
+
+import random
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable
+
+from benchmarks.common import measure
+from benchmarks.synthetic import write_catalog
+from utils.course_db import CourseDB
+
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def bench_size(n: int, workdir: Path, seed: int = 0) -> Dict[str, Dict]:
+    path = write_catalog(n, workdir / f"catalog_{n}.json", seed=seed)
+    db = CourseDB(path)
+    codes = [c["code"] for c in db.get_all()]
+    rng = random.Random(seed)
+    sample = [rng.choice(codes) for _ in range(1000)]
+    # slow operations get fewer iterations on big catalogs
+    scale = max(1, 10_000 // n)
+
+    results = {
+        "load": measure(db.load, repeat=3 if n >= 10_000 else 10),
+        "get": measure(lambda: [db.get(c) for c in sample], repeat=5),
+        "query_codes": measure(lambda: db.query_codes("CS 2"), repeat=5, number=scale),
+        "search": measure(lambda: db.search("algorithms"), repeat=5, number=scale),
+        "list_projected_page": measure(
+            lambda: db.project(db.paginate(db.get_all(), None, 100)[0], "code,name"), repeat=5, number=scale
+        ),
+    }
+    # `get` timed a batch of 1000 lookups; report per lookup too
+    results["get"]["per_lookup_s"] = results["get"]["median_s"] / len(sample)
+    return results
+
+
+def run(sizes: Iterable[int] = DEFAULT_SIZES) -> Dict[str, Dict]:
+    out: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_course_db_") as tmp:
+        for n in sizes:
+            out[str(n)] = bench_size(n, Path(tmp))
+    return out
@@ -0,0 +1,233 @@
+"""Scraper page-parsing throughput: DOM-free extraction vs. BeautifulSoup.
+
+Compares, per page:
+- professor pages: course-code extraction (rmp_scraper.parse_prof_courses)
+  against the previous implementation (html.parser DOM + recursive walk);
+- search pages: teacher-record extraction (fetch_professors_via_json)
+  against the same DOM-based lookup.
+
+Runs on saved pages from a directory (professor pages as *.html, search
+pages as search*.html; by default the RMP test fixtures in
+tests/fixtures/rmp/), or with --synthetic on generated pages shaped like
+RMP's (markup plus a large __NEXT_DATA__ blob):
+
+    python -m benchmarks.bench_scraper_parse [--pages DIR | --synthetic [--n 20]]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from benchmarks.common import measure
+from scraper import rmp_scraper
+
+
+DEFAULT_PAGES = 20
+DEFAULT_PAGES_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "rmp"
+_WORDS = "great lecturer clear exams hard homework helpful office hours projects lots of reading fair grader".split()
+
+
+# --- previous implementation, kept as the baseline ---
+
+_LEGACY_COURSE_RE = re.compile(r"(?i)\bcs\s*([0-9]{2,3})")
+
+
+def _legacy_collect(text: str, out: set) -> None:
+    for m in _LEGACY_COURSE_RE.finditer(text):
+        out.add(m.group(1))
+
+
+def _legacy_walk_strings(node, out: List[str]) -> None:
+    if isinstance(node, dict):
+        for v in node.values():
+            _legacy_walk_strings(v, out)
+    elif isinstance(node, list):
+        for v in node:
+            _legacy_walk_strings(v, out)
+    elif isinstance(node, str):
+        out.append(node)
+
+
+def legacy_parse_prof_courses(html: str) -> List[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    codes: set = set()
+    _legacy_collect(html, codes)
+    script = soup.find("script", id="__NEXT_DATA__")
+    if script and script.string:
+        try:
+            strings: List[str] = []
+            _legacy_walk_strings(json.loads(script.string), strings)
+            for s in strings:
+                _legacy_collect(s, codes)
+        except Exception:
+            pass
+    return [f"CS {n}" for n in sorted(codes, key=int)]
+
+
+def _legacy_teacher_nodes(node, out: List[dict]) -> None:
+    if isinstance(node, dict):
+        if "legacyId" in node and "firstName" in node and "lastName" in node and "department" in node:
+            out.append(node)
+        for v in node.values():
+            _legacy_teacher_nodes(v, out)
+    elif isinstance(node, list):
+        for v in node:
+            _legacy_teacher_nodes(v, out)
+
+
+def legacy_teacher_ids(html: str) -> List[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    script = soup.find("script", id="__NEXT_DATA__")
+    nodes: List[dict] = []
+    _legacy_teacher_nodes(json.loads(script.string), nodes)
+    return [str(n["legacyId"]) for n in nodes if n.get("department") == "Computer Science" and n.get("numRatings")]
+
+
+# --- synthetic pages ---
+
+def _markup(rng: random.Random, blocks: int) -> str:
+    parts = []
+    for i in range(blocks):
+        text = " ".join(rng.choice(_WORDS) for _ in range(30))
+        parts.append(
+            f'<div class="Rating__StyledRating-sc-1rhvpxz-1 jcIQzP"><div class="RatingHeader__StyledClass">'
+            f'<span class="cl-{i}">CS{rng.choice((150, 210, 310, 460, 570))}</span></div>'
+            f'<div class="Comments__StyledComments">{text}</div><a href="/compare/{i}">Compare</a></div>'
+        )
+    return "".join(parts)
+
+
+def make_prof_page(rng: random.Random, ratings: int = 60) -> str:
+    data = {
+        "props": {
+            "pageProps": {
+                "teacher": {
+                    "legacyId": rng.randint(1000, 9_999_999),
+                    "ratings": {
+                        "edges": [
+                            {
+                                "node": {
+                                    "class": f"CS {rng.choice((108, 160, 250, 370, 496, 596))}",
+                                    "comment": " ".join(rng.choice(_WORDS) for _ in range(40)),
+                                    "ratingTags": "Tough grader--Lots of homework",
+                                    "thumbs": [{"up": rng.randint(0, 9)} for _ in range(3)],
+                                }
+                            }
+                            for _ in range(ratings)
+                        ]
+                    },
+                }
+            }
+        }
+    }
+    return (
+        "<!DOCTYPE html><html><head><style>" + ".x{color:red}" * 500 + "</style></head><body>"
+        + _markup(rng, ratings)
+        + f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script>'
+        + "</body></html>"
+    )
+
+
+def make_search_page(rng: random.Random, teachers: int = 200) -> str:
+    nodes = [
+        {
+            "legacyId": 100_000 + i,
+            "firstName": f"First{i}",
+            "lastName": f"Last{i}",
+            "department": "Computer Science" if i % 4 else "Mathematics",
+            "avgRating": round(rng.uniform(1, 5), 1),
+            "avgDifficulty": round(rng.uniform(1, 5), 1),
+            "numRatings": rng.randint(0, 80),
+            "wouldTakeAgainPercent": rng.randint(-1, 100),
+        }
+        for i in range(teachers)
+    ]
+    data = {"props": {"pageProps": {"search": {"teachers": {"edges": [{"node": n} for n in nodes]}}}}}
+    return (
+        "<!DOCTYPE html><html><body>" + _markup(rng, teachers // 2)
+        + f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script></body></html>'
+    )
+
+
+def load_pages(pages_dir: Optional[Path], n: int, seed: int = 0) -> Tuple[List[str], List[str]]:
+    """(professor pages, search pages) from `pages_dir`, or synthetic ones."""
+    if pages_dir is not None:
+        files = sorted(pages_dir.glob("*.html"))
+        search = [p.read_text(encoding="utf-8") for p in files if p.name.startswith("search")]
+        prof = [p.read_text(encoding="utf-8") for p in files if not p.name.startswith("search")]
+        return prof, search
+    rng = random.Random(seed)
+    return [make_prof_page(rng) for _ in range(n)], [make_search_page(rng) for _ in range(max(1, n // 10))]
+
+
+def _per_page(fn, pages: List[str], repeat: int) -> Dict[str, float]:
+    result = measure(lambda: [fn(p) for p in pages], repeat=repeat)
+    result["per_page_s"] = result["median_s"] / len(pages)
+    result["pages_per_s"] = len(pages) / result["median_s"] if result["median_s"] else None
+    return result
+
+
+def _quiet(fn):
+    def run(html):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn(html)
+
+    return run
+
+
+def run(pages_dir: Optional[Path] = None, n: int = DEFAULT_PAGES, repeat: int = 5) -> Dict[str, Dict]:
+    prof_pages, search_pages = load_pages(pages_dir, n)
+    out: Dict[str, Dict] = {}
+    if prof_pages:
+        agree = all(legacy_parse_prof_courses(p) == rmp_scraper.parse_prof_courses(p) for p in prof_pages)
+        legacy = _per_page(legacy_parse_prof_courses, prof_pages, repeat)
+        fast = _per_page(rmp_scraper.parse_prof_courses, prof_pages, repeat)
+        out["prof_courses"] = {
+            "pages": len(prof_pages),
+            "avg_page_kb": round(sum(map(len, prof_pages)) / len(prof_pages) / 1024, 1),
+            "outputs_match": agree,
+            "dom": legacy,
+            "dom_free": fast,
+            "speedup": legacy["median_s"] / fast["median_s"] if fast["median_s"] else None,
+        }
+    if search_pages:
+        fast_fn = _quiet(lambda p: [t["id"] for t in rmp_scraper.fetch_professors_via_json(p, None)])
+        agree = all(legacy_teacher_ids(p) == fast_fn(p) for p in search_pages)
+        legacy = _per_page(legacy_teacher_ids, search_pages, repeat)
+        fast = _per_page(fast_fn, search_pages, repeat)
+        out["search_teachers"] = {
+            "pages": len(search_pages),
+            "outputs_match": agree,
+            "dom": legacy,
+            "dom_free": fast,
+            "speedup": legacy["median_s"] / fast["median_s"] if fast["median_s"] else None,
+        }
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark scraper page parsing.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--pages", type=Path, default=DEFAULT_PAGES_DIR,
+        help="directory of saved pages (*.html; search pages named search*.html; default: %(default)s)",
+    )
+    source.add_argument("--synthetic", action="store_true", help="generate pages instead of reading saved ones")
+    parser.add_argument("--n", type=int, default=DEFAULT_PAGES, help="synthetic professor pages (with --synthetic)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(None if args.synthetic else args.pages, args.n, args.repeat), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
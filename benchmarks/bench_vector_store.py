@@ -0,0 +1,90 @@
+"""Vector store ingest and query throughput.
+
+The ChromaVectorStore part needs chromadb (and its default ONNX embedding
+model, downloaded on first use) and is reported as skipped when the store
+cannot be created. The NumpyVectorStore part always runs: it uses random
+unit vectors and a constant query embedding, so it measures the exact top-k
+search alone (the embedding cost is the same for both backends).
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable
+
+import numpy as np
+
+from benchmarks.common import measure
+from benchmarks.synthetic import make_catalog
+
+
+DEFAULT_SIZES = (100, 1_000)
+QUERIES = [
+    "prerequisites for data structures",
+    "machine learning course",
+    "introduction to programming",
+    "which classes cover databases",
+    "statistics and probability",
+]
+
+
+def bench_size(n: int, workdir: Path, seed: int = 0) -> Dict[str, Dict]:
+    from utils.chroma import ChromaVectorStore
+
+    store = ChromaVectorStore(db_path=str(workdir / f"chroma_{n}"))
+    documents = [json.dumps(c, ensure_ascii=False) for c in make_catalog(n, seed)]
+
+    started = time.perf_counter()
+    store.add_documents(documents, "allData")
+    ingest_s = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    query = measure(lambda: store.query_similar_documents(rng.choice(QUERIES), 5, "allData"), repeat=20)
+    return {
+        "ingest": {"documents": n, "total_s": ingest_s, "docs_per_s": n / ingest_s if ingest_s else None},
+        "query_k5": query,
+    }
+
+
+def bench_numpy_search(n: int, workdir: Path, dim: int = 384, seed: int = 0) -> Dict[str, Dict]:
+    """Open a memory-mapped index of `n` random vectors and time top-5 search."""
+    from utils.numpy_store import NumpyVectorStore
+
+    rng = np.random.default_rng(seed)
+    index_dir = workdir / f"index_{n}"
+    index_dir.mkdir()
+    matrix = rng.standard_normal((n, dim), dtype=np.float32)
+    np.save(index_dir / "embeddings.npy", matrix / np.linalg.norm(matrix, axis=1, keepdims=True))
+    chunks = [{"id": f"doc{i}", "parent_id": f"doc{i}", "section": None, "text": f"doc {i}"} for i in range(n)]
+    (index_dir / "chunks.json").write_text(json.dumps(chunks), encoding="utf-8")
+    (index_dir / "parents.json").write_text("{}", encoding="utf-8")
+
+    query = rng.standard_normal((1, dim), dtype=np.float32)
+    started = time.perf_counter()
+    store = NumpyVectorStore(index_dir, embedding_function=lambda texts: query)
+    open_s = time.perf_counter() - started
+    return {
+        "open": {"vectors": n, "total_s": open_s},
+        "query_k5": measure(lambda: store.query_chunks("q", 5, "allData"), repeat=200),
+    }
+
+
+def run(sizes: Iterable[int] = DEFAULT_SIZES) -> Dict[str, Dict]:
+    sizes = list(sizes)
+    out: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_numpy_") as tmp:
+        out["numpy"] = {str(n): bench_numpy_search(n, Path(tmp)) for n in sizes}
+    try:
+        import chromadb  # noqa: F401
+    except Exception as e:
+        out["chroma"] = {"skipped": f"chromadb not available: {e}"}
+        return out
+    out["chroma"] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_chroma_") as tmp:
+        for n in sizes:
+            out["chroma"][str(n)] = bench_size(n, Path(tmp))
+    return out
@@ -0,0 +1,234 @@
+"""Local stand-in for an OpenAI-compatible chat-completions server.
+
+Lets /llm and /rag be load-tested without spending real tokens. Point the API
+at it through the usual environment variables:
+
+    python -m benchmarks.fake_openai --port 8100 --latency lognormal:-0.5,0.4 --error-rate 0.02
+    LITELLM_API_BASE=http://127.0.0.1:8100/v1 LITELLM_MODEL_NAME=fake LITELLM_API_KEY=x \\
+        python -m uvicorn utils.api_server:app --port 8000
+
+Supported:
+- POST /v1/chat/completions (also /chat/completions), with "stream": true
+  answered as server-sent events, one chunk per token
+- GET  /v1/models
+- latency distributions: fixed:S, uniform:LO,HI, normal:MEAN,STD,
+  lognormal:MU,SIGMA (seconds; sampled per request, clamped at 0)
+- --token-delay: extra per-token delay while streaming
+- --error-rate / --error-status: fail that fraction of requests with one of
+  the given statuses; --hang-rate: never answer (exercises client timeouts)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn "kind:params" into a sampler returning seconds."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()] if params else []
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        (s,) = values or [0.0]
+        return lambda rng: s
+    if kind == "uniform":
+        lo, hi = values
+        return lambda rng: rng.uniform(lo, hi)
+    if kind == "normal":
+        mean, std = values
+        return lambda rng: max(0.0, rng.gauss(mean, std))
+    if kind == "lognormal":
+        mu, sigma = values
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+
+class FakeConfig:
+    def __init__(
+        self,
+        latency: str = "fixed:0.5",
+        token_delay: float = 0.01,
+        reply_tokens: int = 64,
+        error_rate: float = 0.0,
+        error_statuses: Optional[List[int]] = None,
+        hang_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = parse_latency(latency)
+        self.token_delay = token_delay
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [500]
+        self.hang_rate = hang_rate
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self):
+        """Return (latency_s, error_status_or_None, hang) for one request."""
+        with self._lock:
+            self.requests += 1
+            r = self.rng.random()
+            hang = r < self.hang_rate
+            error = None
+            if not hang and r < self.hang_rate + self.error_rate:
+                error = self.rng.choice(self.error_statuses)
+            return self.latency(self.rng), error, hang
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def make_handler(config: FakeConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # keep the console quiet under load
+            return
+
+        def _json(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if status in (429, 503):
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") in ("/v1/models", "/models"):
+                self._json(200, {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "local"}]})
+            else:
+                self._json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                self._json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._json(400, {"error": {"message": "invalid JSON"}})
+                return
+
+            latency, error, hang = config.draw()
+            if hang:
+                time.sleep(3600)
+                return
+            time.sleep(latency)
+            if error is not None:
+                self._json(error, {"error": {"message": f"injected error {error}", "type": "fake_error"}})
+                return
+
+            prompt = "".join(str(m.get("content", "")) for m in payload.get("messages", []))
+            words = ["token"] * config.reply_tokens
+            model = payload.get("model", "fake")
+            completion_id = "chatcmpl-" + uuid.uuid4().hex[:12]
+            usage = {
+                "prompt_tokens": _approx_tokens(prompt),
+                "completion_tokens": config.reply_tokens,
+                "total_tokens": _approx_tokens(prompt) + config.reply_tokens,
+            }
+            if payload.get("stream"):
+                self._stream(completion_id, model, words, usage)
+                return
+            self._json(
+                200,
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}
+                    ],
+                    "usage": usage,
+                },
+            )
+
+        def _stream(self, completion_id: str, model: str, words: List[str], usage: dict) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def event(delta: dict, finish: Optional[str] = None, extra: Optional[dict] = None) -> None:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                }
+                if extra:
+                    chunk.update(extra)
+                self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+            event({"role": "assistant"})
+            for i, word in enumerate(words):
+                time.sleep(config.token_delay)
+                event({"content": word if i == 0 else " " + word})
+            event({}, finish="stop", extra={"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(host: str, port: int, config: FakeConfig) -> ThreadingHTTPServer:
+    """Start the server on a daemon thread and return it (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="fixed:0.5", help="latency distribution, e.g. uniform:0.2,1.5")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds per streamed token")
+    parser.add_argument("--reply-tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, nargs="+", default=[500])
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = FakeConfig(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate,
+        error_statuses=args.error_status,
+        hang_rate=args.hang_rate,
+        seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f"fake OpenAI server on http://{args.host}:{args.port}/v1 (latency {args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+"""Closed-loop load generator for the AztecPlanner API.
+
+Each of `--concurrency` workers sends requests back-to-back (keep-alive
+connection per worker) for `--duration` seconds, picking endpoints according
+to `--mix`. Reports throughput, error counts and p50/p95/p99 latency overall
+and per endpoint.
+
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --concurrency 16 --duration 30
+    python -m benchmarks.loadgen --ramp 1 2 4 8 16 32 --duration 15 --mix rag=1
+    python -m benchmarks.loadgen --concurrency 8 --json out.json
+
+`--ramp` runs one step per concurrency level and marks the saturation point:
+the first step where throughput grows by less than 10% over the previous one.
+Pair with benchmarks.fake_openai to load-test /llm and /rag without a real
+model. If the server's per-client rate limit is on (RATE_LIMIT_PER_MINUTE), it
+applies to the load generator as one client; leave it off when measuring
+capacity.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.common import percentile
+
+
+QUESTIONS = [
+    "What are some classes that cover data structures?",
+    "What are the prerequisites for CS 310?",
+    "Which professor is best for CS 160?",
+    "Recommend an upper division machine learning course",
+    "What courses are typically offered in the spring?",
+]
+
+# name -> (method, path, query, json body factory)
+ENDPOINTS = {
+    "health": ("GET", "/health", None, None),
+    "courses": ("GET", "/courses", {"limit": 100, "fields": "code,name"}, None),
+    "search": ("GET", "/courses/search", {"q": "data"}, None),
+    "course": ("GET", "/courses/CS%20210", None, None),
+    "similar": ("GET", "/courses/CS%20460/similar", {"k": 5}, None),
+    "llm": ("POST", "/llm", None, lambda rng: {"message": rng.choice(QUESTIONS)}),
+    "rag": ("POST", "/rag", None, lambda rng: {"message": rng.choice(QUESTIONS)}),
+}
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {sorted(ENDPOINTS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, latency: float, status: str) -> None:
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(latency)
+            counts = self.statuses.setdefault(endpoint, {})
+            counts[status] = counts.get(status, 0) + 1
+
+
+def _worker(base: str, mix, deadline: float, recorder: Recorder, timeout: float, seed: int) -> None:
+    parts = urlsplit(base)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    conn = conn_cls(parts.hostname, parts.port, timeout=timeout)
+    rng = random.Random(seed)
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, query, body_fn = ENDPOINTS[name]
+        url = parts.path.rstrip("/") + path + ("?" + urlencode(query) if query else "")
+        body = json.dumps(body_fn(rng)).encode("utf-8") if body_fn else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        started = time.perf_counter()
+        try:
+            conn.request(method, url, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = str(resp.status)
+        except Exception as e:
+            status = type(e).__name__
+            conn.close()
+            conn = conn_cls(parts.hostname, parts.port, timeout=timeout)
+        recorder.add(name, time.perf_counter() - started, status)
+    conn.close()
+
+
+def _summary(latencies: List[float], statuses: Dict[str, int], elapsed: float) -> Dict:
+    ordered = sorted(latencies)
+    ok = sum(n for s, n in statuses.items() if s.startswith("2"))
+    return {
+        "requests": len(ordered),
+        "ok": ok,
+        "errors": len(ordered) - ok,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": len(ordered) / elapsed if elapsed else 0.0,
+        "goodput_rps": ok / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1e3,
+        "p95_ms": percentile(ordered, 95) * 1e3,
+        "p99_ms": percentile(ordered, 99) * 1e3,
+        "max_ms": (ordered[-1] * 1e3) if ordered else 0.0,
+    }
+
+
+def run_load(base: str, concurrency: int, duration: float, mix, timeout: float = 60.0, seed: int = 0) -> Dict:
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(base, mix, deadline, recorder, timeout, seed + i), daemon=True)
+        for i in range(concurrency)
+    ]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    all_latencies = [l for ls in recorder.latencies.values() for l in ls]
+    all_statuses: Dict[str, int] = {}
+    for counts in recorder.statuses.values():
+        for s, n in counts.items():
+            all_statuses[s] = all_statuses.get(s, 0) + n
+    return {
+        "concurrency": concurrency,
+        "duration_s": elapsed,
+        "overall": _summary(all_latencies, all_statuses, elapsed),
+        "endpoints": {
+            name: _summary(recorder.latencies[name], recorder.statuses[name], elapsed) for name in sorted(recorder.latencies)
+        },
+    }
+
+
+def find_saturation(steps: List[Dict], min_gain: float = 0.10) -> Optional[int]:
+    """Concurrency of the first step whose goodput grew < `min_gain` over the previous step."""
+    for prev, cur in zip(steps, steps[1:]):
+        before = prev["overall"]["goodput_rps"]
+        if before and cur["overall"]["goodput_rps"] < before * (1 + min_gain):
+            return prev["concurrency"]
+    return None
+
+
+def _print_step(result: Dict) -> None:
+    o = result["overall"]
+    print(
+        f"c={result['concurrency']:>4}  rps={o['throughput_rps']:8.1f}  ok_rps={o['goodput_rps']:8.1f}  "
+        f"p50={o['p50_ms']:8.1f}ms  p95={o['p95_ms']:8.1f}ms  p99={o['p99_ms']:8.1f}ms  errors={o['errors']}"
+    )
+    for name, s in result["endpoints"].items():
+        print(f"      {name:<8} n={s['requests']:<6} p50={s['p50_ms']:.1f}ms p99={s['p99_ms']:.1f}ms {s['statuses']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ramp", type=int, nargs="+", help="run one step per concurrency level")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    parser.add_argument("--mix", default="rag=1,llm=1,search=2,courses=1", help="endpoint weights")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    levels = args.ramp or [args.concurrency]
+    steps = []
+    for level in levels:
+        result = run_load(args.url, level, args.duration, mix, args.timeout)
+        steps.append(result)
+        _print_step(result)
+
+    report: Dict = {"url": args.url, "mix": dict(mix), "steps": steps}
+    if len(steps) > 1:
+        report["saturation_concurrency"] = find_saturation(steps)
+        print(f"saturation at concurrency ~{report['saturation_concurrency']}" if report["saturation_concurrency"] else
+              "no saturation observed in this range")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
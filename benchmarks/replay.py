@@ -0,0 +1,192 @@
+"""Replay captured traffic (see utils/capture.py) and diff latency profiles.
+
+    # against a running server (stub the LLM there with benchmarks.fake_openai)
+    python -m benchmarks.replay captures/ --target http://127.0.0.1:8000 --speed 1
+
+    # in-process app with the LLM stubbed, as fast as the arrival schedule allows
+    python -m benchmarks.replay captures/ --in-process --speed 10 --json diff.json
+    python -m benchmarks.replay captures/ --in-process --catalog utils/data/sdsu_cs_courses.json
+
+--in-process is not production-shaped: the app runs on a synthetic
+1,000-course catalog (or the real one given with --catalog), and the vector
+store and LLM are always stubs (benchmarks/bench_api.py). Its latencies
+measure the server's own overhead and CourseDB work, not retrieval or
+generation, so /rag and /chroma/query replays hit the same canned documents
+and are comparable only with each other. Replay against --target for
+end-to-end numbers.
+
+Requests are re-issued on the captured schedule, with inter-arrival gaps
+divided by --speed (0 sends everything at once, bounded by --max-inflight).
+Afterwards the captured and replayed latency distributions are compared
+per route (p50/p95/p99 and the relative change), together with the mean
+captured per-stage timings for context.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.common import percentile
+from utils.capture import read_captures
+
+
+def _profile(latencies_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies_ms)
+    return {
+        "n": len(ordered),
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+    }
+
+
+def _http_sender(target: str, timeout: float) -> Callable[[Dict], int]:
+    import requests
+
+    session = requests.Session()
+    base = target.rstrip("/")
+
+    def send(record: Dict) -> int:
+        url = base + record["path"] + ("?" + record["query"] if record.get("query") else "")
+        body = record.get("body")
+        resp = session.request(
+            record.get("method", "GET"),
+            url,
+            json=body if isinstance(body, (dict, list)) else None,
+            data=body if isinstance(body, str) else None,
+            timeout=timeout,
+        )
+        return resp.status_code
+
+    return send
+
+
+def _in_process_sender(catalog: Optional[Path] = None) -> Callable[[Dict], int]:
+    import tempfile
+
+    from benchmarks.bench_api import make_client
+
+    client = make_client(1_000, Path(tempfile.mkdtemp(prefix="replay_")), catalog_path=catalog)
+
+    def send(record: Dict) -> int:
+        body = record.get("body")
+        resp = client.request(
+            record.get("method", "GET"),
+            record["path"] + ("?" + record["query"] if record.get("query") else ""),
+            json=body if isinstance(body, (dict, list)) else None,
+            content=body if isinstance(body, str) else None,
+        )
+        return resp.status_code
+
+    return send
+
+
+def replay(records: List[Dict], send: Callable[[Dict], int], speed: float, max_inflight: int) -> List[Dict]:
+    """Issue `records` on their captured schedule; return per-request results."""
+    results: List[Dict] = []
+    lock = threading.Lock()
+
+    def one(record: Dict) -> None:
+        started = time.perf_counter()
+        try:
+            status = send(record)
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = (time.perf_counter() - started) * 1e3
+        with lock:
+            results.append({"path": record["path"], "status": status, "latency_ms": elapsed})
+
+    if not records:
+        return results
+    t0 = records[0].get("ts", 0.0)
+    wall0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        for record in records:
+            if speed > 0:
+                due = (record.get("ts", t0) - t0) / speed
+                delay = due - (time.monotonic() - wall0)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(one, record)
+    return results
+
+
+def diff(captured: List[Dict], replayed: List[Dict]) -> Dict[str, Dict]:
+    """Per-route latency profiles for the capture and the replay, and their ratio."""
+    report: Dict[str, Dict] = {}
+    for path in sorted({r["path"] for r in captured}):
+        before = [r["latency_ms"] for r in captured if r["path"] == path and "latency_ms" in r]
+        after = [r["latency_ms"] for r in replayed if r["path"] == path]
+        stage_totals: Dict[str, List[float]] = {}
+        for r in captured:
+            if r["path"] == path:
+                for stage, ms in (r.get("stages") or {}).items():
+                    stage_totals.setdefault(stage, []).append(ms)
+        entry = {
+            "captured": _profile(before),
+            "replayed": _profile(after),
+            "captured_stage_mean_ms": {k: sum(v) / len(v) for k, v in sorted(stage_totals.items())},
+            "replay_statuses": {},
+        }
+        for r in replayed:
+            if r["path"] == path:
+                key = str(r["status"])
+                entry["replay_statuses"][key] = entry["replay_statuses"].get(key, 0) + 1
+        for q in ("p50_ms", "p95_ms", "p99_ms"):
+            base = entry["captured"][q]
+            entry[f"{q[:3]}_change"] = (entry["replayed"][q] / base - 1.0) if base else None
+        report[path] = entry
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="capture files or directories")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--target", help="base URL of the server to replay against")
+    target.add_argument(
+        "--in-process", action="store_true", help="replay against an in-process app (stub vector store and LLM)"
+    )
+    parser.add_argument("--catalog", type=Path, help="with --in-process: course catalog JSON instead of a synthetic one")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor (0 = no pacing)")
+    parser.add_argument("--max-inflight", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--limit", type=int, help="replay only the first N records")
+    parser.add_argument("--json", dest="json_out", help="write the diff report to this file")
+    args = parser.parse_args(argv)
+
+    records = list(read_captures(args.captures))
+    if args.limit:
+        records = records[: args.limit]
+    if not records:
+        print("no captured records found", file=sys.stderr)
+        return 1
+
+    send = _in_process_sender(args.catalog) if args.in_process else _http_sender(args.target, args.timeout)
+    print(f"replaying {len(records)} requests at {args.speed}x ...", file=sys.stderr)
+    replayed = replay(records, send, args.speed, args.max_inflight)
+    report = diff(records, replayed)
+
+    for path, entry in report.items():
+        c, r = entry["captured"], entry["replayed"]
+        change = entry["p50_change"]
+        change_str = f"{change * 100:+.0f}%" if change is not None else "n/a"
+        print(
+            f"{path:<16} n={r['n']:<5} p50 {c['p50_ms']:8.1f} -> {r['p50_ms']:8.1f} ms ({change_str})  "
+            f"p99 {c['p99_ms']:8.1f} -> {r['p99_ms']:8.1f} ms  {entry['replay_statuses']}"
+        )
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,392 @@
+"""Offline retrieval quality vs. cost evaluation.
+
+Builds a labeled question set from the course catalog ("What are the
+prerequisites for CS 160?" should retrieve CS 160, and so on), indexes the
+catalog plus the professor records (as distractors, the way /rag sees them)
+under several configurations, and builds each question's context the way
+/rag does. With the "chunks" granularity that is RAG_N_CHUNKS chunk hits,
+grouped per parent record (group_by_parent, at most k parents) and rendered
+with format_context. Whole-document granularities take the top k documents.
+For every k (RAG_N_RESULTS on the server) it reports:
+
+- recall@k   fraction of questions whose target course is among the context's parents
+- MRR        mean reciprocal rank of the target course (0 if not retrieved)
+- context_tokens     mean tokens of the context /rag would put in the prompt
+- tokens_per_answer  context tokens spent per question whose target was retrieved
+- latency    p50/p95 retrieval time per query
+
+Configurations sweep k, the chunk budget, document granularity, backend and
+embedder:
+
+    python -m benchmarks.retrieval_eval                        # all available backends
+    python -m benchmarks.retrieval_eval --backend bm25 --k 1 3 5 10 --n-chunks 5 10 20
+    python -m benchmarks.retrieval_eval --backend numpy --embedder default --embedder onnx,QUANTIZE=int8
+    python -m benchmarks.retrieval_eval --json eval.json --write-questions questions.json
+
+Backends: "bm25" (dependency-free lexical baseline, always available),
+"numpy" (exact cosine over the shared embedder, like VECTOR_BACKEND=numpy)
+and "chroma" (chromadb in memory with the shared embedder). The embedding
+backends run once per `--embedder` spec: a backend name followed by
+EMBEDDING_* overrides, e.g. "sentence-transformers,MODEL=all-mpnet-base-v2,
+MAX_SEQ_LENGTH=128". Without `--embedder` the EMBEDDING_* environment is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from benchmarks.common import percentile
+from utils.chunking import chunk_record, format_context, group_by_parent, parent_id
+
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "utils" / "data"
+COURSES_PATH = DATA_DIR / "sdsu_cs_courses.json"
+PROFESSORS_PATH = DATA_DIR / "sdsu_cs_professors_llm.json"
+# chunk hits /rag retrieves before grouping them per parent
+RAG_N_CHUNKS = int(os.getenv("RAG_N_CHUNKS", "10"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def approx_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English/JSON)."""
+    return max(1, len(text) // 4)
+
+
+# --- corpus granularity ---
+# Each function maps (courses, professors) to [(doc_id, parent_id, text)].
+# parent_id is chunking.parent_id() of the record a document belongs to: the
+# course code, or "prof:<id>" for the distractors.
+
+def docs_json(courses: List[Dict], professors: List[Dict]) -> List[Tuple[str, str, str]]:
+    """One compact JSON blob per record - what populate_from_dir used to index."""
+    docs = [(parent_id(c), parent_id(c), json.dumps(c, ensure_ascii=False)) for c in courses]
+    docs += [(parent_id(p), parent_id(p), p.get("text") or json.dumps(p, ensure_ascii=False)) for p in professors]
+    return docs
+
+
+def docs_text(courses: List[Dict], professors: List[Dict]) -> List[Tuple[str, str, str]]:
+    """One short natural-language summary per course (no professor arrays)."""
+    docs = []
+    for c in courses:
+        parts = [f"{c.get('code')}: {c.get('name')}."]
+        if c.get("prereqs"):
+            parts.append(f"Prerequisites: {c['prereqs']}.")
+        if c.get("description"):
+            parts.append(c["description"])
+        docs.append((parent_id(c), parent_id(c), " ".join(parts)))
+    docs += [(parent_id(p), parent_id(p), p.get("text") or "") for p in professors]
+    return docs
+
+
+def docs_chunks(courses: List[Dict], professors: List[Dict]) -> List[Tuple[str, str, str]]:
+    """Field-aware chunks (utils/chunking.py) - what populate_from_dir indexes now."""
+    docs = []
+    for record in list(courses) + list(professors):
+        docs += [(c["id"], c["parent_id"], c["text"]) for c in chunk_record(record)]
+    return docs
+
+
+GRANULARITIES: Dict[str, Callable] = {"json": docs_json, "text": docs_text, "chunks": docs_chunks}
+# granularities whose hits are grouped per parent, like /rag does with query_chunks
+CHUNKED = frozenset({"chunks"})
+
+
+# --- labeled questions ---
+
+def build_questions(courses: List[Dict], seed: int = 0, per_course: int = 2) -> List[Dict]:
+    """Generate (question, target course code) pairs from the catalog."""
+    rng = random.Random(seed)
+    questions = []
+    for c in courses:
+        code, name = c.get("code"), c.get("name")
+        if not code:
+            continue
+        templates = [
+            f"What are the prerequisites for {code}?",
+            f"Tell me about {code}",
+        ]
+        if name:
+            templates.append(f"Which class is {name}?")
+            templates.append(f"I want to take a course on {name.lower()}")
+        desc_words = (c.get("description") or "").split()
+        if len(desc_words) > 8:
+            start = rng.randint(0, max(0, len(desc_words) - 8))
+            templates.append("Which course covers " + " ".join(desc_words[start:start + 8]).rstrip(".,;") + "?")
+        for q in rng.sample(templates, min(per_course, len(templates))):
+            questions.append({"question": q, "target": code})
+    return questions
+
+
+# --- backends ---
+
+class BM25Retriever:
+    """Okapi BM25 over lowercase alphanumeric tokens."""
+
+    name = "bm25"
+    embeds = False
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return _TOKEN_RE.findall(text.lower())
+
+    def index(self, docs: Sequence[Tuple[str, str]]) -> None:
+        self.ids = [d[0] for d in docs]
+        self.tfs = [Counter(self._tokens(d[1])) for d in docs]
+        self.lengths = [sum(tf.values()) for tf in self.tfs]
+        self.avg_len = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        df: Counter = Counter()
+        for tf in self.tfs:
+            df.update(tf.keys())
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def search(self, query: str, k: int) -> List[str]:
+        q = [t for t in self._tokens(query) if t in self.idf]
+        scores = []
+        for i, tf in enumerate(self.tfs):
+            s = 0.0
+            for t in q:
+                f = tf.get(t)
+                if f:
+                    denom = f + self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_len or 1))
+                    s += self.idf[t] * f * (self.k1 + 1) / denom
+            if s > 0:
+                scores.append((s, i))
+        scores.sort(reverse=True)
+        return [self.ids[i] for _, i in scores[:k]]
+
+
+class NumpyRetriever:
+    """Exact cosine search over an embedder's vectors, as NumpyVectorStore does."""
+
+    name = "numpy"
+    embeds = True
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+
+    def index(self, docs: Sequence[Tuple[str, str]]) -> None:
+        self.ids = [d[0] for d in docs]
+        self.matrix = self.embedder.embed_documents([d[1] for d in docs])
+
+    def search(self, query: str, k: int) -> List[str]:
+        import numpy as np
+
+        scores = self.matrix @ self.embedder.embed_query(query)
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [self.ids[i] for i in top]
+
+
+class ChromaRetriever:
+    """In-memory chromadb collection embedding with the given embedder, as ChromaVectorStore does."""
+
+    name = "chroma"
+    embeds = True
+
+    def __init__(self, embedder):
+        import chromadb
+
+        self.client = chromadb.EphemeralClient()
+        self.embedder = embedder
+        self._n = 0
+
+    def index(self, docs: Sequence[Tuple[str, str]]) -> None:
+        self._n += 1
+        self.collection = self.client.create_collection(name=f"eval_{self._n}", metadata={"hnsw:space": "cosine"})
+        batch = 256
+        for i in range(0, len(docs), batch):
+            part = docs[i:i + batch]
+            self.collection.add(
+                ids=[d[0] for d in part],
+                documents=[d[1] for d in part],
+                embeddings=self.embedder.embed_documents([d[1] for d in part]).tolist(),
+            )
+
+    def search(self, query: str, k: int) -> List[str]:
+        res = self.collection.query(query_embeddings=[self.embedder.embed_query(query).tolist()], n_results=k)
+        return res["ids"][0]
+
+
+def available_backends() -> Dict[str, Callable[..., object]]:
+    backends: Dict[str, Callable[..., object]] = {"bm25": BM25Retriever}
+    try:
+        import numpy  # noqa: F401
+
+        backends["numpy"] = NumpyRetriever
+    except Exception:
+        pass
+    try:
+        import chromadb  # noqa: F401
+
+        backends["chroma"] = ChromaRetriever
+    except Exception:
+        pass
+    return backends
+
+
+def parse_embedder(spec: str) -> Dict[str, str]:
+    """EMBEDDING_* settings of an --embedder spec, on top of the current environment.
+
+    "onnx,QUANTIZE=int8" -> {..., "EMBEDDING_BACKEND": "onnx", "EMBEDDING_QUANTIZE": "int8"}
+    """
+    env = {k: v for k, v in os.environ.items() if k.startswith("EMBEDDING_")}
+    for i, part in enumerate(p.strip() for p in spec.split(",")):
+        if not part:
+            continue
+        if "=" not in part:
+            if i:
+                raise ValueError(f"expected KEY=VALUE in --embedder {spec!r}, got {part!r}")
+            env["EMBEDDING_BACKEND"] = part
+            continue
+        key, value = part.split("=", 1)
+        key = key.strip().upper()
+        env[key if key.startswith("EMBEDDING_") else f"EMBEDDING_{key}"] = value.strip()
+    return env
+
+
+# --- evaluation ---
+
+def evaluate(
+    retriever, docs, questions: List[Dict], ks: Sequence[int], chunked: bool = False, n_chunks: int = RAG_N_CHUNKS
+) -> Dict[str, Dict]:
+    """Index `docs` with `retriever` and score every k in `ks` from one query per question.
+
+    With `chunked`, each question retrieves `n_chunks` hits and the context
+    for k is their first k parents with the matched sections, as /rag builds
+    it. Otherwise the context is the top k documents.
+    """
+    started = time.perf_counter()
+    retriever.index([(doc_id, text) for doc_id, _, text in docs])
+    index_s = time.perf_counter() - started
+
+    by_id = {doc_id: {"id": doc_id, "parent_id": p, "text": text} for doc_id, p, text in docs}
+    fetch = n_chunks if chunked else max(ks)
+
+    latencies: List[float] = []
+    ranked: List[Tuple[List[Dict], str]] = []
+    for q in questions:
+        t0 = time.perf_counter()
+        ids = retriever.search(q["question"], fetch)
+        latencies.append(time.perf_counter() - t0)
+        ranked.append(([by_id[i] for i in ids], parent_id({"code": q["target"]})))
+
+    latencies.sort()
+    out: Dict[str, Dict] = {}
+    for k in ks:
+        hits, rr, ctx = 0, 0.0, 0
+        for found, target in ranked:
+            groups = group_by_parent(found if chunked else found[:k], limit=k)
+            ctx += approx_tokens("\n\n".join(format_context(groups)))
+            parents = [g["parent_id"] for g in groups]
+            if target in parents:
+                hits += 1
+                rr += 1.0 / (parents.index(target) + 1)
+        n = len(ranked) or 1
+        out[str(k)] = {
+            "recall": hits / n,
+            "mrr": rr / n,
+            "context_tokens": ctx / n,
+            "tokens_per_answer": ctx / hits if hits else None,
+            "latency_p50_ms": percentile(latencies, 50) * 1e3,
+            "latency_p95_ms": percentile(latencies, 95) * 1e3,
+            "index_s": index_s,
+            "documents": len(docs),
+        }
+    return out
+
+
+def load_corpus(courses_path: Path = COURSES_PATH, professors_path: Path = PROFESSORS_PATH):
+    courses = json.loads(courses_path.read_text(encoding="utf-8"))
+    professors = json.loads(professors_path.read_text(encoding="utf-8")) if professors_path.exists() else []
+    return courses, professors
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", action="append", help="backend(s) to evaluate (default: all available)")
+    parser.add_argument("--embedder", action="append", metavar="SPEC",
+                        help="embedder config for numpy/chroma, e.g. onnx,QUANTIZE=int8 (default: EMBEDDING_* env)")
+    parser.add_argument("--granularity", action="append", choices=sorted(GRANULARITIES))
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10], help="parents in the context (RAG_N_RESULTS)")
+    parser.add_argument("--n-chunks", type=int, nargs="+", default=[RAG_N_CHUNKS],
+                        help="chunk hits retrieved per question for the chunks granularity (RAG_N_CHUNKS)")
+    parser.add_argument("--courses", type=Path, default=COURSES_PATH)
+    parser.add_argument("--professors", type=Path, default=PROFESSORS_PATH)
+    parser.add_argument("--questions", type=Path, help="use a saved question set instead of generating one")
+    parser.add_argument("--write-questions", type=Path, help="save the generated question set here")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_out", type=Path, help="write results here")
+    args = parser.parse_args(argv)
+
+    courses, professors = load_corpus(args.courses, args.professors)
+    if args.questions:
+        questions = json.loads(args.questions.read_text(encoding="utf-8"))
+    else:
+        questions = build_questions(courses, seed=args.seed)
+    if args.write_questions:
+        args.write_questions.write_text(json.dumps(questions, indent=2), encoding="utf-8")
+    try:
+        embedders = [(spec, parse_embedder(spec)) for spec in args.embedder or [""]]
+    except ValueError as e:
+        parser.error(str(e))
+
+    backends = available_backends()
+    selected = args.backend or sorted(backends)
+    results: Dict[str, Dict] = {}
+    print(f"{len(questions)} questions, {len(courses)} courses, {len(professors)} professor records")
+    print(
+        f"{'backend':<24} {'granularity':<11} {'chunks':>6} {'k':>3} {'recall':>7} {'MRR':>6} "
+        f"{'ctx_tok':>8} {'tok/ans':>8} {'p50_ms':>8} {'p95_ms':>8}"
+    )
+    for backend in selected:
+        if backend not in backends:
+            print(f"{backend:<24} unavailable (missing dependency)")
+            continue
+        factory = backends[backend]
+        for spec, env in embedders if factory.embeds else [(None, None)]:
+            label = backend
+            if spec is not None:
+                label = f"{backend}[{spec or env.get('EMBEDDING_BACKEND', 'default')}]"
+                try:
+                    from utils.embeddings import embedder_from_env
+
+                    retriever = factory(embedder_from_env(env))
+                except Exception as e:
+                    print(f"{label:<24} unavailable ({e})")
+                    continue
+            else:
+                retriever = factory()
+            for gran in args.granularity or sorted(GRANULARITIES):
+                docs = GRANULARITIES[gran](courses, professors)
+                chunked = gran in CHUNKED
+                for n_chunks in args.n_chunks if chunked else [None]:
+                    scores = evaluate(retriever, docs, questions, args.k, chunked, n_chunks or RAG_N_CHUNKS)
+                    results[f"{label}/{gran}" + (f"/{n_chunks}" if chunked else "")] = {
+                        "embedding": env, "n_chunks": n_chunks, "k": scores,
+                    }
+                    for k, s in scores.items():
+                        per_answer = f"{s['tokens_per_answer']:8.0f}" if s["tokens_per_answer"] is not None else f"{'-':>8}"
+                        print(
+                            f"{label:<24} {gran:<11} {n_chunks or '-':>6} {k:>3} {s['recall']:7.3f} {s['mrr']:6.3f} "
+                            f"{s['context_tokens']:8.0f} {per_answer} {s['latency_p50_ms']:8.2f} {s['latency_p95_ms']:8.2f}"
+                        )
+    if args.json_out:
+        args.json_out.write_text(json.dumps({"questions": len(questions), "results": results}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
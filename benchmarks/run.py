@@ -0,0 +1,94 @@
+"""Run the offline benchmark suite and write a machine-readable results file.
+
+Usage (from the repo root):
+
+    python -m benchmarks.run                       # everything, default sizes
+    python -m benchmarks.run --suite course_db --sizes 100 1000
+    python -m benchmarks.run --quick               # smaller sizes, for CI / pre-deploy
+    python -m benchmarks.run --compare benchmarks/results/<old>.json
+
+Results are written to benchmarks/results/<git-rev>-<unix-time>.json unless
+--out is given. --compare prints every median that got slower by more than
+--threshold (default 20%) and exits non-zero if any did.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from benchmarks import bench_api, bench_course_db, bench_scraper_parse, bench_vector_store
+from benchmarks.common import environment, write_results
+
+
+SUITES = ("course_db", "vector_store", "api", "scraper_parse")
+
+
+def run_suites(suites: List[str], sizes: List[int] | None, quick: bool) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"environment": environment(), "suites": {}}
+    for name in suites:
+        print(f"running {name} ...", file=sys.stderr)
+        if name == "course_db":
+            default = (100, 1_000, 10_000) if quick else bench_course_db.DEFAULT_SIZES
+            results["suites"][name] = bench_course_db.run(sizes or default)
+        elif name == "vector_store":
+            default = (100,) if quick else bench_vector_store.DEFAULT_SIZES
+            results["suites"][name] = bench_vector_store.run(sizes or default)
+        elif name == "api":
+            results["suites"][name] = bench_api.run(1_000 if quick else 10_000)
+        elif name == "scraper_parse":
+            results["suites"][name] = bench_scraper_parse.run(n=5 if quick else bench_scraper_parse.DEFAULT_PAGES)
+    return results
+
+
+def _medians(node: Any, path: Tuple[str, ...] = ()) -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        if "median_s" in node:
+            yield "/".join(path), node["median_s"]
+            return
+        for key, value in node.items():
+            yield from _medians(value, path + (key,))
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[str]:
+    """Return human-readable lines for medians that regressed past `threshold`."""
+    before = dict(_medians(old.get("suites", {})))
+    regressions = []
+    for key, after in _medians(new.get("suites", {})):
+        base = before.get(key)
+        if base and after > base * (1 + threshold):
+            regressions.append(f"{key}: {base * 1e3:.3f} ms -> {after * 1e3:.3f} ms (+{(after / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=SUITES, help="suite(s) to run (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="+", help="catalog sizes for the course_db / vector_store suites")
+    parser.add_argument("--quick", action="store_true", help="use smaller default sizes")
+    parser.add_argument("--out", type=Path, help="results file to write")
+    parser.add_argument("--compare", type=Path, help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed slowdown before flagging (fraction)")
+    args = parser.parse_args(argv)
+
+    results = run_suites(args.suite or list(SUITES), args.sizes, args.quick)
+    out = write_results(results, args.out)
+    print(f"wrote {out}")
+
+    if args.compare:
+        old = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(old, results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) vs {args.compare}:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"no regressions vs {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+"""Synthetic course catalogs shaped like utils/data/sdsu_cs_courses.json."""
+
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+
+SUBJECTS = ["CS", "MATH", "STAT", "PHYS", "CHEM", "BIOL", "ECON", "ENGL", "HIST", "PSY", "ART", "MUS", "EE", "ME", "CE"]
+WORDS = (
+    "algorithms data structures systems programming analysis theory networks security databases "
+    "machine learning statistics probability calculus linear algebra design principles introduction "
+    "advanced topics laboratory seminar research methods software engineering computation models"
+).split()
+
+
+def make_course(i: int, rng: random.Random) -> Dict:
+    subject = SUBJECTS[i % len(SUBJECTS)]
+    number = 100 + (i // len(SUBJECTS)) % 900
+    suffix = "" if i < len(SUBJECTS) * 900 else chr(ord("A") + (i // (len(SUBJECTS) * 900)) % 26)
+    name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+    description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 90))).capitalize() + "."
+    professors = [
+        {
+            "id": str(rng.randint(10000, 9999999)),
+            "name": f"Prof {rng.choice(WORDS).title()} {rng.randint(1, 999)}",
+            "url": "https://www.ratemyprofessors.com/professor/0",
+            "overall_quality": round(rng.uniform(1, 5), 1),
+            "overall_difficulty": round(rng.uniform(1, 5), 1),
+            "num_ratings": rng.randint(1, 200),
+            "would_take_again_percent": rng.randint(0, 100),
+        }
+        for _ in range(rng.randint(0, 4))
+    ]
+    return {
+        "code": f"{subject} {number}{suffix}",
+        "name": name,
+        "detail_url": f"https://catalog.sdsu.edu/preview_course_nopop.php?catoid=11&coid={i}",
+        "units": str(rng.choice([1, 2, 3, 4])),
+        "general_education": None,
+        "grading_method": "Letter grade only",
+        "prereqs": f"{subject} {max(100, number - 50)}" if rng.random() < 0.6 else None,
+        "restrictions": None,
+        "description": description,
+        "max_credits": "3",
+        "typically_offered": rng.choice(["Fall", "Spring", "Fall/Spring", None]),
+        "notes": None,
+        "professors": professors,
+    }
+
+
+def make_catalog(n: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    return [make_course(i, rng) for i in range(n)]
+
+
+def write_catalog(n: int, path: Path, seed: int = 0) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fh:
+        json.dump(make_catalog(n, seed), fh, ensure_ascii=False)
+    return path
@@ -0,0 +1,21 @@
+"""Gunicorn settings for running the API with several worker processes.
+
+    gunicorn -c gunicorn.conf.py utils.api_server:app
+
+The app is preloaded in the master, so the vector index is built at most once
+(see utils/deploy.py) and the course catalog is loaded before fork and shared
+copy-on-write by the workers. Override with WEB_CONCURRENCY / BIND / TIMEOUT.
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault("DEPLOY_MODE", "multiprocess")
+
+bind = os.getenv("BIND", "127.0.0.1:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count(), 8))))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# /rag waits on the LLM; keep the worker timeout above its slowest call
+timeout = int(os.getenv("TIMEOUT", "120"))
+graceful_timeout = 30
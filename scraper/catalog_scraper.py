@@ -0,0 +1,405 @@
+"""SDSU course catalog crawler: listing pages -> course detail records.
+
+    python -m scraper.catalog_scraper [--subject CS] [--workers 8] [--rate 3]
+    python -m scraper.catalog_scraper --start-url "https://catalog.sdsu.edu/content.php?catoid=11&navoid=..."
+
+1) Discovery: starting from the catalog's course listing (found from the
+   catalog home page unless --start-url / CATALOG_START_URLS is given), collect
+   every preview_course_nopop.php link and follow the listing's page links
+   (filter[cpage]=N). Each round of newly found listing pages is fetched
+   concurrently. `--subject` keeps only courses with those prefixes, so
+   their detail pages are never requested.
+2) Details: every course page is fetched on the Fetcher's pooled, rate-limited
+   workers (scraper/fetching.py) and parsed into the record schema CourseDB
+   serves (COURSE_FIELDS: code, name, units, prereqs, description,
+   typically_offered, ...).
+
+Pages go through the HTTP cache (scraper/http_cache.py), so a refresh is
+mostly 304s and unchanged pages are not parsed again. Records are streamed
+to a checkpoint (scraper/checkpoint.py) as they finish. An interrupted run
+resumes, and the JSON output (scraped_files/sdsu_<subject>_courses.json, or
+sdsu_courses.json for the whole catalog) is compacted at the end. A refresh
+of the full catalog is bounded by `--rate`. At 10 requests/second, ten
+thousand courses take about 17 minutes.
+
+Nothing here touches the network at import time.
+"""
+
+import argparse
+import os
+import re
+import time
+import urllib.parse
+from contextlib import nullcontext
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Comment, Tag
+
+try:
+    from scraper.checkpoint import JsonlWriter, ScrapeCheckpoint, failed_record
+    from scraper.departments import course_code_re
+    from scraper.fetching import DEFAULT_RATE, DEFAULT_WORKERS, Fetcher, permanent_failure
+    from scraper.http_cache import DEFAULT_CACHE_DIR, HttpCache
+except ImportError:  # run as a script: python scraper/catalog_scraper.py
+    from checkpoint import JsonlWriter, ScrapeCheckpoint, failed_record
+    from departments import course_code_re
+    from fetching import DEFAULT_RATE, DEFAULT_WORKERS, Fetcher, permanent_failure
+    from http_cache import DEFAULT_CACHE_DIR, HttpCache
+
+# ---------- CONFIG ----------
+
+CATALOG_URL = os.getenv("CATALOG_BASE_URL", "https://catalog.sdsu.edu").rstrip("/")
+# the catalog year (Acalog "catoid") the course records link to
+CATALOG_ID = int(os.getenv("CATALOG_ID", "11"))
+START_URLS = os.getenv("CATALOG_START_URLS", "").split()
+OUT_DIR = Path(__file__).resolve().parent / "scraped_files"
+
+# record schema of sdsu_cs_courses.json / CourseDB, in output order
+COURSE_FIELDS = (
+    "code",
+    "name",
+    "detail_url",
+    "units",
+    "general_education",
+    "grading_method",
+    "prereqs",
+    "restrictions",
+    "description",
+    "max_credits",
+    "typically_offered",
+    "notes",
+)
+
+# bold labels on a detail page -> record field (lower-cased, "(s)" and plural "s" dropped)
+_LABELS = {
+    "unit": "units",
+    "general education": "general_education",
+    "grading method": "grading_method",
+    "prerequisite": "prereqs",
+    "restriction": "restrictions",
+    "description": "description",
+    "maximum credit": "max_credits",
+    "typically offered": "typically_offered",
+    "note": "notes",
+}
+_BREAK_TAGS = frozenset({"br", "p", "div", "li", "tr", "td", "hr"})
+# navigation after the record in the popup page
+_STOP_RE = re.compile(r"^(Back to Top|Print-Friendly Page|Add to (My )?Portfolio|Close Window)", re.IGNORECASE)
+_TITLE_SPLIT_RE = re.compile(r"\s+[-–—]\s+")
+_UNITS_RE = re.compile(r"^\d+(?:\.\d+)?(?:\s*[-–]\s*\d+(?:\.\d+)?)?")
+_COURSE_INDEX_RE = re.compile(r"^courses?(\s+descriptions?)?$", re.IGNORECASE)
+
+# bump when a parser's output changes, so cached parse results are redone
+PARSER_VERSIONS = {
+    "parse_listing_page": "1",
+    "parse_course_detail": "2",  # labeled fields end at paragraph breaks
+}
+
+
+# ---------- FETCHING ----------
+
+def _get_parsed(fetcher: Fetcher, url: str, parse, name: str, reparse: bool = False):
+    """`parse(html)` of `url`, memoized by the fetcher's cache while the page is unchanged."""
+    resp = fetcher.get(url)
+    if fetcher.cache is not None and not reparse:
+        return fetcher.cache.parsed(resp, parse, name, PARSER_VERSIONS[name])
+    return parse(resp.text)
+
+
+# ---------- LISTING PAGES ----------
+
+def split_course_label(label: str) -> tuple[str | None, str | None]:
+    """"CS 150L - Introductory Computer Programming Laboratory" -> ("CS 150L", "Introductory ...")."""
+    label = " ".join(label.split())
+    if not label:
+        return None, None
+    parts = _TITLE_SPLIT_RE.split(label, maxsplit=1)
+    return parts[0], parts[1] if len(parts) > 1 else None
+
+
+def _query(url: str) -> dict:
+    return urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+
+
+def _same_listing(page_url: str, href_url: str) -> bool:
+    a, b = _query(page_url), _query(href_url)
+    return a.get("catoid") == b.get("catoid") and a.get("navoid") == b.get("navoid")
+
+
+def parse_listing_page(html: str, page_url: str) -> dict:
+    """
+    Course links and further listing pages on one catalog listing page:
+    {"courses": [{"code_label", "detail_url"}], "pages": [url, ...]}.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    courses, pages = [], []
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        url = urllib.parse.urljoin(page_url, href).split("#", 1)[0]
+        if "preview_course_nopop.php" in href:
+            label = a.get_text(" ", strip=True)
+            if label:
+                courses.append({"code_label": label, "detail_url": url})
+        elif "cpage" in urllib.parse.unquote(href) and _same_listing(page_url, url):
+            pages.append(url)
+    return {"courses": courses, "pages": pages}
+
+
+def find_course_index(fetcher: Fetcher, home_url: str | None = None) -> list[str]:
+    """The catalog's course listing URL, found by its "Courses" link on the catalog home page."""
+    home_url = home_url or f"{CATALOG_URL}/content.php?catoid={CATALOG_ID}"
+    soup = BeautifulSoup(fetcher.get(home_url).text, "html.parser")
+    for a in soup.find_all("a", href=True):
+        if "content.php" in a["href"] and _COURSE_INDEX_RE.match(a.get_text(" ", strip=True)):
+            return [urllib.parse.urljoin(home_url, a["href"])]
+    return []
+
+
+def _wanted(label: str, subjects) -> bool:
+    return not subjects or course_code_re(tuple(subjects)).match(label) is not None
+
+
+def discover_course_links(fetcher: Fetcher, start_urls: list[str], subjects=None) -> list[dict]:
+    """
+    Breadth-first over the listing pages (each round fetched concurrently);
+    returns one skeleton record per course (code, name, detail_url; the
+    other fields None), in listing order, de-duplicated by detail URL.
+    """
+    seen_pages = set(start_urls)
+    frontier = list(start_urls)
+    found: dict = {}
+    rounds = 0
+    while frontier:
+        rounds += 1
+        results = {}
+
+        def fetch(url: str):
+            try:
+                return _get_parsed(fetcher, url, lambda html: parse_listing_page(html, url), "parse_listing_page")
+            except Exception as e:
+                print(f"[WARN] error fetching listing page {url}: {e}")
+                return {"courses": [], "pages": []}
+
+        for url, result in fetcher.map(fetch, frontier):
+            results[url] = result
+        next_frontier = []
+        # merge in frontier order so the output order does not depend on timing
+        for url in frontier:
+            for link in results[url]["courses"]:
+                if link["detail_url"] not in found and _wanted(link["code_label"], subjects):
+                    code, name = split_course_label(link["code_label"])
+                    record = dict.fromkeys(COURSE_FIELDS)
+                    record.update(code=code, name=name, detail_url=link["detail_url"])
+                    found[link["detail_url"]] = record
+            for page in results[url]["pages"]:
+                if page not in seen_pages:
+                    seen_pages.add(page)
+                    next_frontier.append(page)
+        frontier = next_frontier
+        print(f"  listing round {rounds}: {len(results)} pages, {len(found)} courses so far")
+    return list(found.values())
+
+
+# ---------- DETAIL PAGES ----------
+
+def _label_key(text: str) -> str:
+    key = " ".join(text.replace("(s)", "").split()).strip(" :").lower()
+    return key[:-1] if key.endswith("s") else key
+
+
+def parse_course_detail(html: str) -> dict:
+    """
+    Fields of a preview_course_nopop.php page: code and name from the title,
+    then the text after each bold label ("Units:", "Prerequisite(s):", ...).
+    A label's text ends at the next paragraph break (<br><br>, <p>, ...);
+    unlabeled text after the title or after a break is the description.
+    Missing fields are None.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    record = dict.fromkeys(f for f in COURSE_FIELDS if f != "detail_url")
+    title = soup.find(id="course_preview_title") or soup.find("h1")
+    if title is None:
+        return record
+    record["code"], record["name"] = split_course_label(title.get_text(" ", strip=True))
+
+    container = title.find_parent(["td", "div"]) or soup
+    skip = {id(n) for n in title.descendants}
+    chunks: dict = {}
+    field = "description"
+    breaks = 0  # line breaks since the last text; two make a paragraph break
+    seen_title = False
+    for node in container.descendants:
+        if node is title:
+            seen_title = True
+            continue
+        if not seen_title or id(node) in skip or isinstance(node, Comment):
+            continue
+        if isinstance(node, Tag):
+            if node.name in ("script", "style"):
+                skip.update(id(n) for n in node.descendants)
+            elif node.name in ("strong", "b") and _label_key(node.get_text()) in _LABELS:
+                field = _LABELS[_label_key(node.get_text())]
+                breaks = 0
+                skip.update(id(n) for n in node.descendants)
+            elif node.name in _BREAK_TAGS:
+                chunks.setdefault(field, []).append(" ")
+                breaks += 1 if node.name == "br" else 2
+            continue
+        if _STOP_RE.match(node.strip()):
+            break
+        if node.strip():
+            if breaks >= 2:
+                field = "description"
+            breaks = 0
+        chunks.setdefault(field, []).append(str(node))
+
+    for key, parts in chunks.items():
+        value = " ".join("".join(parts).split()).lstrip(":").strip()
+        record[key] = value or None
+
+    # unlabeled text after "Units: 3" is the description, not part of the units
+    for key in ("units", "max_credits"):
+        value = record[key]
+        m = _UNITS_RE.match(value or "")
+        if m and m.end() < len(value):
+            rest = value[m.end():].strip()
+            record[key] = m.group(0)
+            if not record["description"]:
+                record["description"] = rest
+    return record
+
+
+def scrape_course(course: dict, fetcher: Fetcher, reparse: bool = False, on_error=None) -> dict | None:
+    """The full record of a skeleton from discover_course_links(), or None if the page failed.
+
+    `on_error(course, error)` is called when the page failed.
+    """
+    try:
+        parsed = _get_parsed(fetcher, course["detail_url"], parse_course_detail, "parse_course_detail", reparse)
+    except Exception as e:
+        print(f"    [WARN] error fetching {course['detail_url']}: {e}")
+        if on_error is not None:
+            on_error(course, e)
+        return None
+    return {f: parsed.get(f) or course.get(f) for f in COURSE_FIELDS}
+
+
+def scrape_courses_concurrently(
+    courses: list[dict], fetcher: Fetcher, reparse: bool = False, out: JsonlWriter | None = None
+) -> list[dict]:
+    """Fetch and parse every course page on the fetcher's workers, streaming records to `out`.
+
+    A page that can never be fetched (404) is recorded in `out` as failed.
+    """
+    total = len(courses)
+    started = time.perf_counter()
+    records = []
+
+    def failed(course: dict, error: Exception):
+        reason = permanent_failure(error)
+        if reason and out is not None:
+            out.write(failed_record("detail_url", course["detail_url"], reason))
+
+    def scrape(course: dict):
+        record = scrape_course(course, fetcher, reparse=reparse, on_error=failed)
+        if record is not None and out is not None:
+            out.write(record)
+        return record
+
+    for i, (_, record) in enumerate(fetcher.map(scrape, courses), start=1):
+        if record is not None:
+            records.append(record)
+        if i % 100 == 0 or i == total:
+            print(f"  [{i}/{total}] course pages done")
+    elapsed = time.perf_counter() - started
+    print(f"Fetched {total} course pages in {elapsed:.1f}s ({fetcher.stats})")
+    if fetcher.cache is not None:
+        print(f"HTTP cache: {fetcher.cache.stats}")
+    return records
+
+
+def crawl_catalog(
+    start_urls: list[str] | None = None,
+    subjects=None,
+    workers: int = DEFAULT_WORKERS,
+    rate: float = DEFAULT_RATE,
+    cache: HttpCache | None = None,
+    reparse: bool = False,
+    checkpoint: ScrapeCheckpoint | None = None,
+) -> list[dict]:
+    """
+    Discover the catalog's courses (optionally only `subjects`) and scrape
+    their detail pages. With a `checkpoint` (keyed by detail_url) an
+    interrupted run resumes; only records scraped by this call are returned
+    and the output is written with `checkpoint.finish()`.
+    """
+    with Fetcher(workers=workers, rate=rate, cache=cache) as fetcher:
+        courses = checkpoint.load_pending() if checkpoint is not None else None
+        if courses is not None:
+            print(f"Resuming from {checkpoint.journal_path} ({len(courses)} courses)")
+        else:
+            start_urls = start_urls or START_URLS or find_course_index(fetcher)
+            if not start_urls:
+                raise RuntimeError("Could not find the course listing; pass --start-url")
+            print(f"Discovering courses from {start_urls}")
+            courses = discover_course_links(fetcher, start_urls, subjects)
+            if checkpoint is not None:
+                checkpoint.save_pending(courses)
+
+        if checkpoint is not None:
+            done = checkpoint.done_ids()
+            courses = [c for c in courses if c["detail_url"] not in done]
+            if done:
+                print(f"Skipping {len(done)} courses finished by an earlier run")
+
+        print(f"\nScraping {len(courses)} course pages...")
+        with checkpoint.writer() if checkpoint is not None else nullcontext() as out:
+            return scrape_courses_concurrently(courses, fetcher, reparse=reparse, out=out)
+
+
+def output_prefix(subjects=None, out_dir: Path = OUT_DIR) -> Path:
+    """scraped_files/sdsu_cs_courses for ["CS"], scraped_files/sdsu_courses for the whole catalog."""
+    slug = "".join(subjects[0].split()).lower() + "_" if subjects else ""
+    return out_dir / f"sdsu_{slug}courses"
+
+
+# ---------- ENTRY POINT ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the SDSU course catalog into course records.")
+    parser.add_argument("--subject", action="append", type=str.upper, help="course prefix to keep (repeatable; default: all)")
+    parser.add_argument("--start-url", action="append", help="course listing page (default: found from the catalog home page)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent page fetches")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="requests/second per host (0 = unlimited)")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="download and parse every page")
+    parser.add_argument("--max-age", type=float, default=0.0, help="reuse cached pages younger than this many seconds without revalidating")
+    parser.add_argument("--reparse", action="store_true", help="parse pages even if their content is unchanged")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint of an interrupted run")
+    args = parser.parse_args()
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    prefix = output_prefix(args.subject)
+    checkpoint = ScrapeCheckpoint(prefix, key="detail_url")
+    if args.fresh:
+        checkpoint.discard()
+    cache = None if args.no_cache else HttpCache(args.cache_dir, max_age=args.max_age)
+    crawl_catalog(
+        start_urls=args.start_url,
+        subjects=args.subject,
+        workers=args.workers,
+        rate=args.rate,
+        cache=cache,
+        reparse=args.reparse,
+        checkpoint=checkpoint,
+    )
+
+    # keeps the checkpoint while some pages failed transiently, so a re-run
+    # retries just those (for a few runs; dead pages are recorded as failed)
+    out_path = prefix.with_name(prefix.name + ".json")
+    result = checkpoint.finish(out_path)
+    print(f"\nWrote {result['count']} courses to {out_path}")
+    if result["missing"]:
+        print(f"{len(result['missing'])} course pages failed; run again to retry them")
+    for url, reason in result["failed"].items():
+        print(f"  [FAILED] {url}: {reason}")
@@ -0,0 +1,291 @@
+"""Checkpointed, resumable scraper output.
+
+A long scrape streams every finished record to disk instead of holding them
+all until the end, so a crash or a ban partway through loses at most the
+records in flight:
+
+    checkpoint = ScrapeCheckpoint(out_dir / "sdsu_cs_professors")
+    items = checkpoint.load_pending()            # work list of an interrupted run
+    if items is None:
+        items = discover()
+        checkpoint.save_pending(items)
+    done = checkpoint.done_ids()
+    with checkpoint.writer() as out:
+        for item in items:
+            if item["id"] not in done:
+                out.write(scrape(item))
+    checkpoint.finish(out_dir / "sdsu_cs_professors.json")
+
+Files next to the output (for prefix `sdsu_cs_professors`):
+- sdsu_cs_professors.jsonl          one finished record per line (append-only)
+- sdsu_cs_professors.journal.json   the discovered work list, in order
+
+compact() writes the final JSON array in work-list order (byte-identical to
+`json.dump(records, indent=2)`), streaming record by record so memory stays
+flat. Items that never finished are written as they were discovered. Pass
+`cleanup=False` while some items failed: the checkpoint then stays, and the
+next run resumes with just those items instead of starting over.
+
+An item that can never succeed (a 404 page) is written to the stream as a
+failure marker, failed_record(), and counts as finished. finish() compacts
+and keeps the checkpoint only while items are still missing, for at most
+`max_attempts` runs. After that the leftovers are given up on, as failed,
+and the checkpoint is removed, so a dead page cannot pin a stale work list
+forever.
+
+merge_shards() joins the outputs of several scrapes (one per department)
+into one array, de-duplicated by key.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import textwrap
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# set on a stream record that marks its item as failed for good
+FAILED = "_failed"
+MAX_ATTEMPTS = 3
+
+
+def failed_record(key: str, value: Any, reason: str) -> Dict[str, Any]:
+    """Stream record marking item `value` as failed: skipped on resume, written as discovered."""
+    return {key: value, FAILED: reason}
+
+
+class JsonlWriter:
+    """Thread-safe append-only JSON Lines writer.
+
+    Every record is flushed as soon as it is written; a torn last line left
+    by a crash is cut off when the file is reopened.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _truncate_partial_line(self.path)
+        self._fh = self.path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            self.written += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+                self._fh.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _truncate_partial_line(path: Path) -> None:
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with path.open("rb+") as fh:
+        fh.seek(-1, os.SEEK_END)
+        if fh.read(1) == b"\n":
+            return
+        # walk back to the last complete line
+        pos = fh.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            fh.seek(pos)
+            chunk = fh.read(step)
+            nl = chunk.rfind(b"\n")
+            if nl >= 0:
+                fh.truncate(pos + nl + 1)
+                return
+        fh.truncate(0)
+
+
+def iter_jsonl(path: Path | str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (byte offset, record) for every valid line of a JSONL file."""
+    path = Path(path)
+    if not path.exists():
+        return
+    with path.open("rb") as fh:
+        offset = 0
+        for line in fh:
+            start, offset = offset, offset + len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield start, record
+
+
+class ScrapeCheckpoint:
+    """Journal + JSONL stream for one scrape output (see module docstring)."""
+
+    def __init__(self, prefix: Path | str, key: str = "id"):
+        prefix = Path(prefix)
+        self.records_path = prefix.with_name(prefix.name + ".jsonl")
+        self.journal_path = prefix.with_name(prefix.name + ".journal.json")
+        self.key = key
+
+    def exists(self) -> bool:
+        return self.journal_path.exists() or self.records_path.exists()
+
+    def _journal(self) -> Optional[Dict[str, Any]]:
+        try:
+            journal = json.loads(self.journal_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return journal if isinstance(journal, dict) and "items" in journal else None
+
+    def load_pending(self) -> Optional[List[Dict[str, Any]]]:
+        """The work list saved by an earlier, unfinished run, or None."""
+        journal = self._journal()
+        return journal["items"] if journal is not None else None
+
+    def save_pending(self, items: List[Dict[str, Any]], attempts: int = 0) -> None:
+        _atomic_write_text(self.journal_path, json.dumps({"items": items, "attempts": attempts}, ensure_ascii=False))
+
+    def failed(self) -> Dict[str, str]:
+        """{key: reason} of the items marked as failed."""
+        return {str(r[self.key]): r[FAILED] for _, r in iter_jsonl(self.records_path) if r.get(FAILED)}
+
+    def done_ids(self) -> set:
+        return {str(r[self.key]) for _, r in iter_jsonl(self.records_path) if r.get(self.key) is not None}
+
+    def writer(self) -> JsonlWriter:
+        return JsonlWriter(self.records_path)
+
+    def _offsets(self) -> Dict[str, int]:
+        # last write wins when a record was written twice; failed items fall
+        # back to their work-list entry
+        offsets = {}
+        for off, r in iter_jsonl(self.records_path):
+            if r.get(self.key) is not None:
+                offsets[str(r[self.key])] = off
+                if r.get(FAILED):
+                    del offsets[str(r[self.key])]
+        return offsets
+
+    def compact(self, out_path: Path | str, cleanup: bool = True) -> int:
+        """Write the JSON array output and (by default) drop the checkpoint files.
+
+        Returns the number of records written.
+        """
+        out_path = Path(out_path)
+        offsets = self._offsets()
+        pending = self.load_pending() or []
+        order = [str(item[self.key]) for item in pending]
+        seen = set(order)
+        order += [k for k in offsets if k not in seen]
+        fallback = {str(item[self.key]): item for item in pending}
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=out_path.parent, prefix=out_path.name, suffix=".tmp")
+        count = 0
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as out, _open_or_none(self.records_path) as src:
+                out.write("[")
+                for k in order:
+                    if k in offsets:
+                        src.seek(offsets[k])
+                        record = json.loads(src.readline())
+                    else:
+                        record = fallback[k]
+                    out.write(",\n" if count else "\n")
+                    out.write(textwrap.indent(json.dumps(record, indent=2, ensure_ascii=False), "  "))
+                    count += 1
+                out.write("\n]" if count else "]")
+            os.replace(tmp, out_path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        if cleanup:
+            self.discard()
+        return count
+
+    def finish(self, out_path: Path | str, max_attempts: int = MAX_ATTEMPTS) -> Dict[str, Any]:
+        """Compact to `out_path`, keeping the checkpoint only while a re-run can still help.
+
+        Items neither written nor marked failed are missing. The checkpoint
+        stays for them until this is the `max_attempts`-th run on the same
+        work list. At that point they are marked failed and the checkpoint
+        is removed like after a complete run. Returns {"count", "missing",
+        "failed": {key: reason}}; "missing" lists the items left for the
+        next run.
+        """
+        journal = self._journal() or {"items": []}
+        done = self.done_ids()
+        missing = [str(item[self.key]) for item in journal["items"] if str(item[self.key]) not in done]
+        attempts = journal.get("attempts", 0) + 1
+        if missing and attempts >= max_attempts:
+            with self.writer() as out:
+                for k in missing:
+                    out.write(failed_record(self.key, k, f"gave up after {attempts} attempts"))
+            missing = []
+        elif missing:
+            self.save_pending(journal["items"], attempts)
+        failed = self.failed()
+        count = self.compact(out_path, cleanup=not missing)
+        return {"count": count, "missing": missing, "failed": failed}
+
+    def discard(self) -> None:
+        self.records_path.unlink(missing_ok=True)
+        self.journal_path.unlink(missing_ok=True)
+
+
+def merge_shards(
+    shard_paths: List[Path | str],
+    out_path: Path | str,
+    key: str = "id",
+    combine: Optional[Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = None,
+) -> int:
+    """Merge JSON-array shards (e.g. one per department) into one array.
+
+    Records keep shard order; a key seen in an earlier shard is replaced by
+    `combine(earlier, later)`, or the earlier record is kept without
+    `combine`. Missing shards are skipped. The output is written atomically,
+    and the number of records is returned.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for path in map(Path, shard_paths):
+        if not path.exists():
+            continue
+        for record in json.loads(path.read_text(encoding="utf-8")):
+            k = str(record.get(key))
+            if k not in merged:
+                merged[k] = record
+            elif combine is not None:
+                merged[k] = combine(merged[k], record)
+    _atomic_write_text(Path(out_path), json.dumps(list(merged.values()), indent=2, ensure_ascii=False))
+    return len(merged)
+
+
+def _open_or_none(path: Path):
+    return path.open("rb") if path.exists() else nullcontext()
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
@@ -2,17 +2,42 @@ import requests
 from bs4 import BeautifulSoup
 import urllib.parse
 
+try:
+    from scraper.fetching import Fetcher
+except ImportError:  # run as a script: python scraper/cs_scraper.py
+    from fetching import Fetcher
+
 BASE = "https://catalog.sdsu.edu/content.php?catoid=9&navoid=786"
 
-def extract_course_links_from_page(url: str):
+
+def _get_html(url: str, parse, fetcher: Fetcher | None = None):
+    """Fetch `url` and run `parse(html)` on it.
+
+    With a fetcher the request is pooled and rate limited, and if the fetcher
+    has an HttpCache it is conditional and unchanged pages are not parsed
+    again.
+    """
+    if fetcher is None:
+        resp = requests.get(url)
+        resp.raise_for_status()
+        return parse(resp.text)
+    resp = fetcher.get(url)
+    if fetcher.cache is not None:
+        return fetcher.cache.parsed(resp, parse)
+    return parse(resp.text)
+
+
+def extract_course_links_from_page(url: str, fetcher: Fetcher | None = None):
     """
     Return a list of dicts with the course code text on the page
     and the corresponding preview_course_nopop URL.
     Works for American Institutions, Language Requirement, GE pages, etc.
     """
-    resp = requests.get(url)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+    return _get_html(url, parse_course_links, fetcher)
+
+
+def parse_course_links(html: str):
+    soup = BeautifulSoup(html, "html.parser")
 
     courses = []
 
@@ -35,17 +60,14 @@ def extract_course_links_from_page(url: str):
     return courses
 
 GE_URL = "https://catalog.sdsu.edu/content.php?catoid=9&navoid=786"  # or the actual GE page URL
-ge_courses = extract_course_links_from_page(GE_URL)
 
-print(len(ge_courses))
-for c in ge_courses:
-    print(c)
+
+def extract_ge_courses_with_areas(url: str, fetcher: Fetcher | None = None):
+    return _get_html(url, parse_ge_courses_with_areas, fetcher)
 
 
-def extract_ge_courses_with_areas(url: str):
-    resp = requests.get(url)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+def parse_ge_courses_with_areas(html: str):
+    soup = BeautifulSoup(html, "html.parser")
 
     current_area = None
     results = []
@@ -76,3 +98,12 @@ def extract_ge_courses_with_areas(url: str):
             )
 
     return results
+
+
+if __name__ == "__main__":
+    # catalog-wide course details: python -m scraper.catalog_scraper
+    ge_courses = extract_course_links_from_page(GE_URL)
+
+    print(len(ge_courses))
+    for c in ge_courses:
+        print(c)
@@ -0,0 +1,99 @@
+"""Departments to crawl, and course-code parsing for any subject prefix.
+
+A department is a plain dict so it pickles to worker processes and
+round-trips through JSON:
+
+    {"id": 11, "name": "Computer Science", "subjects": ["CS"]}
+
+- `id` is RMP's legacy department id (the `did=` of the search page).
+- `subjects` are the catalog prefixes its courses use ("CS", "COMPE", "B A").
+  Leave it empty when they are unknown. Course codes are then read only from
+  RMP's per-rating class field, not from free text.
+
+parse_department("11:Computer Science:CS,COMPE") reads the CLI form, and
+department_slug() names a department's output files. For example,
+scraped_files/sdsu_cs_professors.json is the shard of the department whose
+first subject is CS.
+
+course_code_re(subjects) matches "cs210", "CS 210", "CS150L" and
+"CS530CS570", and is compiled once per subject tuple. course_codes() returns
+them canonicalized ("CS 210") and sorted.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+DEFAULT_DEPARTMENTS: List[Dict[str, Any]] = [{"id": 11, "name": "Computer Science", "subjects": ["CS"]}]
+
+# any prefix of 2-5 letters; only safe on short, code-only strings
+GENERIC_SUBJECT = r"[A-Za-z]{2,5}"
+# 2-3 digits plus an optional one-letter suffix (150L, 170A) that does not
+# start the next word or code: "CS210and" -> 210, "CS530CS570" -> 530, 570
+_NUMBER = r"([0-9]{2,3}(?:[A-Za-z](?![A-Za-z]))?)"
+
+
+def _squash(subject: str) -> str:
+    return "".join(subject.split()).upper()
+
+
+@lru_cache(maxsize=None)
+def course_code_re(subjects: Optional[Tuple[str, ...]] = None) -> "re.Pattern[str]":
+    """Case-insensitive pattern capturing (subject, number); generic prefixes without `subjects`."""
+    if subjects:
+        words = sorted({s.strip() for s in subjects if s.strip()}, key=len, reverse=True)
+        alternatives = "|".join(r"\s*".join(map(re.escape, s.split())) for s in words)
+    else:
+        alternatives = GENERIC_SUBJECT
+    return re.compile(rf"(?i)(?<![A-Za-z])({alternatives})\s*{_NUMBER}")
+
+
+def _sort_key(code: Tuple[str, str]) -> Tuple[str, int, str]:
+    subject, number = code
+    digits = number.rstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+    return subject, int(digits), number[len(digits):]
+
+
+def collect_course_codes(text: str, subjects: Optional[Sequence[str]], out: Set[Tuple[str, str]]) -> None:
+    """Add every (subject, number) found in `text` to `out`.
+
+    Subjects are reported as spelled in `subjects` ("B A"), or upper-cased
+    without spaces for generic matches.
+    """
+    key = tuple(subjects) if subjects else None
+    canonical = {_squash(s): s.strip().upper() for s in key} if key else None
+    for m in course_code_re(key).finditer(text):
+        subject = _squash(m.group(1))
+        if canonical is not None:
+            subject = canonical.get(subject, subject)
+        out.add((subject, m.group(2).upper()))
+
+
+def format_course_codes(codes: Iterable[Tuple[str, str]]) -> List[str]:
+    """"CS 150", "CS 150L", "CS 210", ... sorted by subject, then number."""
+    return [f"{s} {n}" for s, n in sorted(codes, key=_sort_key)]
+
+
+def course_codes(text: str, subjects: Optional[Sequence[str]] = None) -> List[str]:
+    found: Set[Tuple[str, str]] = set()
+    collect_course_codes(text, subjects, found)
+    return format_course_codes(found)
+
+
+def department_slug(dept: Dict[str, Any]) -> str:
+    """Short file-name-safe name: the first subject ("cs"), else the department name."""
+    subjects = dept.get("subjects") or []
+    base = _squash(subjects[0]) if subjects else dept.get("name") or str(dept["id"])
+    return re.sub(r"[^a-z0-9]+", "_", base.lower()).strip("_") or str(dept["id"])
+
+
+def parse_department(spec: str) -> Dict[str, Any]:
+    """Parse "ID:Name[:SUBJ,SUBJ]" (e.g. "11:Computer Science:CS")."""
+    parts = spec.split(":", 2)
+    if len(parts) < 2 or not parts[0].strip().isdigit() or not parts[1].strip():
+        raise ValueError(f"Expected ID:Name[:SUBJECTS], got {spec!r}")
+    subjects = [s.strip().upper() for s in parts[2].split(",") if s.strip()] if len(parts) == 3 else []
+    return {"id": int(parts[0]), "name": parts[1].strip(), "subjects": subjects}
@@ -0,0 +1,218 @@
+"""Shared HTTP fetching for the scrapers: pooled, rate-limited, retried.
+
+    fetcher = Fetcher(workers=8, rate=3.0)
+    resp = fetcher.get(url)                       # one page
+    data = fetcher.post(api_url, json=query).json()
+    for item, result in fetcher.map(fn, items):   # fn(item) on `workers` threads
+        ...
+
+- One requests.Session with a connection pool sized to the worker count, so
+  keep-alive connections are reused instead of a new TLS handshake per page.
+- A token-bucket RateLimiter per host replaces fixed sleeps: requests go out
+  as fast as the politeness budget (`rate` requests/second, `burst`) allows,
+  however many workers are waiting on it.
+- Connection errors, timeouts, 429 and 5xx responses are retried `retries`
+  times with exponential backoff and jitter (a Retry-After header wins).
+  Other 4xx answers fail at once; permanent_failure() tells callers that
+  retrying them on a later run is pointless.
+- With an HttpCache (scraper/http_cache.py) requests are conditional
+  (If-None-Match / If-Modified-Since) and 304 answers are served from disk.
+
+Environment defaults: SCRAPER_WORKERS (4), SCRAPER_RATE (3 requests/second per
+host), SCRAPER_RETRIES (3), SCRAPER_TIMEOUT (15 seconds).
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from scraper.http_cache import HttpCache
+except ImportError:  # scripts run from inside scraper/
+    from http_cache import HttpCache
+
+
+DEFAULT_WORKERS = int(os.getenv("SCRAPER_WORKERS", "4"))
+DEFAULT_RATE = float(os.getenv("SCRAPER_RATE", "3"))
+DEFAULT_RETRIES = int(os.getenv("SCRAPER_RETRIES", "3"))
+DEFAULT_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "15"))
+# first retry waits about this long; doubled per attempt, capped at MAX_BACKOFF
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/122.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second after an initial `burst`.
+
+    `rate <= 0` disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request may be sent; returns the time waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # take the token now (possibly going negative) and sleep off the
+            # debt outside the lock, so waiting threads queue up in order
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def permanent_failure(error: BaseException) -> Optional[str]:
+    """A reason ("HTTP 404") if `error` is an HTTP answer no retry will change, else None."""
+    resp = getattr(error, "response", None) if isinstance(error, requests.HTTPError) else None
+    if resp is not None and 400 <= resp.status_code < 500 and resp.status_code not in RETRY_STATUSES | {408}:
+        return f"HTTP {resp.status_code}"
+    return None
+
+
+class Fetcher:
+    """Thread-safe GETs over a shared pooled session with per-host rate limits."""
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        rate: float = DEFAULT_RATE,
+        burst: Optional[int] = None,
+        retries: int = DEFAULT_RETRIES,
+        timeout: float = DEFAULT_TIMEOUT,
+        headers: Optional[Dict[str, str]] = None,
+        session: Optional[requests.Session] = None,
+        cache: Optional[HttpCache] = None,
+    ):
+        self.workers = max(1, workers)
+        self.rate = rate
+        self.burst = burst if burst is not None else self.workers
+        self.retries = retries
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        self.cache = cache
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "throttled_s": 0.0}
+
+    def limiter(self, url: str) -> RateLimiter:
+        host = urlsplit(url).netloc
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = RateLimiter(self.rate, self.burst)
+            return limiter
+
+    def _count(self, key: str, n: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """GET `url`, retrying transient failures; raises the last error once retries are spent.
+
+        With a cache, the response carries `from_cache`, `unchanged` and
+        `content_hash` (see HttpCache).
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """POST `url` (never cached), with the same rate limit and retries as get()."""
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        use_cache = self.cache is not None and method == "GET"
+        cached = self.cache.lookup(url) if use_cache else None
+        if cached is not None:
+            if self.cache.is_fresh(cached):
+                return self.cache.cached_response(url, cached)
+            kwargs["headers"] = {**self.cache.validators(cached), **(kwargs.get("headers") or {})}
+        limiter = self.limiter(url)
+        for attempt in range(self.retries + 1):
+            self._count("throttled_s", limiter.acquire())
+            self._count("requests")
+            delay = None
+            try:
+                resp = self.session.request(method, url, **kwargs)
+                if resp.status_code == 304 and cached is not None:
+                    return self.cache.cached_response(url, cached, revalidated=True)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    return self.cache.store(url, resp, cached) if use_cache else resp
+                delay = _retry_after(resp)
+                if attempt == self.retries:
+                    resp.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    self._count("failures")
+                    raise
+            except requests.HTTPError:
+                self._count("failures")
+                raise
+            if delay is None:
+                delay = min(MAX_BACKOFF, BACKOFF * 2 ** attempt) * random.uniform(0.5, 1.5)
+            self._count("retries")
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[Tuple[T, R]]:
+        """Run `fn(item)` on the worker threads, yielding (item, result) as each finishes.
+
+        Exceptions raised by `fn` propagate to the caller.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fetch") as pool:
+            futures = {pool.submit(fn, item): item for item in items}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "Fetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
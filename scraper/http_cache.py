@@ -0,0 +1,205 @@
+"""On-disk HTTP cache with conditional requests for incremental re-scrapes.
+
+    cache = HttpCache("scraper/.http_cache")
+    fetcher = Fetcher(cache=cache)
+    resp = fetcher.get(url)          # If-None-Match / If-Modified-Since when cached
+    resp.from_cache                  # True when the server answered 304 (or within max_age)
+    resp.unchanged                   # body hash equals the previous run's
+    courses = cache.parsed(resp, parse_prof_courses)   # parse only changed bodies
+
+Each URL is stored as two files named by the URL's sha256: `<key>.body` (raw
+bytes) and `<key>.json` (ETag, Last-Modified, content hash, encoding, fetch
+times and memoized parse results, each tagged with its parser's version). A
+304 Not Modified answer is turned back into a normal 200 response with the
+cached body, so callers don't need to care. Pages that send no validators are
+still compared by content hash, so `parsed()` can skip re-parsing them when
+nothing changed, unless the parser changed.
+
+Writes go to temporary files and are renamed into place, so concurrent
+workers and interrupted runs never leave a half-written entry.
+
+Environment: SCRAPER_CACHE_DIR (default scraper/.http_cache).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+DEFAULT_CACHE_DIR = Path(os.getenv("SCRAPER_CACHE_DIR", str(Path(__file__).resolve().parent / ".http_cache")))
+# response headers kept with the body (replayed on cache hits)
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+T = TypeVar("T")
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def parser_fingerprint(parse: Callable) -> str:
+    """Hash of a parser's bytecode, the default parse-result version."""
+    code = getattr(parse, "__code__", None)
+    if code is None:
+        return "unversioned"
+    return hashlib.sha256(code.co_code + repr(code.co_consts).encode("utf-8")).hexdigest()[:16]
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class HttpCache:
+    """URL-keyed cache of response bodies, validators and parse results.
+
+    `max_age` (seconds) serves entries younger than that without contacting
+    the server at all; the default 0 always revalidates.
+    """
+
+    def __init__(self, cache_dir: Path | str = DEFAULT_CACHE_DIR, max_age: float = 0.0):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.stats = {"fresh": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "new": 0, "parse_skipped": 0}
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """The stored metadata for `url`, or None (also when the body file is gone)."""
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return meta if body_path.exists() else None
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        return self.max_age > 0 and time.time() - meta.get("validated_at", 0) < self.max_age
+
+    @staticmethod
+    def validators(meta: Dict[str, Any]) -> Dict[str, str]:
+        """Conditional-request headers for a cached entry."""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def cached_response(self, url: str, meta: Dict[str, Any], revalidated: bool = False) -> requests.Response:
+        """Rebuild a 200 response from the cache (after a 304 or a max_age hit)."""
+        _, body_path = self._paths(url)
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp._content = body_path.read_bytes()
+        resp.encoding = meta.get("encoding")
+        resp.headers = CaseInsensitiveDict(meta.get("headers") or {})
+        resp.cache_url = url
+        resp.from_cache = True
+        resp.unchanged = True
+        resp.content_hash = meta.get("content_hash")
+        if revalidated:
+            meta["validated_at"] = time.time()
+            self._write_meta(url, meta)
+            self._count("not_modified")
+        else:
+            self._count("fresh")
+        return resp
+
+    def store(self, url: str, resp: requests.Response, previous: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """Save a fresh 200 response and annotate it with `from_cache`, `unchanged` and `content_hash`."""
+        body = resp.content
+        digest = content_hash(body)
+        unchanged = previous is not None and previous.get("content_hash") == digest
+        now = time.time()
+        meta = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "content_hash": digest,
+            "encoding": resp.encoding,
+            "headers": {h: resp.headers[h] for h in _KEPT_HEADERS if h in resp.headers},
+            "fetched_at": now,
+            "validated_at": now,
+            # parse results stay valid as long as the body is the same
+            "parsed": (previous or {}).get("parsed", {}) if unchanged else {},
+        }
+        _, body_path = self._paths(url)
+        if not unchanged:
+            _atomic_write(body_path, body)
+        self._write_meta(url, meta)
+        self._count("new" if previous is None else ("unchanged" if unchanged else "changed"))
+        resp.cache_url = url
+        resp.from_cache = False
+        resp.unchanged = unchanged
+        resp.content_hash = digest
+        return resp
+
+    def _write_meta(self, url: str, meta: Dict[str, Any]) -> None:
+        meta_path, _ = self._paths(url)
+        _atomic_write(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def parsed(
+        self,
+        resp: requests.Response,
+        parse: Callable[[str], T],
+        name: Optional[str] = None,
+        version: Optional[str] = None,
+    ) -> T:
+        """`parse(resp.text)`, memoized per URL, body hash and parser version.
+
+        Results must be JSON-serializable; `name` (default: the function's
+        name) keeps several parsers of the same page apart. `version` marks
+        the parser's code: bump it when the parser's output changes, and
+        results stored under another version are parsed again. Without it
+        the hash of `parse`'s bytecode is used, which does not see changes
+        in the functions `parse` calls.
+        """
+        name = name or getattr(parse, "__name__", "parsed")
+        version = str(version) if version is not None else parser_fingerprint(parse)
+        digest = getattr(resp, "content_hash", None)
+        url = getattr(resp, "cache_url", resp.url)
+        meta = self.lookup(url) if digest else None
+        if meta is not None and meta.get("content_hash") == digest:
+            memo = meta.get("parsed", {}).get(name)
+            if memo is not None and memo.get("version") == version:
+                self._count("parse_skipped")
+                return memo["value"]
+        value = parse(resp.text)
+        if meta is not None and meta.get("content_hash") == digest:
+            meta.setdefault("parsed", {})[name] = {"value": value, "version": version}
+            self._write_meta(url, meta)
+        return value
+
+    def clear(self) -> None:
+        for path in self.cache_dir.iterdir():
+            if path.suffix in (".json", ".body", ".tmp"):
+                path.unlink(missing_ok=True)
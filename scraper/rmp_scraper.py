@@ -1,41 +1,131 @@
-import json
+"""RateMyProfessors scraper for SDSU departments (Computer Science by default).
+
+    python -m scraper.rmp_scraper [--max-profs N] [--workers 8] [--rate 3]
+    python -m scraper.rmp_scraper --departments all --processes 4
+    python -m scraper.rmp_scraper --department "11:Computer Science:CS" --department "ID:Name:SUBJ,SUBJ"
+
+Discovers each department's professors over plain HTTP - the site's paginated
+GraphQL search, then the JSON embedded in the search page - and only starts
+headless Chrome (Selenium, imported lazily) if both come back empty
+(`--discovery auto|http|selenium`). Then it fetches every professor page
+concurrently through scraper/fetching.py: a
+pooled session shared by `--workers` threads, a per-host rate limit of
+`--rate` requests/second instead of fixed sleeps, and retries with backoff.
+RMP_BASE_URL points the scraper at another host (e.g. a local fixture server).
+
+Pages are cached on disk (scraper/http_cache.py, `--cache-dir`): re-runs send
+conditional requests, unchanged pages come back as 304s and are not parsed
+again. `--reparse` parses every page anyway, `--no-cache` disables the cache.
+
+Finished professors are streamed to scraped_files/sdsu_<slug>_professors.jsonl
+next to a journal of the discovered list (scraper/checkpoint.py). An
+interrupted run picks up where it stopped; the JSON output is compacted from
+the stream at the end. `--fresh` discards an old checkpoint.
+
+Departments (scraper/departments.py) are crawled in `--processes` worker
+processes, one department at a time per process, each with its own session,
+checkpoint and shard (scraped_files/sdsu_<slug>_professors.json; CS keeps
+sdsu_cs_professors.json). The `--rate` budget is split across the processes,
+so the site sees the same request rate however many run. With more than one
+department the shards are merged into scraped_files/sdsu_professors.json.
+"""
+
+import argparse
+import base64
+import os
 import re
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 from pathlib import Path
 
 import requests
 from bs4 import BeautifulSoup
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import NoSuchElementException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+try:
+    from scraper.checkpoint import JsonlWriter, ScrapeCheckpoint, failed_record, merge_shards
+    from scraper.departments import (
+        DEFAULT_DEPARTMENTS,
+        collect_course_codes,
+        department_slug,
+        format_course_codes,
+        parse_department,
+    )
+    from scraper.fetching import DEFAULT_HEADERS, DEFAULT_RATE, DEFAULT_WORKERS, Fetcher, permanent_failure
+    from scraper.http_cache import DEFAULT_CACHE_DIR, HttpCache
+    from scraper.page_extract import iter_dicts, iter_strings, load_script_json, script_json, scripts_containing
+except ImportError:  # run as a script: python scraper/rmp_scraper.py
+    from checkpoint import JsonlWriter, ScrapeCheckpoint, failed_record, merge_shards
+    from departments import DEFAULT_DEPARTMENTS, collect_course_codes, department_slug, format_course_codes, parse_department
+    from fetching import DEFAULT_HEADERS, DEFAULT_RATE, DEFAULT_WORKERS, Fetcher, permanent_failure
+    from http_cache import DEFAULT_CACHE_DIR, HttpCache
+    from page_extract import iter_dicts, iter_strings, load_script_json, script_json, scripts_containing
 
 # ---------- CONFIG ----------
 
 SDSU_SCHOOL_ID = 877
-# did=11 is Computer Science filter
-SEARCH_URL = f"https://www.ratemyprofessors.com/search/professors/{SDSU_SCHOOL_ID}?q=*&&did=11"
-BASE_URL = "https://www.ratemyprofessors.com"
-
-REQ_HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/122.0.0.0 Safari/537.36"
-    ),
-    "Accept-Language": "en-US,en;q=0.9",
+BASE_URL = os.getenv("RMP_BASE_URL", "https://www.ratemyprofessors.com").rstrip("/")
+DEFAULT_DEPARTMENT = DEFAULT_DEPARTMENTS[0]
+DEFAULT_SUBJECTS = tuple(DEFAULT_DEPARTMENT["subjects"])
+OUT_DIR = Path(__file__).resolve().parent / "scraped_files"
+GRAPHQL_URL = f"{BASE_URL}/graphql"
+# the public web client's credentials ("test:test")
+GRAPHQL_HEADERS = {"Authorization": "Basic dGVzdDp0ZXN0", "Content-Type": "application/json"}
+GRAPHQL_PAGE_SIZE = 50
+# seconds to wait for "Show More" to render new professor cards
+CARD_WAIT_TIMEOUT = 10.0
+
+# professor cards on the search page: hand over the ones not seen yet and
+# mark them, so each card is serialized and parsed exactly once
+_CARD_SELECTOR = "a[href^='/professor/']"
+_TAKE_NEW_CARDS_JS = f"""
+const cards = document.querySelectorAll("{_CARD_SELECTOR}:not([data-scraped])");
+const out = [];
+for (const a of cards) {{ a.setAttribute("data-scraped", "1"); out.push(a.outerHTML); }}
+return out;
+"""
+_COUNT_CARDS_JS = f'return document.querySelectorAll("{_CARD_SELECTOR}").length;'
+
+SCHOOL_DEPARTMENTS_QUERY = """
+query SchoolDepartments($id: ID!) {
+  node(id: $id) { ... on School { departments { id name } } }
 }
+"""
+
+TEACHER_SEARCH_QUERY = """
+query TeacherSearchPaginationQuery($count: Int!, $cursor: String, $query: TeacherSearchQuery!) {
+  search: newSearch {
+    teachers(query: $query, first: $count, after: $cursor) {
+      edges {
+        node {
+          id legacyId firstName lastName department
+          avgRating avgDifficulty numRatings wouldTakeAgainPercent
+        }
+      }
+      pageInfo { hasNextPage endCursor }
+      resultCount
+    }
+  }
+}
+"""
+
 
-# Match cs210, CS 210, cs210(7), CS530CS570, etc.
-COURSE_RE = re.compile(r"(?i)\bcs\s*([0-9]{2,3})")
+# bump when parse_prof_courses' output changes, so cached parse results are redone
+PROF_COURSES_PARSER_VERSION = "1"
+
+
+def search_url(department: dict) -> str:
+    """The department's professor search page (did= filters by department)."""
+    return f"{BASE_URL}/search/professors/{SDSU_SCHOOL_ID}?q=*&&did={department['id']}"
 
 
 # ---------- SELENIUM SETUP ----------
 
 def make_driver(headless: bool = True):
+    # imported here so the HTTP-only discovery path runs without selenium installed
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
     opts = Options()
     if headless:
         # for newer chromedriver
@@ -53,70 +143,102 @@ def make_driver(headless: bool = True):
 
 # ---------- HELPERS: COURSES FROM PROFESSOR PAGE ----------
 
-def _collect_courses_from_text(text: str, out_set: set[str]):
-    for m in COURSE_RE.finditer(text):
-        out_set.add(m.group(1))
+def _collect_courses_from_text(text: str, out_set: set, subjects=DEFAULT_SUBJECTS):
+    # cs210, CS 210, cs210(7), CS150L, CS530CS570, ... for the given subject prefixes
+    collect_course_codes(text, subjects, out_set)
 
 
-def _collect_courses_from_json(node, out_set: set[str]):
+def _collect_courses_from_json(node, out_set: set, subjects=DEFAULT_SUBJECTS):
     """
-    Recursively walk a JSON-like structure and collect any strings
-    that contain CS course patterns.
-    """
-    if isinstance(node, dict):
-        for v in node.values():
-            _collect_courses_from_json(v, out_set)
-    elif isinstance(node, list):
-        for v in node:
-            _collect_courses_from_json(v, out_set)
-    elif isinstance(node, str):
-        _collect_courses_from_text(node, out_set)
-
+    Walk a JSON-like structure (iteratively, in one pass) and collect any
+    strings that contain course patterns.
 
-def scrape_prof_courses(prof: dict, delay: float = 0.3):
+    Without `subjects` only the ratings' `class` fields ("CS310") are read,
+    with any subject prefix; free text is too noisy for a generic pattern.
+    """
+    if subjects:
+        for text in iter_strings(node):
+            _collect_courses_from_text(text, out_set, subjects)
+        return
+    for d in iter_dicts(node):
+        cls = d.get("class")
+        if isinstance(cls, str):
+            _collect_courses_from_text(cls, out_set, None)
+
+
+def scrape_prof_courses(
+    prof: dict,
+    delay: float = 0.3,
+    fetcher: Fetcher | None = None,
+    reparse: bool = False,
+    subjects=DEFAULT_SUBJECTS,
+    on_error=None,
+) -> bool:
     """
-    Fetch a professor page and extract CS course codes using:
+    Fetch a professor page and extract course codes with the `subjects`
+    prefixes using:
       1) regex over raw HTML
       2) regex over all strings in the __NEXT_DATA__ JSON blob
+
+    With a `fetcher` the request goes through its pooled session, rate limiter
+    and retries, and `delay` is ignored. If the fetcher has a cache, pages
+    whose content did not change since the last run are not parsed again
+    unless `reparse` is set.
+
+    Returns False if the page could not be fetched (`courses` is then empty);
+    `on_error(prof, error)` is called with the error first.
     """
     try:
-        resp = requests.get(prof["url"], headers=REQ_HEADERS, timeout=15)
-        resp.raise_for_status()
+        if fetcher is not None:
+            resp = fetcher.get(prof["url"])
+        else:
+            resp = requests.get(prof["url"], headers=DEFAULT_HEADERS, timeout=15)
+            resp.raise_for_status()
     except Exception as e:
         print(f"    [WARN] error fetching {prof['url']}: {e}")
         prof["courses"] = []
-        return
+        if on_error is not None:
+            on_error(prof, e)
+        return False
+
+    def parse(html: str) -> list[str]:
+        return parse_prof_courses(html, subjects)
+
+    if fetcher is not None and fetcher.cache is not None and not reparse:
+        name = f"parse_prof_courses[{','.join(subjects or ())}]"
+        prof["courses"] = fetcher.cache.parsed(resp, parse, name, PROF_COURSES_PARSER_VERSION)
+    else:
+        prof["courses"] = parse(resp.text)
+    print(f"    courses found for {prof['name']}: {prof['courses']}")
+    if fetcher is None:
+        time.sleep(delay)
+    return True
 
-    html = resp.text
-    soup = BeautifulSoup(html, "html.parser")
 
-    codes: set[str] = set()
+def parse_prof_courses(html: str, subjects=DEFAULT_SUBJECTS) -> list[str]:
+    """Course codes ("CS 210") mentioned on a professor page, sorted by subject and number.
+
+    `subjects` are the department's course prefixes; None or [] accepts
+    any prefix, taken from the ratings' class fields only.
+    """
+    codes: set = set()
 
     # 1) scan whole HTML text
-    _collect_courses_from_text(html, codes)
+    if subjects:
+        _collect_courses_from_text(html, codes, subjects)
 
-    # 2) try to parse embedded Next.js JSON and scan it too
-    script = soup.find("script", id="__NEXT_DATA__")
-    if script and script.string:
-        try:
-            data = json.loads(script.string)
-            _collect_courses_from_json(data, codes)
-        except Exception:
-            pass  # ignore parse errors
-
-    if codes:
-        nums_sorted = sorted(codes, key=lambda x: int(x))
-        prof["courses"] = [f"CS {n}" for n in nums_sorted]
-    else:
-        prof["courses"] = []
+    # 2) parse the embedded Next.js JSON (sliced out of the raw HTML, no DOM)
+    #    and scan its decoded strings too
+    data = script_json(html, "__NEXT_DATA__")
+    if data is not None:
+        _collect_courses_from_json(data, codes, subjects)
 
-    print(f"    courses found: {prof['courses']}")
-    time.sleep(delay)
+    return format_course_codes(codes)
 
 
 # ---------- HELPERS: PROFESSOR LIST FROM SEARCH PAGE ----------
 
-def parse_prof_card(a_tag) -> dict | None:
+def parse_prof_card(a_tag, department_name: str = DEFAULT_DEPARTMENT["name"]) -> dict | None:
     """
     Parse a professor card <a> element from the search page.
     Skip professors with 0 ratings.
@@ -158,12 +280,12 @@ def parse_prof_card(a_tag) -> dict | None:
     if m and m.group(1) != "N/A":
         difficulty = float(m.group(1))
 
-    # name: strip header and tail, grab between "ratings" and "Computer Science"
+    # name: strip header and tail, grab between "ratings" and the department
     name = None
     try:
         t = re.sub(r"^QUALITY\s+[0-9.]+\s+", "", text).strip()
         t = re.sub(r"^\d+\s+ratings?\s+", "", t).strip()
-        idx = t.index("Computer Science")
+        idx = t.index(department_name)
         name = t[:idx].strip()
     except ValueError:
         parts = text.split()
@@ -176,7 +298,7 @@ def parse_prof_card(a_tag) -> dict | None:
         "id": prof_id,
         "name": name,
         "url": url,
-        "department": "Computer Science",
+        "department": department_name,
         "overall_quality": quality,
         "overall_difficulty": difficulty,
         "num_ratings": num_ratings,
@@ -187,46 +309,32 @@ def parse_prof_card(a_tag) -> dict | None:
 
 def _collect_teacher_nodes(node, out_list: list[dict]):
     """
-    Recursively walk a JSON tree and collect "teacher-like" dicts.
+    Walk a JSON tree (iteratively, in document order) and collect
+    "teacher-like" dicts.
     Heuristic: objects that look like RMP teacher records.
     """
-    if isinstance(node, dict):
-        if (
-            "legacyId" in node
-            and "firstName" in node
-            and "lastName" in node
-            and "department" in node
-        ):
-            out_list.append(node)
-        for v in node.values():
-            _collect_teacher_nodes(v, out_list)
-    elif isinstance(node, list):
-        for v in node:
-            _collect_teacher_nodes(v, out_list)
+    for d in iter_dicts(node):
+        if "legacyId" in d and "firstName" in d and "lastName" in d and "department" in d:
+            out_list.append(d)
 
 
-def fetch_cs_professors_via_json(soup, max_profs: int | None) -> list[dict]:
+def fetch_professors_via_json(page, max_profs: int | None, department: dict = DEFAULT_DEPARTMENT) -> list[dict]:
     """
-    Try to read teacher list from embedded Next.js JSON.
+    Try to read the department's teacher list from embedded Next.js JSON.
+    `page` is the page HTML (a BeautifulSoup document is accepted too); the
+    script is located without building a DOM.
     Returns [] if nothing usable is found.
     Skips professors with 0 ratings.
     """
-    script = soup.find("script", id="__NEXT_DATA__")
-    if not script or not script.string:
+    html = page if isinstance(page, str) else str(page)
+    data = script_json(html, "__NEXT_DATA__")
+    if data is None:
         # Try any script that contains teacher-like JSON
-        for s in soup.find_all("script"):
-            if not s.string:
-                continue
-            if '"legacyId"' in s.string and '"department"' in s.string:
-                script = s
-                break
-
-    if not script or not script.string:
-        return []
+        for body in scripts_containing(html, '"legacyId"', '"department"'):
+            data = load_script_json(body)
+            break
 
-    try:
-        data = json.loads(script.string)
-    except Exception:
+    if data is None:
         return []
 
     teacher_nodes: list[dict] = []
@@ -235,13 +343,27 @@ def fetch_cs_professors_via_json(soup, max_profs: int | None) -> list[dict]:
         return []
 
     print(f"Found {len(teacher_nodes)} teacher nodes in JSON (before filtering).")
+    return professors_from_teacher_nodes(teacher_nodes, max_profs, source="JSON", department_name=department["name"])
 
+
+def professors_from_teacher_nodes(
+    teacher_nodes: list[dict],
+    max_profs: int | None,
+    source: str = "JSON",
+    seen_ids: set | None = None,
+    department_name: str = DEFAULT_DEPARTMENT["name"],
+) -> list[dict]:
+    """
+    Turn RMP teacher records (embedded JSON or GraphQL) into professor dicts.
+    Keeps only `department_name`, skips 0-rating instructors and ids in
+    `seen_ids` (which is updated).
+    """
     professors: list[dict] = []
-    seen_ids: set[int] = set()
+    seen_ids = set() if seen_ids is None else seen_ids
 
     for node in teacher_nodes:
         dept = node.get("department")
-        if dept != "Computer Science":
+        if dept != department_name:
             continue
 
         # skip 0-rating instructors
@@ -261,6 +383,10 @@ def fetch_cs_professors_via_json(soup, max_profs: int | None) -> list[dict]:
         last = (node.get("lastName") or "").strip()
         name = (first + " " + last).strip() or None
 
+        # RMP reports -1 when nobody answered "would take again"
+        wta = node.get("wouldTakeAgainPercent")
+        wta = round(wta) if isinstance(wta, (int, float)) and wta >= 0 else None
+
         prof = {
             "id": str(legacy_id),
             "name": name,
@@ -269,11 +395,11 @@ def fetch_cs_professors_via_json(soup, max_profs: int | None) -> list[dict]:
             "overall_quality": node.get("avgRating"),
             "overall_difficulty": node.get("avgDifficulty"),
             "num_ratings": num_ratings,
-            "would_take_again_percent": node.get("wouldTakeAgainPercent"),
+            "would_take_again_percent": wta,
             "courses": [],
         }
 
-        print(f"  discovered professor (JSON): {prof['name']} ({prof['id']})")
+        print(f"  discovered professor ({source}): {prof['name']} ({prof['id']})")
         professors.append(prof)
 
         if max_profs is not None and len(professors) >= max_profs:
@@ -282,28 +408,166 @@ def fetch_cs_professors_via_json(soup, max_profs: int | None) -> list[dict]:
     return professors
 
 
-def fetch_cs_professors_via_cards(driver, max_profs: int | None) -> list[dict]:
+def _graphql_id(kind: str, legacy_id: int) -> str:
+    return base64.b64encode(f"{kind}-{legacy_id}".encode()).decode()
+
+
+def _legacy_id(graphql_id: str) -> int | None:
+    try:
+        return int(base64.b64decode(graphql_id).decode().rsplit("-", 1)[1])
+    except (ValueError, IndexError, UnicodeDecodeError):
+        return None
+
+
+def fetch_school_departments(fetcher: Fetcher) -> list[dict]:
+    """
+    Every department RMP lists for the school, as department dicts.
+    Subjects come from DEFAULT_DEPARTMENTS where the id is known, else [].
+    """
+    known = {d["id"]: d for d in DEFAULT_DEPARTMENTS}
+    resp = fetcher.post(
+        GRAPHQL_URL,
+        json={"query": SCHOOL_DEPARTMENTS_QUERY, "variables": {"id": _graphql_id("School", SDSU_SCHOOL_ID)}},
+        headers=GRAPHQL_HEADERS,
+    )
+    departments = []
+    for node in resp.json()["data"]["node"]["departments"] or []:
+        dept_id = _legacy_id(node.get("id") or "")
+        if dept_id is None or not node.get("name"):
+            continue
+        subjects = known[dept_id]["subjects"] if dept_id in known else []
+        departments.append({"id": dept_id, "name": node["name"], "subjects": list(subjects)})
+    return departments
+
+
+def fetch_professors_via_graphql(
+    fetcher: Fetcher, max_profs: int | None, page_size: int = GRAPHQL_PAGE_SIZE, department: dict = DEFAULT_DEPARTMENT
+) -> list[dict]:
+    """
+    Page through the site's teacher search (the GraphQL endpoint its own
+    "Show More" button calls) with plain HTTP. Returns [] if the endpoint
+    is unavailable or answers with errors on any page, or if the pages end
+    before `resultCount` teachers were seen: the list becomes the
+    department's work list, so a partial one must not pass for complete.
+    """
+    variables = {
+        "count": page_size,
+        "cursor": "",
+        "query": {
+            "text": "",
+            "schoolID": _graphql_id("School", SDSU_SCHOOL_ID),
+            "departmentID": _graphql_id("Department", department["id"]),
+            "fallback": True,
+        },
+    }
+    professors: list[dict] = []
+    seen_ids: set = set()
+    seen_teachers: set = set()  # every teacher on the pages, before filtering
+    page = 0
+    while True:
+        page += 1
+        try:
+            resp = fetcher.post(
+                GRAPHQL_URL, json={"query": TEACHER_SEARCH_QUERY, "variables": variables}, headers=GRAPHQL_HEADERS
+            )
+            teachers = resp.json()["data"]["search"]["teachers"]
+        except Exception as e:
+            print(f"[WARN] GraphQL teacher search failed on page {page}: {e}")
+            return []
+        nodes = [edge["node"] for edge in teachers.get("edges") or [] if edge.get("node")]
+        seen_teachers.update(node.get("legacyId") or node.get("id") for node in nodes)
+        remaining = None if max_profs is None else max_profs - len(professors)
+        professors += professors_from_teacher_nodes(
+            nodes, remaining, source="GraphQL", seen_ids=seen_ids, department_name=department["name"]
+        )
+        info = teachers.get("pageInfo") or {}
+        if max_profs is not None and len(professors) >= max_profs:
+            return professors
+        if not info.get("hasNextPage") or not nodes:
+            total = teachers.get("resultCount")
+            if isinstance(total, int) and len(seen_teachers) < total:
+                print(f"[WARN] GraphQL teacher search ended after {len(seen_teachers)} of {total} teachers")
+                return []
+            return professors
+        variables["cursor"] = info.get("endCursor") or ""
+
+
+def fetch_professors_via_http(
+    fetcher: Fetcher, max_profs: int | None = None, department: dict = DEFAULT_DEPARTMENT
+) -> list[dict]:
+    """
+    Browser-free discovery:
+      1) page through the GraphQL teacher search;
+      2) if that yields nothing, read the JSON embedded in the search page.
+    """
+    name = department["name"]
+    professors = fetch_professors_via_graphql(fetcher, max_profs, department=department)
+    if professors:
+        print(f"Kept {len(professors)} {name} professors via GraphQL.")
+        return professors
+
+    url = search_url(department)
+    print(f"Loading RMP {name} search page over HTTP: {url}")
+    try:
+        html = fetcher.get(url).text
+    except Exception as e:
+        print(f"[WARN] error fetching {url}: {e}")
+        return []
+    professors = fetch_professors_via_json(html, max_profs=max_profs, department=department)
+    if professors:
+        print(f"Kept {len(professors)} {name} professors via embedded JSON.")
+    return professors
+
+
+def discover_professors(
+    fetcher: Fetcher, max_profs: int | None = None, mode: str = "auto", department: dict = DEFAULT_DEPARTMENT
+) -> list[dict]:
+    """
+    Build the department's professor list. `mode` is "http" (no browser),
+    "selenium", or "auto": HTTP first, headless Chrome only if that finds nobody.
+    """
+    if mode in ("auto", "http"):
+        professors = fetch_professors_via_http(fetcher, max_profs, department=department)
+        if professors or mode == "http":
+            return professors
+        print("[WARN] HTTP discovery found no professors; falling back to Selenium.")
+
+    driver = make_driver(headless=True)
+    try:
+        return fetch_professors_from_search(driver, max_profs=max_profs, department=department)
+    finally:
+        driver.quit()
+
+
+def fetch_professors_via_cards(
+    driver, max_profs: int | None, wait_timeout: float = CARD_WAIT_TIMEOUT, department: dict = DEFAULT_DEPARTMENT
+) -> list[dict]:
     """
     Fallback: scroll with 'Show More' and parse <a> cards.
     This is essentially your earlier working Selenium logic,
     but only to build the list (no course scraping here).
     parse_prof_card already skips 0-rating instructors.
+
+    Each round only parses cards added since the last one: the browser marks
+    cards it has handed over (data-scraped) and returns just the unmarked
+    ones' HTML, so paginating stays linear in the number of professors.
+    After a click it waits (up to `wait_timeout` seconds) for the card
+    count to grow instead of sleeping a fixed time.
     """
+    from selenium.common.exceptions import NoSuchElementException, TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+
     professors: list[dict] = []
     seen_ids: set[str] = set()
 
-    last_count = 0
     while True:
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        a_tags = soup.find_all("a", href=True)
+        new_cards = driver.execute_script(_TAKE_NEW_CARDS_JS)
 
         new_on_page = 0
-        for a in a_tags:
-            href = a.get("href", "")
-            if not href.startswith("/professor/"):
-                continue
-
-            card = parse_prof_card(a)
+        for html in new_cards:
+            a = BeautifulSoup(html, "html.parser").a
+            card = parse_prof_card(a, department["name"]) if a is not None else None
             if not card:
                 continue
 
@@ -322,10 +586,9 @@ def fetch_cs_professors_via_cards(driver, max_profs: int | None) -> list[dict]:
 
         print(f"Found {new_on_page} new professors on this page (total {len(professors)})")
 
-        if len(professors) == last_count:
-            print("Professor count did not increase; stopping pagination.")
+        if not new_cards:
+            print("No new professor cards; stopping pagination.")
             break
-        last_count = len(professors)
 
         try:
             show_more = driver.find_element(By.XPATH, "//button[contains(., 'Show More')]")
@@ -338,20 +601,33 @@ def fetch_cs_professors_via_cards(driver, max_profs: int | None) -> list[dict]:
             break
 
         print("Clicking 'Show More'...")
+        before = driver.execute_script(_COUNT_CARDS_JS)
         driver.execute_script("arguments[0].click();", show_more)
-        time.sleep(2.0)
+        try:
+            WebDriverWait(driver, wait_timeout, poll_frequency=0.1).until(
+                lambda d: d.execute_script(_COUNT_CARDS_JS) > before
+            )
+        except TimeoutException:
+            print(f"No new cards within {wait_timeout:.0f}s; assuming end of results.")
+            break
 
     return professors
 
 
-def fetch_cs_professors_from_search(driver, max_profs: int | None = None) -> list[dict]:
+def fetch_professors_from_search(driver, max_profs: int | None = None, department: dict = DEFAULT_DEPARTMENT) -> list[dict]:
     """
-    Use Selenium to load the SDSU CS search page, then:
+    Use Selenium to load the department's search page, then:
       1) Try JSON (__NEXT_DATA__ or similar) to get teacher list.
       2) If that fails, fall back to scrolling + parsing cards.
     """
-    print(f"Loading RMP CS search page: {SEARCH_URL}")
-    driver.get(SEARCH_URL)
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    name = department["name"]
+    url = search_url(department)
+    print(f"Loading RMP {name} search page: {url}")
+    driver.get(url)
 
     # give the page a moment to render
     try:
@@ -361,60 +637,235 @@ def fetch_cs_professors_from_search(driver, max_profs: int | None = None) -> lis
     except Exception:
         time.sleep(3)
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-
     # 1) try JSON-based extraction
-    professors = fetch_cs_professors_via_json(soup, max_profs=max_profs)
+    professors = fetch_professors_via_json(driver.page_source, max_profs=max_profs, department=department)
     if professors:
-        print(f"Kept {len(professors)} CS professors via JSON.")
+        print(f"Kept {len(professors)} {name} professors via JSON.")
         return professors
 
     print("[WARN] Could not extract teacher list from JSON; "
           "falling back to scrolling + parsing cards.")
 
     # 2) fallback: scroll + parse cards
-    professors = fetch_cs_professors_via_cards(driver, max_profs=max_profs)
-    print(f"Kept {len(professors)} CS professors via cards.")
+    professors = fetch_professors_via_cards(driver, max_profs=max_profs, department=department)
+    print(f"Kept {len(professors)} {name} professors via cards.")
     return professors
 
 
 # ---------- MAIN SCRAPER ----------
 
-def scrape_sdsu_cs(max_profs: int | None = None) -> list[dict]:
+def scrape_courses_concurrently(
+    professors: list[dict],
+    fetcher: Fetcher,
+    reparse: bool = False,
+    out: JsonlWriter | None = None,
+    subjects=DEFAULT_SUBJECTS,
+) -> list[dict]:
+    """Fill in `courses` for every professor, fetching pages on the fetcher's workers.
+
+    Each successfully scraped professor is appended to `out` as soon as it is
+    done; a page that can never be fetched (404) is recorded there as failed.
     """
-    Top-level:
-      1) Use Selenium to load the SDSU CS search page and build the CS professor list.
-      2) For each professor, scrape their courses via requests + JSON/regex.
-    """
-    driver = make_driver(headless=True)
-    try:
-        professors = fetch_cs_professors_from_search(driver, max_profs=max_profs)
-    finally:
-        driver.quit()
-
-    print("\nScraping courses for each professor...")
     total = len(professors)
-    for i, prof in enumerate(professors, start=1):
-        print(f"  [{i}/{total}] {prof['name']} ({prof['id']})")
-        scrape_prof_courses(prof)
-
+    started = time.perf_counter()
+
+    def failed(prof: dict, error: Exception):
+        reason = permanent_failure(error)
+        if reason and out is not None:
+            out.write(failed_record("id", prof["id"], reason))
+
+    def scrape(prof: dict):
+        ok = scrape_prof_courses(prof, fetcher=fetcher, reparse=reparse, subjects=subjects, on_error=failed)
+        if ok and out is not None:
+            out.write(prof)
+
+    for i, _ in enumerate(fetcher.map(scrape, professors), start=1):
+        if i % 10 == 0 or i == total:
+            print(f"  [{i}/{total}] professor pages done")
+    elapsed = time.perf_counter() - started
+    print(f"Fetched {total} professor pages in {elapsed:.1f}s ({fetcher.stats})")
+    if fetcher.cache is not None:
+        print(f"HTTP cache: {fetcher.cache.stats}")
     return professors
 
 
-# ---------- ENTRY POINT ----------
+def scrape_department(
+    department: dict = DEFAULT_DEPARTMENT,
+    max_profs: int | None = None,
+    workers: int = DEFAULT_WORKERS,
+    rate: float = DEFAULT_RATE,
+    cache: HttpCache | None = None,
+    reparse: bool = False,
+    checkpoint: ScrapeCheckpoint | None = None,
+    discovery: str = "auto",
+) -> list[dict]:
+    """
+    Top-level, for one department:
+      1) Build its professor list (see discover_professors; `discovery`
+         picks HTTP, Selenium, or HTTP with a Selenium fallback).
+      2) Scrape every professor's courses via requests + JSON/regex, `workers`
+         pages at a time and at most `rate` requests/second, revalidating
+         pages already in `cache` instead of downloading them again.
+
+    With a `checkpoint`, the professor list of an interrupted run is reused,
+    professors already in its JSONL stream are skipped and new ones are
+    streamed to it; only the professors scraped by this call are returned.
+    Write the output with `checkpoint.finish()`.
+    """
+    with Fetcher(workers=workers, rate=rate, cache=cache) as fetcher:
+        professors = checkpoint.load_pending() if checkpoint is not None else None
+        if professors is not None:
+            print(f"Resuming from {checkpoint.journal_path} ({len(professors)} professors)")
+        else:
+            professors = discover_professors(fetcher, max_profs=max_profs, mode=discovery, department=department)
+            if checkpoint is not None:
+                checkpoint.save_pending(professors)
+
+        if checkpoint is not None:
+            done = checkpoint.done_ids()
+            professors = [p for p in professors if p["id"] not in done]
+            if done:
+                print(f"Skipping {len(done)} professors finished by an earlier run")
+
+        print(f"\nScraping courses for each {department['name']} professor...")
+        with checkpoint.writer() if checkpoint is not None else nullcontext() as out:
+            return scrape_courses_concurrently(
+                professors, fetcher, reparse=reparse, out=out, subjects=department.get("subjects")
+            )
+
+
+def shard_prefix(department: dict, out_dir: Path = OUT_DIR) -> Path:
+    """Checkpoint prefix of a department; its shard is this path + ".json"."""
+    return out_dir / f"sdsu_{department_slug(department)}_professors"
+
+
+def crawl_department(
+    department: dict,
+    out_dir: Path = OUT_DIR,
+    fresh: bool = False,
+    cache_dir: Path | None = None,
+    max_age: float = 0.0,
+    **options,
+) -> dict:
+    """
+    Scrape one department into its shard (checkpointed; see scrape_department
+    for `options`). Runs in a worker process, so it takes and returns plain data:
+    {"department", "shard", "count", "missing", "failed"}.
+    """
+    prefix = shard_prefix(department, out_dir)
+    checkpoint = ScrapeCheckpoint(prefix)
+    if fresh:
+        checkpoint.discard()
+    cache = HttpCache(cache_dir, max_age=max_age) if cache_dir is not None else None
+    scrape_department(department, cache=cache, checkpoint=checkpoint, **options)
+
+    # keeps the checkpoint while some pages failed transiently, so a re-run
+    # retries just those (for a few runs; dead pages are recorded as failed)
+    shard = prefix.with_name(prefix.name + ".json")
+    result = checkpoint.finish(shard)
+    return {
+        "department": department,
+        "shard": str(shard),
+        "count": result["count"],
+        "missing": len(result["missing"]),
+        "failed": len(result["failed"]),
+    }
 
-if __name__ == "__main__":
-    # For debugging: small number like 10.
-    # For full department: set to None or 113.
-    MAX_PROFS = 115
 
-    profs = scrape_sdsu_cs(max_profs=MAX_PROFS)
+def crawl_departments(departments: list[dict], processes: int = 1, rate: float = DEFAULT_RATE, **options) -> list[dict]:
+    """
+    Crawl `departments` in up to `processes` worker processes (one department
+    per process at a time) and return crawl_department()'s results in input
+    order. `rate` is the total requests/second budget, divided among the
+    processes. A department that raises is reported and left for the next run.
+    """
+    processes = max(1, min(processes, len(departments)))
+    per_process = rate / processes if rate > 0 else rate
+    results: dict = {}
+    if processes == 1:
+        for i, dept in enumerate(departments):
+            try:
+                results[i] = result = crawl_department(dept, rate=per_process, **options)
+            except Exception as e:
+                print(f"[WARN] {dept['name']} failed: {e}")
+                continue
+            print(f"Finished {dept['name']}: {result['count']} professors -> {result['shard']}")
+        return [results[i] for i in sorted(results)]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(crawl_department, d, rate=per_process, **options): i for i, d in enumerate(departments)}
+        for future in as_completed(futures):
+            dept = departments[futures[future]]
+            try:
+                results[futures[future]] = result = future.result()
+            except Exception as e:
+                print(f"[WARN] {dept['name']} failed: {e}")
+                continue
+            print(f"Finished {dept['name']}: {result['count']} professors -> {result['shard']}")
+    return [results[i] for i in sorted(results)]
+
+
+def _merge_professors(a: dict, b: dict) -> dict:
+    merged = dict(a)
+    merged["courses"] = sorted(set(a.get("courses") or []) | set(b.get("courses") or []))
+    return merged
 
-    out_dir = Path(__file__).resolve().parent / "scraped_files"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / "sdsu_cs_professors.json"
 
-    with out_path.open("w", encoding="utf-8") as f:
-        json.dump(profs, f, indent=2, ensure_ascii=False)
+# ---------- ENTRY POINT ----------
 
-    print(f"\nWrote {len(profs)} professors to {out_path}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape SDSU professors from RateMyProfessors, by department.")
+    # For debugging: small number like 10. For the full department: 0 (no limit).
+    parser.add_argument("--max-profs", type=int, default=115, help="per department; 0 for no limit")
+    parser.add_argument(
+        "--department", action="append", type=parse_department, metavar="ID:NAME[:SUBJ,...]",
+        help="department to crawl (repeatable; default: Computer Science)",
+    )
+    parser.add_argument("--departments", choices=("all",), help="crawl every department RMP lists for the school")
+    parser.add_argument("--processes", type=int, default=4, help="departments crawled in parallel (worker processes)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent professor-page fetches per process")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="requests/second per host, all processes together (0 = unlimited)")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="download and parse every page")
+    parser.add_argument("--max-age", type=float, default=0.0, help="reuse cached pages younger than this many seconds without revalidating")
+    parser.add_argument("--reparse", action="store_true", help="parse pages even if their content is unchanged")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint of an interrupted run")
+    parser.add_argument(
+        "--discovery", choices=("auto", "http", "selenium"), default="auto",
+        help="how to list professors: plain HTTP, headless Chrome, or HTTP with a Chrome fallback",
+    )
+    parser.add_argument("--out", type=Path, default=OUT_DIR / "sdsu_professors.json", help="merged output (more than one department)")
+    args = parser.parse_args()
+
+    if args.departments == "all":
+        with Fetcher(rate=args.rate) as fetcher:
+            departments = fetch_school_departments(fetcher)
+        print(f"Found {len(departments)} departments")
+    else:
+        departments = args.department or DEFAULT_DEPARTMENTS
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    results = crawl_departments(
+        departments,
+        processes=args.processes,
+        rate=args.rate,
+        fresh=args.fresh,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        max_age=args.max_age,
+        max_profs=args.max_profs or None,
+        workers=args.workers,
+        reparse=args.reparse,
+        discovery=args.discovery,
+    )
+    for result in results:
+        print(f"\nWrote {result['count']} {result['department']['name']} professors to {result['shard']}")
+        if result["missing"]:
+            print(f"{result['missing']} professor pages failed; run again to retry them")
+        if result["failed"]:
+            print(f"{result['failed']} professor pages could not be scraped (see the shard's work-list entries)")
+    if len(departments) > 1:
+        count = merge_shards([Path(r["shard"]) for r in results], args.out, combine=_merge_professors)
+        print(f"\nMerged {count} professors from {len(results)} shards into {args.out}")
+    failed = len(departments) - len(results)
+    if failed:
+        print(f"{failed} departments failed; run again to retry them")
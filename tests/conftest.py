@@ -0,0 +1,95 @@
+"""Shared pytest fixtures: a local HTTP server that plays scripted responses.
+
+    def test_x(fixture_server):
+        fixture_server.route("GET", "/page", [(503, {}, b""), (200, {}, b"ok")])
+        url = fixture_server.url("/page")
+
+Each route answers with its responses in order and repeats the last one.
+A response may also be a callable taking (path, body) and returning one.
+Every request is recorded as (method, path, body, monotonic time).
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class FixtureServer:
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                path = self.path.split("?", 1)[0]
+                with server._lock:
+                    server.requests.append((method, self.path, body, time.monotonic()))
+                    responses = server.routes.get((method, path))
+                    if responses is None:
+                        response = (404, {}, b"not found")
+                    else:
+                        response = responses.pop(0) if len(responses) > 1 else responses[0]
+                if callable(response):
+                    response = response(self.path, body)
+                status, headers, payload = response
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._answer("GET")
+
+            def do_POST(self):
+                self._answer("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def route(self, method: str, path: str, responses) -> None:
+        with self._lock:
+            self.routes[(method, path)] = list(responses)
+
+    def hits(self, path: str) -> list:
+        return [r for r in self.requests if r[1].split("?", 1)[0] == path]
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def fixture_server():
+    server = FixtureServer()
+    yield server
+    server.close()
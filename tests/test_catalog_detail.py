@@ -0,0 +1,33 @@
+"""Catalog detail page parsing against a saved page and the served course records."""
+
+import json
+
+from conftest import FIXTURES, ROOT
+from scraper.catalog_scraper import COURSE_FIELDS, parse_course_detail
+
+
+def _served(code: str) -> dict:
+    courses = json.loads((ROOT / "utils" / "data" / "sdsu_cs_courses.json").read_text(encoding="utf-8"))
+    return next(c for c in courses if c["code"] == code)
+
+
+def test_saved_page_matches_served_record():
+    html = (FIXTURES / "catalog" / "cs_150_detail.html").read_text(encoding="utf-8")
+    parsed = parse_course_detail(html)
+    expected = {f: _served("CS 150")[f] for f in COURSE_FIELDS if f != "detail_url"}
+    assert parsed == expected
+
+
+def test_unlabeled_paragraph_after_label_is_description():
+    html = """
+    <td><h1 id="course_preview_title">CS 200 - Introduction to Data Science and Python</h1>
+    <strong>Units:</strong> 4<br><br>
+    <strong>Grading Method:</strong> LCR: Letter Grade with Cr/NC available.<br><br>
+    Basic data analysis with Python.<br>Data structures and programming constructs.<br><br>
+    <strong>Typically Offered:</strong> Spring</td>
+    """
+    parsed = parse_course_detail(html)
+    assert parsed["grading_method"] == "LCR: Letter Grade with Cr/NC available."
+    assert parsed["description"] == "Basic data analysis with Python. Data structures and programming constructs."
+    assert parsed["typically_offered"] == "Spring"
+    assert parsed["prereqs"] is None
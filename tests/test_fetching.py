@@ -0,0 +1,76 @@
+"""Fetcher against a local fixture server: rate limit, retries, Retry-After."""
+
+import time
+
+import pytest
+import requests
+
+from scraper import fetching
+from scraper.fetching import Fetcher, permanent_failure
+
+
+OK = (200, {}, b"ok")
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    # keep exponential backoff out of the timings; Retry-After is tested explicitly
+    monkeypatch.setattr(fetching, "BACKOFF", 0.01)
+
+
+def test_rate_limit_spaces_requests(fixture_server):
+    fixture_server.route("GET", "/page", [OK])
+    urls = [fixture_server.url(f"/page?n={i}") for i in range(8)]
+    with Fetcher(workers=4, rate=20, burst=1) as fetcher:
+        started = time.monotonic()
+        results = [resp.status_code for _, resp in fetcher.map(fetcher.get, urls)]
+        elapsed = time.monotonic() - started
+    assert results == [200] * 8
+    # one token up front, then one every 1/20 s
+    assert elapsed >= 7 / 20 * 0.9
+    times = sorted(t for *_, t in fixture_server.hits("/page"))
+    assert min(b - a for a, b in zip(times, times[1:])) >= 1 / 20 * 0.5
+
+
+def test_unlimited_rate_does_not_wait(fixture_server):
+    fixture_server.route("GET", "/page", [OK])
+    with Fetcher(workers=4, rate=0) as fetcher:
+        for _ in range(5):
+            fetcher.get(fixture_server.url("/page"))
+        assert fetcher.stats["throttled_s"] == 0
+
+
+def test_transient_errors_are_retried(fixture_server):
+    fixture_server.route("GET", "/flaky", [(503, {}, b""), (502, {}, b""), OK])
+    with Fetcher(rate=0, retries=3) as fetcher:
+        resp = fetcher.get(fixture_server.url("/flaky"))
+        assert resp.text == "ok"
+        assert fetcher.stats["retries"] == 2
+        assert fetcher.stats["failures"] == 0
+    assert len(fixture_server.hits("/flaky")) == 3
+
+
+def test_retries_are_bounded(fixture_server):
+    fixture_server.route("GET", "/down", [(503, {}, b"")])
+    with Fetcher(rate=0, retries=2) as fetcher:
+        with pytest.raises(requests.HTTPError):
+            fetcher.get(fixture_server.url("/down"))
+        assert fetcher.stats["failures"] == 1
+    assert len(fixture_server.hits("/down")) == 3
+
+
+def test_retry_after_is_honored(fixture_server):
+    fixture_server.route("GET", "/busy", [(429, {"Retry-After": "0.4"}, b""), OK])
+    with Fetcher(rate=0, retries=1) as fetcher:
+        assert fetcher.get(fixture_server.url("/busy")).status_code == 200
+    first, second = (t for *_, t in fixture_server.hits("/busy"))
+    assert second - first >= 0.4
+
+
+def test_not_found_is_permanent_and_not_retried(fixture_server):
+    fixture_server.route("GET", "/gone", [(404, {}, b"")])
+    with Fetcher(rate=0, retries=3) as fetcher:
+        with pytest.raises(requests.HTTPError) as info:
+            fetcher.get(fixture_server.url("/gone"))
+    assert permanent_failure(info.value) == "HTTP 404"
+    assert len(fixture_server.hits("/gone")) == 1
@@ -0,0 +1,27 @@
+"""Memoized parse results of the HTTP cache."""
+
+from scraper.fetching import Fetcher
+from scraper.http_cache import HttpCache
+
+
+def _parse_calls(fixture_server, tmp_path, versions):
+    fixture_server.route("GET", "/page", [(200, {"ETag": '"v1"'}, b"<p>same body</p>")])
+    calls = []
+
+    def parse(html):
+        calls.append(html)
+        return len(html)
+
+    cache = HttpCache(tmp_path)
+    with Fetcher(rate=0, retries=0, cache=cache) as fetcher:
+        for version in versions:
+            assert cache.parsed(fetcher.get(fixture_server.url("/page")), parse, "parse", version) == 16
+    return len(calls)
+
+
+def test_unchanged_page_is_parsed_once(fixture_server, tmp_path):
+    assert _parse_calls(fixture_server, tmp_path, ["1", "1", "1"]) == 1
+
+
+def test_new_parser_version_reparses(fixture_server, tmp_path):
+    assert _parse_calls(fixture_server, tmp_path, ["1", "2", "2", "1"]) == 3
@@ -0,0 +1,103 @@
+"""RMP professor discovery offline, against saved GraphQL and __NEXT_DATA__ responses."""
+
+import json
+
+import pytest
+
+from conftest import FIXTURES
+from scraper import rmp_scraper
+from scraper.fetching import Fetcher
+
+
+RMP = FIXTURES / "rmp"
+CS = {"id": 11, "name": "Computer Science", "subjects": ["CS"]}
+
+
+def _page(name: str) -> bytes:
+    return (RMP / name).read_bytes()
+
+
+def _graphql(path, body):
+    """Answer the teacher search by cursor, like the real endpoint."""
+    cursor = json.loads(body)["variables"]["cursor"]
+    page = "graphql_teachers_page1.json" if not cursor else "graphql_teachers_page2.json"
+    return 200, {"Content-Type": "application/json"}, _page(page)
+
+
+@pytest.fixture
+def rmp(fixture_server, monkeypatch):
+    monkeypatch.setattr(rmp_scraper, "BASE_URL", fixture_server.base_url)
+    monkeypatch.setattr(rmp_scraper, "GRAPHQL_URL", fixture_server.url("/graphql"))
+    return fixture_server
+
+
+@pytest.fixture
+def fetcher():
+    with Fetcher(rate=0, retries=0) as f:
+        yield f
+
+
+def test_graphql_pages_filter_and_dedupe(rmp, fetcher):
+    rmp.route("POST", "/graphql", [_graphql])
+    profs = rmp_scraper.fetch_professors_via_graphql(fetcher, None, department=CS)
+
+    # Mathematics and the 0-rating instructor are dropped; page 2 repeats 2002
+    assert [p["id"] for p in profs] == ["2001", "2002", "2005", "2006"]
+    assert {p["department"] for p in profs} == {"Computer Science"}
+    first = profs[0]
+    assert first["name"] == "Ada Lovelace"
+    assert first["url"] == f"{rmp.base_url}/professor/2001"
+    assert (first["overall_quality"], first["overall_difficulty"], first["num_ratings"]) == (4.6, 3.1, 42)
+    assert first["would_take_again_percent"] == 88
+    assert profs[1]["would_take_again_percent"] is None  # -1: nobody answered
+
+    requests = [json.loads(body)["variables"] for _, _, body, _ in rmp.hits("/graphql")]
+    assert [v["cursor"] for v in requests] == ["", "YXJyYXljb25uZWN0aW9uOjM="]
+    assert requests[0]["query"]["departmentID"] == rmp_scraper._graphql_id("Department", 11)
+
+
+def test_graphql_stops_at_max_profs(rmp, fetcher):
+    rmp.route("POST", "/graphql", [_graphql])
+    profs = rmp_scraper.fetch_professors_via_graphql(fetcher, 2, department=CS)
+    assert [p["id"] for p in profs] == ["2001", "2002"]
+    assert len(rmp.hits("/graphql")) == 1
+
+
+def test_department_filter_uses_department_name(rmp, fetcher):
+    rmp.route("POST", "/graphql", [_graphql])
+    math = {"id": 17, "name": "Mathematics", "subjects": ["MATH"]}
+    profs = rmp_scraper.fetch_professors_via_graphql(fetcher, None, department=math)
+    assert [(p["id"], p["department"]) for p in profs] == [("2003", "Mathematics")]
+
+
+def test_next_data_fallback_when_graphql_fails(rmp, fetcher):
+    rmp.route("POST", "/graphql", [(500, {}, b"")])
+    rmp.route("GET", "/search/professors/877", [(200, {"Content-Type": "text/html"}, _page("search_computer_science.html"))])
+    profs = rmp_scraper.fetch_professors_via_http(fetcher, department=CS)
+
+    assert [p["id"] for p in profs] == ["2001", "2002", "2005"]
+    assert rmp.hits("/search/professors/877")[0][1].endswith("did=11")
+
+
+def test_failure_after_first_page_falls_back(rmp, fetcher):
+    first = _graphql("/graphql", json.dumps({"variables": {"cursor": ""}}))
+    rmp.route("POST", "/graphql", [first, (500, {}, b"")])
+    rmp.route("GET", "/search/professors/877", [(200, {"Content-Type": "text/html"}, _page("search_computer_science.html"))])
+
+    assert rmp_scraper.fetch_professors_via_graphql(fetcher, None, department=CS) == []
+    profs = rmp_scraper.fetch_professors_via_http(fetcher, department=CS)
+    assert [p["id"] for p in profs] == ["2001", "2002", "2005"]
+
+
+def test_pages_short_of_result_count_are_rejected(rmp, fetcher):
+    short = json.loads(_page("graphql_teachers_page1.json"))
+    short["data"]["search"]["teachers"]["pageInfo"]["hasNextPage"] = False
+    rmp.route("POST", "/graphql", [(200, {"Content-Type": "application/json"}, json.dumps(short).encode())])
+    assert rmp_scraper.fetch_professors_via_graphql(fetcher, None, department=CS) == []
+
+
+def test_next_data_parsing_skips_zero_ratings():
+    html = (RMP / "search_computer_science.html").read_text(encoding="utf-8")
+    profs = rmp_scraper.fetch_professors_via_json(html, None, department=CS)
+    assert "2004" not in {p["id"] for p in profs}
+    assert all(p["num_ratings"] > 0 for p in profs)
@@ -0,0 +1,309 @@
+"""Admission control and load shedding for the expensive API endpoints.
+
+The LLM-backed routes (`/llm`, `/rag`) and vector-store writes can take
+seconds per request. Without a cap, a burst of them occupies every worker
+thread and everything - including cheap catalog lookups - slows down together.
+
+This module provides:
+
+- TokenBucket / ClientRateLimiter - per-client request rate limiting
+- ConcurrencyLimiter - at most `limit` requests in flight per endpoint, with a
+  bounded wait queue and a queue timeout
+- AdmissionMiddleware - ASGI middleware that applies the above per route and
+  answers over-capacity requests immediately with 429/503 + `Retry-After`
+
+Routes without a policy (the catalog reads) bypass admission entirely. The
+middleware also makes sure the threadpool that runs sync endpoints has
+`reserved_threads` more slots than the limited routes can ever take, so catalog
+reads always find a free thread (the "priority lane").
+
+Configuration is read from the environment by `policies_from_env()`:
+
+- ADMISSION_ENABLED            (default "1")
+- LLM_MAX_CONCURRENCY / LLM_MAX_QUEUE     (default 4 / 8)
+- RAG_MAX_CONCURRENCY / RAG_MAX_QUEUE     (default 4 / 8)
+- CHROMA_WRITE_MAX_CONCURRENCY / CHROMA_WRITE_MAX_QUEUE (default 2 / 4)
+- ADMISSION_QUEUE_TIMEOUT      seconds a request may wait for a slot (default 5)
+- RATE_LIMIT_PER_MINUTE / RATE_LIMIT_BURST  per-client budget for limited routes
+  (default 0 = off / 10)
+- RATE_LIMIT_CLIENT_HEADER     header that identifies the client, e.g.
+  X-Forwarded-For; only set it behind a proxy that overwrites the header
+  (default: the peer address)
+- ADMISSION_RESERVED_THREADS   threads kept free for unlimited routes (default 8)
+
+The per-client limit is off by default: behind a reverse proxy or a campus
+NAT every request comes from the same peer address, and one shared budget of
+a few requests per minute would throttle all users together. Enable it with
+RATE_LIMIT_CLIENT_HEADER pointing at the proxy's client header, or when the
+server is reached directly.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+logger = logging.getLogger("api_server.admission")
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now: Optional[float] = None) -> float:
+        """Take one token. Returns 0.0 on success, else seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class ClientRateLimiter:
+    """One TokenBucket per client key, with LRU eviction to bound memory."""
+
+    def __init__(self, rate_per_minute: float, burst: float, max_clients: int = 10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client: str) -> float:
+        """Return 0.0 if `client` may proceed, else the suggested retry delay."""
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[client] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            return bucket.try_acquire()
+
+
+class EndpointPolicy:
+    """Capacity settings for one route."""
+
+    def __init__(self, limit: int, max_queue: int = 0, queue_timeout: float = 5.0):
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        self.limit = limit
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+
+
+class ConcurrencyLimiter:
+    """Bounded concurrency with a bounded FIFO-ish wait queue.
+
+    `acquire()` returns False instead of waiting when the queue is full or the
+    wait exceeds the policy's queue timeout. The limiter also tracks an EWMA
+    of service time so rejections can carry a realistic `Retry-After`.
+    """
+
+    def __init__(self, policy: EndpointPolicy):
+        self.policy = policy
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_service_time = 1.0
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # created lazily so it binds to the server's running loop
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.policy.limit)
+        return self._sem
+
+    async def acquire(self) -> bool:
+        sem = self._semaphore()
+        if self.in_flight < self.policy.limit and self.waiting == 0:
+            await sem.acquire()
+            self.in_flight += 1
+            return True
+        if self.waiting >= self.policy.max_queue:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(sem.acquire(), timeout=self.policy.queue_timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self, service_time: float) -> None:
+        self.in_flight -= 1
+        self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * service_time
+        self._semaphore().release()
+
+    def retry_after(self) -> int:
+        """Rough estimate of how long until a slot frees up, in whole seconds."""
+        backlog = self.waiting + 1
+        return max(1, math.ceil(self.avg_service_time * backlog / self.policy.limit))
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", name, os.getenv(name))
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", name, os.getenv(name))
+        return default
+
+
+def policies_from_env() -> Dict[str, EndpointPolicy]:
+    """Build the default per-route policies, honoring environment overrides."""
+    timeout = _env_float("ADMISSION_QUEUE_TIMEOUT", 5.0)
+    llm = EndpointPolicy(_env_int("LLM_MAX_CONCURRENCY", 4), _env_int("LLM_MAX_QUEUE", 8), timeout)
+    rag = EndpointPolicy(_env_int("RAG_MAX_CONCURRENCY", 4), _env_int("RAG_MAX_QUEUE", 8), timeout)
+    writes = EndpointPolicy(
+        _env_int("CHROMA_WRITE_MAX_CONCURRENCY", 2), _env_int("CHROMA_WRITE_MAX_QUEUE", 4), timeout
+    )
+    return {
+        "/llm": llm,
+        "/rag": rag,
+        "/chroma/add": writes,
+        "/chroma/add_batch": writes,
+    }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying rate limits and concurrency caps per route.
+
+    Routes that share an `EndpointPolicy` instance share one limiter. Settings
+    left as None are read from the environment (see the module docstring).
+    """
+
+    def __init__(
+        self,
+        app,
+        policies: Optional[Dict[str, EndpointPolicy]] = None,
+        rate_limiter: Optional[ClientRateLimiter] = None,
+        reserved_threads: Optional[int] = None,
+        client_header: Optional[str] = None,
+        rate_limit_per_minute: Optional[float] = None,
+    ):
+        self.app = app
+        policies = policies_from_env() if policies is None else policies
+        by_policy: Dict[int, ConcurrencyLimiter] = {}
+        self.limiters: Dict[str, ConcurrencyLimiter] = {}
+        for path, policy in policies.items():
+            limiter = by_policy.setdefault(id(policy), ConcurrencyLimiter(policy))
+            self.limiters[path] = limiter
+        if rate_limiter is None:
+            per_minute = rate_limit_per_minute
+            if per_minute is None:
+                per_minute = _env_float("RATE_LIMIT_PER_MINUTE", 0)
+            if per_minute > 0:
+                rate_limiter = ClientRateLimiter(per_minute, _env_float("RATE_LIMIT_BURST", 10))
+        self.rate_limiter = rate_limiter
+        if client_header is None:
+            client_header = os.getenv("RATE_LIMIT_CLIENT_HEADER", "")
+        self.client_header = client_header.strip().lower().encode("latin-1") or None
+        self.reserved_threads = (
+            _env_int("ADMISSION_RESERVED_THREADS", 8) if reserved_threads is None else reserved_threads
+        )
+        self._threads_sized = False
+
+    def _size_threadpool(self) -> None:
+        """Grow the sync-endpoint threadpool so limited routes can't exhaust it."""
+        self._threads_sized = True
+        try:
+            import anyio.to_thread
+
+            total = sum({id(l): l.policy.limit for l in self.limiters.values()}.values())
+            thread_limiter = anyio.to_thread.current_default_thread_limiter()
+            wanted = total + self.reserved_threads
+            if thread_limiter.total_tokens < wanted:
+                thread_limiter.total_tokens = wanted
+        except Exception:
+            logger.exception("Could not resize the endpoint threadpool")
+
+    def _client_key(self, scope) -> str:
+        """The configured client header if present, else the peer address.
+
+        For a list header (X-Forwarded-For) the last entry is used: it was
+        appended by the trusted proxy, while earlier ones come from the client.
+        """
+        if self.client_header is not None:
+            values = [v for k, v in scope.get("headers", ()) if k == self.client_header]
+            forwarded = values[-1].decode("latin-1").rsplit(",", 1)[-1].strip() if values else ""
+            if forwarded:
+                return forwarded
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    async def _reject(send, status: int, retry_after: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", str(retry_after).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if not self._threads_sized:
+            self._size_threadpool()
+
+        limiter = self.limiters.get(scope.get("path", ""))
+        if limiter is None or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.check(self._client_key(scope))
+            if wait > 0:
+                await self._reject(send, 429, max(1, math.ceil(wait)), "Rate limit exceeded")
+                return
+
+        if not await limiter.acquire():
+            logger.warning("Shedding %s: %d in flight, %d queued", scope.get("path"), limiter.in_flight, limiter.waiting)
+            await self._reject(send, 503, limiter.retry_after(), "Server is at capacity, retry later")
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started)
+
+
+def admission_enabled() -> bool:
+    return os.getenv("ADMISSION_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
@@ -5,32 +5,113 @@ http://127.0.0.1:8000/
 
 Endpoints:
 - GET  /health
-- GET  /courses               (query params: prefix)
-- GET  /courses/search        (query param: q)
+- GET  /metrics               (Prometheus text format)
+- GET  /courses               (query params: prefix, limit, cursor, fields)
+- GET  /courses/search        (query params: q, limit, cursor, fields)
 - GET  /courses/{code}
+- GET  /courses/{code}/similar (query param: k)
+- GET  /courses/{code}/professors (query param: limit)
+- GET  /professors            (query params: course, q, min_ratings, limit, cursor, fields)
+- GET  /professors/{id}
 - POST /chroma/add            (json: {collection, document})
 - POST /chroma/query          (json: {collection, query, n_results})
 - POST /llm                   (json: {system_prompt?, message})
-- POST /rag                   (json: {message})
+- POST /rag                   (json: {message, expand_parents?})
+- POST /chroma/add_batch      (json: {collection, documents, background?})
+- GET  /admin/profiles        (header: X-Admin-Token)
+- GET  /admin/profiles/{id}   (header: X-Admin-Token)
+- POST /admin/jobs/rebuild-index   (header: X-Admin-Token)
+- POST /admin/jobs/reload-catalog  (header: X-Admin-Token)
+- GET  /admin/jobs            (header: X-Admin-Token; query param: status)
+- GET  /jobs/{id}
+- POST /jobs/{id}/cancel      (header: X-Admin-Token)
 
 This module uses FastAPI. If FastAPI/uvicorn aren't installed yet, the
 module is still importable for static checks; to run the server install
 requirements and run `uvicorn api_server:app --reload`.
+
+Listing endpoints are paginated: the body stays a JSON list, and the cursor for
+the next page (if any) is returned in the `X-Next-Cursor` response header. Pass
+it back as `?cursor=` to continue. `fields=code,name` limits each course to the
+given keys.
+
+Professors (utils/professor_db.py) are ranked by a Bayesian-adjusted blend of
+RateMyProfessors quality, would-take-again and difficulty, precomputed on
+load: /professors lists them best first and /courses/{code}/professors ranks
+the professors of one course, so "who is the best-rated professor for X"
+needs no LLM call.
+
+`/llm`, `/rag` and the chroma write routes go through admission control (see
+utils/admission.py): requests over capacity get a fast 429/503 with a
+`Retry-After` header instead of queueing indefinitely.
+
+Admins can profile a single request by sending `X-Profile: 1` together with
+`X-Admin-Token` (see utils/profiling.py); the report id comes back in the
+`X-Profile-Id` header and can be read from /admin/profiles/{id}.
+
+Set VECTOR_BACKEND=numpy to serve retrieval from the precomputed embeddings
+in utils/index (utils/numpy_store.py) instead of chromadb.
+
+DEPLOY_MODE=multiprocess makes the app safe to run with several worker
+processes (`gunicorn -c gunicorn.conf.py utils.api_server:app`): the vector
+index is built once under a file lock and opened read-only by every worker
+(utils/deploy.py), so the chroma write routes return 409.
+
+/rag retrieves field-aware chunks (utils/chunking.py) and puts only the matched
+sections of the top RAG_N_RESULTS parent records into the prompt; pass
+`"expand_parents": true` to send the full parent records instead.
+
+Long-running maintenance runs as background jobs (utils/jobs.py). Those
+endpoints return 202 with a job id right away; poll /jobs/{id} for status and
+progress. `/chroma/add_batch` does the same with `"background": true`.
+
+Setting CAPTURE_DIR records scrubbed request bodies and per-stage timings of
+/rag, /llm, /courses/search and /chroma/query for replay (utils/capture.py).
 """
 from __future__ import annotations
 
 
 from typing import Any, Dict, List, Optional
 import logging
+import os
+
+# Pagination defaults for the course listing endpoints
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# Documents retrieved per /rag question; tune with benchmarks/retrieval_eval.py
+RAG_N_RESULTS = int(os.getenv("RAG_N_RESULTS", "5"))
+# Chunks retrieved per /rag question before grouping them by parent document
+RAG_N_CHUNKS = int(os.getenv("RAG_N_CHUNKS", "10"))
+# Documents embedded per step of a background ingest job (progress / cancel granularity)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+# Vector store implementation: "chroma" (ChromaVectorStore) or "numpy"
+# (NumpyVectorStore over the prebuilt, memory-mapped utils/index)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").strip().lower()
 # Lazy import pattern: imports that require third-party packages are executed
 # inside create_app so the module can be imported by static tools without
 # immediately needing installed dependencies.
 
 
-def create_app() -> "FastAPI":
-    """Create and return a FastAPI app wired to the project's utilities."""
+def create_app(
+    course_db: Any = None,
+    chroma: Any = None,
+    llm: Any = None,
+    professor_db: Any = None,
+    admission: Optional[Dict[str, Any]] = None,
+) -> "FastAPI":
+    """Create and return a FastAPI app wired to the project's utilities.
+
+    `course_db`, `chroma`, `llm` and `professor_db` override the default service instances
+    (used by the benchmarks and tools to run the app in-process against
+    synthetic data and a stubbed LLM). Injected vector stores are used as-is
+    and not auto-populated. `admission` is passed to AdmissionMiddleware as
+    keyword arguments, overriding its environment settings for this app only.
+    """
     try:
-        from fastapi import FastAPI, HTTPException
+        from fastapi import FastAPI, Header, HTTPException, Query
+        from fastapi.responses import JSONResponse, PlainTextResponse
         from fastapi.middleware.cors import CORSMiddleware
         from pydantic import BaseModel
     except Exception as e:  # pragma: no cover - helpful error when deps missing
@@ -41,32 +122,62 @@ def create_app() -> "FastAPI":
 
     # local imports from utils
     from utils.course_db import CourseDB
+    from utils.professor_db import ProfessorDB
+    from utils.chunking import format_context, group_by_parent
+    from utils.deploy import LazyStore, ensure_index, multiprocess_enabled, open_store, store_version
+    from utils.jobs import FINISHED, JobManager
+    from utils.course_similarity import load_index as load_similarity
+    from utils import metrics
+    from utils.profiling import ProfileStore, ProfilingMiddleware, is_admin, profiled
     # chroma may require optional third-party deps; import safely
-    try:
-        from utils.chroma import ChromaVectorStore
-    except Exception:
-        ChromaVectorStore = None
+    ChromaVectorStore = None
+    if chroma is None:
+        try:
+            if VECTOR_BACKEND == "numpy":
+                from utils.numpy_store import NumpyVectorStore as ChromaVectorStore
+            else:
+                from utils.chroma import ChromaVectorStore
+        except Exception:
+            ChromaVectorStore = None
     # llm module may or may not instantiate a workable client depending on env
-    try:
-        from utils.llm import lite_llm
-    except Exception:
-        lite_llm = None
+    lite_llm = llm
+    if lite_llm is None:
+        try:
+            from utils.llm import lite_llm
+        except Exception:
+            lite_llm = None
 
     app = FastAPI(title="AztecPlanner API", version="0.1")
 
-    # Configure a dedicated logger for this module. Prefer propagation so
-    # Uvicorn's configured handlers display the messages. Only add a local
-    # handler when no root handlers exist (e.g., running standalone).
+    # Route all logging through the non-blocking queue listener (idempotent).
+    from utils.log import dropped_records, log_payload, setup_logging
+    setup_logging()
     logger = logging.getLogger("api_server")
-    logger.setLevel(logging.INFO)
-    # If there are no handlers on the root logger, add one so logs appear
-    # when running the module directly (outside of Uvicorn's logging).
-    if not logging.getLogger().handlers:
-        handler = logging.StreamHandler()
-        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
-        logger.addHandler(handler)
-    # Allow messages to propagate to parent handlers (Uvicorn's handlers)
-    logger.propagate = True
+
+    # Opt-in per-request profiling (admin only); innermost so it only wraps
+    # requests that were actually admitted.
+    profile_store = ProfileStore()
+    app.add_middleware(ProfilingMiddleware, store=profile_store)
+
+    # Shed load on the expensive routes before it reaches the worker threads.
+    # Added before CORS so that 429/503 rejections still carry CORS headers.
+    from utils.admission import AdmissionMiddleware, admission_enabled
+    if admission_enabled():
+        app.add_middleware(AdmissionMiddleware, **(admission or {}))
+
+    # Opt-in traffic capture for replay (CAPTURE_DIR); outside admission so
+    # the captured latency includes queueing and shed requests are recorded.
+    from utils.capture import CaptureMiddleware, writer_from_env
+    capture_writer = writer_from_env()
+    if capture_writer is not None:
+        app.add_middleware(
+            CaptureMiddleware,
+            writer=capture_writer,
+            sample_rate=float(os.getenv("CAPTURE_SAMPLE_RATE", "1.0")),
+        )
+
+    # Per-route latency/status metrics; wraps admission so shed requests count too
+    app.add_middleware(metrics.MetricsMiddleware, router=app.router)
 
     # Allow local front-end to call the API during development
     app.add_middleware(
@@ -75,6 +186,7 @@ def create_app() -> "FastAPI":
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count"],
     )
 
     # --- simple pydantic models ---
@@ -96,7 +208,10 @@ def create_app() -> "FastAPI":
         n_results: Optional[int] = 3
 
     # --- initialize service instances ---
-    course_db = CourseDB()  # uses utils/data/sdsu_cs_courses.json by default
+    if course_db is None:
+        course_db = CourseDB()  # uses utils/data/sdsu_cs_courses.json by default
+    if professor_db is None:
+        professor_db = ProfessorDB()
 
     # Provide a lightweight dummy fallback when chroma isn't available so
     # the API can still start for endpoints that don't require vectors.
@@ -110,6 +225,12 @@ def create_app() -> "FastAPI":
         def query_similar_documents(self, query_text, n_results, collection_name):
             return []
 
+        def query_chunks(self, query_text, n_results, collection_name):
+            return []
+
+        def get_parent(self, parent_id):
+            return None
+
         def clear_collection(self, collection_name):
             raise RuntimeError("Chroma client not available in this environment")
 
@@ -119,11 +240,24 @@ def create_app() -> "FastAPI":
         def populate_from_dir(self, data_dir, collection_name="allData", force=False):
             return
 
-    if ChromaVectorStore is None:
+        def collection_sizes(self):
+            return {}
+
+    if chroma is not None:
+        pass  # injected by the caller; used as-is
+    elif ChromaVectorStore is None:
         chroma = _DummyChroma()
         logging.getLogger("api_server").warning(
             "ChromaVectorStore not importable; running with dummy chroma (vector features disabled)"
         )
+    elif multiprocess_enabled():
+        # Build the shared index once (file-locked, skipped when up to date)
+        # and open it read-only, lazily, in each worker process.
+        try:
+            ensure_index(VECTOR_BACKEND)
+        except Exception:
+            logging.getLogger("api_server").exception("Failed to build the shared vector index")
+        chroma = LazyStore(lambda: open_store(VECTOR_BACKEND), version=lambda: store_version(VECTOR_BACKEND))
     else:
         try:
             chroma = ChromaVectorStore()
@@ -131,17 +265,42 @@ def create_app() -> "FastAPI":
             logging.getLogger("api_server").exception("Failed to initialize ChromaVectorStore; using dummy fallback")
             chroma = _DummyChroma()
 
-    # Auto-populate chroma from utils/data if possible (no-op for dummy)
-    try:
-        from pathlib import Path
-        data_dir = Path(__file__).parent / "data"
-        if hasattr(chroma, "populate_from_dir"):
-            chroma.populate_from_dir(data_dir, collection_name="allData")
-    except Exception:
-        logger = logging.getLogger("api_server")
-        logger.exception("Failed to auto-populate Chroma DB from utils/data")
+        # Auto-populate chroma from utils/data if possible
+        try:
+            from pathlib import Path
+            data_dir = Path(__file__).parent / "data"
+            if hasattr(chroma, "populate_from_dir"):
+                chroma.populate_from_dir(data_dir, collection_name="allData")
+        except Exception:
+            logger = logging.getLogger("api_server")
+            logger.exception("Failed to auto-populate Chroma DB from utils/data")
+
+    jobs = JobManager()
+    app.state.jobs = jobs
+    # precomputed course kNN (utils/course_similarity.py), swapped on catalog
+    # reload; None until it has been built
+    app.state.similarity = load_similarity()
+
+    log_drops = metrics.gauge("log_records_dropped", "Log records dropped because the log queue was full")
+    job_counts = metrics.gauge("background_jobs", "Background jobs by status", ("status",))
+
+    def _collect_metrics() -> None:
+        log_drops.set(dropped_records())
+        metrics.record_cache("course_projection", course_db.projection_hits, course_db.projection_misses)
+        for status, n in jobs.counts().items():
+            job_counts.set(n, status=status)
+        if hasattr(chroma, "collection_sizes"):
+            for name, size in chroma.collection_sizes().items():
+                metrics.VECTOR_COLLECTION_SIZE.set(size, collection=name)
+
+    metrics.REGISTRY.add_collector("api_server", _collect_metrics)
+
+    @app.get("/metrics")
+    def get_metrics():
+        return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
     @app.get("/health")
+    @profiled
     def health() -> Dict[str, Any]:
         return {
             "status": "ok",
@@ -149,26 +308,195 @@ def create_app() -> "FastAPI":
             "chroma_collections": ["allClasses", "rateMyProfClasses"],
         }
 
+    # --- admin: profiling reports ---
+    def _require_admin(token: Optional[str]) -> None:
+        if not is_admin(token):
+            raise HTTPException(status_code=403, detail="Admin token required")
+
+    @app.get("/admin/profiles")
+    def list_profiles(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+        _require_admin(x_admin_token)
+        return {"profiles": profile_store.list_ids()}
+
+    @app.get("/admin/profiles/{profile_id}")
+    def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+        _require_admin(x_admin_token)
+        report = profile_store.read(profile_id)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return PlainTextResponse(report)
+
+    # --- background jobs ---
+    def _accepted(job):
+        return JSONResponse(
+            {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"},
+            status_code=202,
+            headers={"Location": f"/jobs/{job.id}"},
+        )
+
+    def _rebuild_index(job):
+        from pathlib import Path
+
+        # embedded into a side collection and swapped in at the end, so /rag
+        # keeps answering from the current index meanwhile
+        job.update(0, 2, "embedding utils/data")
+        data_dir = Path(__file__).parent / "data"
+        if hasattr(chroma, "rebuild_from_dir"):
+            chroma.rebuild_from_dir(data_dir, collection_name="allData", before_swap=job.check_cancelled)
+        else:
+            job.check_cancelled()
+            chroma.populate_from_dir(data_dir, collection_name="allData", force=True)
+        job.update(2, 2, "done")
+        return chroma.collection_sizes() if hasattr(chroma, "collection_sizes") else None
+
+    def _reload_catalog(job):
+        course_db.reload()
+        professor_db.reload()
+        job.check_cancelled()
+        app.state.similarity = load_similarity()
+        similarity = app.state.similarity.meta if app.state.similarity is not None else None
+        return {"courses": len(course_db.get_all()), "professors": len(professor_db), "similarity": similarity}
+
+    @app.post("/admin/jobs/rebuild-index")
+    def submit_rebuild_index(x_admin_token: Optional[str] = Header(None)):
+        _require_admin(x_admin_token)
+        if getattr(chroma, "read_only", False):
+            raise HTTPException(status_code=409, detail="Vector store is read-only in this deployment; rebuild it with `python -m utils.deploy build`")
+        return _accepted(jobs.submit("rebuild_index", _rebuild_index, total=2))
+
+    @app.post("/admin/jobs/reload-catalog")
+    def submit_reload_catalog(x_admin_token: Optional[str] = Header(None)):
+        _require_admin(x_admin_token)
+        return _accepted(jobs.submit("reload_catalog", _reload_catalog))
+
+    @app.get("/admin/jobs")
+    def list_jobs(status: Optional[str] = None, x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+        _require_admin(x_admin_token)
+        return {"jobs": [j.to_dict() for j in jobs.list(status)]}
+
+    @app.get("/jobs/{job_id}")
+    def get_job(job_id: str):
+        job = jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job.to_dict()
+
+    @app.post("/jobs/{job_id}/cancel")
+    def cancel_job(job_id: str, x_admin_token: Optional[str] = Header(None)):
+        _require_admin(x_admin_token)
+        job = jobs.cancel(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job.status in FINISHED and not job.cancel_requested:
+            raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+        return job.to_dict()
+
     # --- course DB endpoints ---
+    def _paged(courses: List[Dict[str, Any]], cursor: Optional[str], limit: int, fields: Optional[str], project=None):
+        """Apply cursor pagination and field projection to a course (or other record) list."""
+        try:
+            page, next_cursor = course_db.paginate(courses, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"X-Total-Count": str(len(courses))}
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+        return JSONResponse(content=(project or course_db.project)(page, fields), headers=headers)
+
     @app.get("/courses")
-    def list_courses(prefix: Optional[str] = None) -> List[Dict[str, Any]]:
-        if prefix:
-            return course_db.query_codes(prefix)
-        return course_db.get_all()
+    @profiled
+    def list_courses(
+        prefix: Optional[str] = None,
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        courses = course_db.query_codes(prefix) if prefix else course_db.get_all()
+        return _paged(courses, cursor, limit, fields)
 
     @app.get("/courses/search")
-    def search_courses(q: str) -> List[Dict[str, Any]]:
-        return course_db.search(q)
+    @profiled
+    def search_courses(
+        q: str,
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        return _paged(course_db.search(q), cursor, limit, fields)
 
     @app.get("/courses/{code}")
+    @profiled
     def get_course(code: str):
         c = course_db.get(code)
         if not c:
             raise HTTPException(status_code=404, detail="Course not found")
         return c
 
+    @app.get("/courses/{code}/similar")
+    @profiled
+    def similar_courses(code: str, k: int = Query(10, ge=1, le=50)):
+        if app.state.similarity is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Course similarity index not built; run `python -m utils.course_similarity build`",
+            )
+        hits = app.state.similarity.similar(code, k)
+        if hits is None:
+            raise HTTPException(status_code=404, detail="Course not found")
+        for hit in hits:
+            course = course_db.get(hit["code"]) or {}
+            hit["name"] = course.get("name")
+        return hits
+
+    def _project_professors(profs: List[Dict[str, Any]], fields: Optional[str]) -> List[Dict[str, Any]]:
+        key = CourseDB.normalize_fields(fields)
+        if key is None:
+            return profs
+        return [{f: p.get(f) for f in key} for p in profs]
+
+    @app.get("/courses/{code}/professors")
+    @profiled
+    def course_professors(
+        code: str,
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        profs = professor_db.for_course(code)
+        if profs is None:
+            if not course_db.get(code):
+                raise HTTPException(status_code=404, detail="Course not found")
+            profs = []
+        return _paged(profs, cursor, limit, fields, project=_project_professors)
+
+    # --- professor endpoints ---
+
+    @app.get("/professors")
+    @profiled
+    def list_professors(
+        course: Optional[str] = None,
+        q: Optional[str] = None,
+        min_ratings: int = Query(0, ge=0),
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        profs = professor_db.search(q or "", course=course)
+        if min_ratings:
+            profs = [p for p in profs if (p.get("num_ratings") or 0) >= min_ratings]
+        return _paged(profs, cursor, limit, fields, project=_project_professors)
+
+    @app.get("/professors/{prof_id}")
+    @profiled
+    def get_professor(prof_id: str):
+        prof = professor_db.get(prof_id)
+        if prof is None:
+            raise HTTPException(status_code=404, detail="Professor not found")
+        return prof
+
     # --- chroma endpoints ---
     @app.post("/chroma/add")
+    @profiled
     def chroma_add(payload: Dict[str, Any]):
         """Accept raw JSON and validate keys manually to provide clearer errors.
 
@@ -187,6 +515,8 @@ def create_app() -> "FastAPI":
             return {"id": doc_id}
         except HTTPException:
             raise
+        except PermissionError as e:
+            raise HTTPException(status_code=409, detail=str(e))
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
@@ -196,6 +526,7 @@ def create_app() -> "FastAPI":
             raise HTTPException(status_code=500, detail=str(e))
 
     @app.post("/chroma/query")
+    @profiled
     def chroma_query(payload: Dict[str, Any]):
         try:
             collection = payload.get("collection")
@@ -222,11 +553,14 @@ def create_app() -> "FastAPI":
             raise HTTPException(status_code=500, detail=str(e))
 
     @app.post("/chroma/add_batch")
+    @profiled
     def chroma_add_batch(payload: Dict[str, Any]):
         """Add multiple documents to a collection in one request.
 
         Expected JSON: {"collection": "allClasses", "documents": ["doc1", "doc2", ...]}
-        Returns: {"ids": [...]} on success.
+        Returns: {"ids": [...]} on success. With `"background": true` the batch
+        is ingested by a background job and 202 {"job_id": ...} is returned;
+        the ids are in the finished job's `result`.
         """
         try:
             collection = payload.get("collection")
@@ -239,10 +573,29 @@ def create_app() -> "FastAPI":
             if any(not isinstance(d, str) for d in documents):
                 raise HTTPException(status_code=400, detail="all 'documents' entries must be strings")
 
+            if payload.get("background"):
+                if getattr(chroma, "read_only", False):
+                    raise PermissionError("Vector store is read-only in this deployment")
+                documents = list(documents)
+
+                def _ingest(job):
+                    ids: List[str] = []
+                    for i in range(0, len(documents), INGEST_BATCH_SIZE):
+                        job.check_cancelled()
+                        ids += chroma.add_documents(documents[i:i + INGEST_BATCH_SIZE], collection)
+                        job.update(len(ids))
+                    return {"ids": ids}
+
+                return _accepted(jobs.submit(
+                    "ingest", _ingest, total=len(documents), params={"collection": collection, "documents": len(documents)}
+                ))
+
             ids = chroma.add_documents(documents, collection)
             return {"ids": ids}
         except HTTPException:
             raise
+        except PermissionError as e:
+            raise HTTPException(status_code=409, detail=str(e))
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
@@ -251,6 +604,7 @@ def create_app() -> "FastAPI":
 
     # --- LLM endpoint ---
     @app.post("/llm")
+    @profiled
     def call_llm(payload: Dict[str, Any]):
         try:
             message = payload.get("message")
@@ -270,11 +624,12 @@ def create_app() -> "FastAPI":
             raise HTTPException(status_code=500, detail=str(e))
         
     @app.post("/rag")
+    @profiled
     def rag_query(payload: Dict[str, Any]):
         try:
             message = payload.get("message")
             collection = "allClasses"
-            n_results = 5
+            n_results = RAG_N_RESULTS
 
             # Validate incoming message
             if not message or not isinstance(message, str):
@@ -283,27 +638,40 @@ def create_app() -> "FastAPI":
             if not lite_llm:
                 raise HTTPException(status_code=503, detail="LLM client not configured on server")
 
-            # Retrieve similar documents from the vector store
-            context_results = chroma.query_similar_documents(message, n_results, collection)
-
-            # chromadb returns documents as a list-of-lists when querying with
-            # a single query (one inner list per query). Flatten that shape
-            # to a simple list of strings for joining.
-            if isinstance(context_results, list) and len(context_results) > 0 and isinstance(context_results[0], list):
-                docs = context_results[0]
-            else:
-                docs = context_results
-
-            # Ensure all retrieved docs are strings before joining
-            docs = [str(d) for d in docs]
-
-            # Combine retrieved documents into a single context string and
-            # provide it in the system prompt while sending the original
-            # user question as the user message.
-            context = "\n\n".join(docs)
+            # Retrieve similar chunks (or whole documents from stores without
+            # chunk support) from the vector store
+            with metrics.stage_timer("retrieve"):
+                if hasattr(chroma, "query_chunks"):
+                    hits = chroma.query_chunks(message, RAG_N_CHUNKS, collection)
+                else:
+                    context_results = chroma.query_similar_documents(message, n_results, collection)
+
+            with metrics.stage_timer("context"):
+                if hasattr(chroma, "query_chunks"):
+                    # Keep only the matched sections, grouped per parent record
+                    groups = group_by_parent(hits, limit=n_results)
+                    docs = format_context(groups)
+                    if payload.get("expand_parents"):
+                        docs = [chroma.get_parent(g["parent_id"]) or d for g, d in zip(groups, docs)]
+                # chromadb returns documents as a list-of-lists when querying with
+                # a single query (one inner list per query). Flatten that shape
+                # to a simple list of strings for joining.
+                elif isinstance(context_results, list) and len(context_results) > 0 and isinstance(context_results[0], list):
+                    docs = context_results[0]
+                else:
+                    docs = context_results
+
+                # Ensure all retrieved docs are strings before joining
+                docs = [str(d) for d in docs]
+
+                # Combine retrieved documents into a single context string and
+                # provide it in the system prompt while sending the original
+                # user question as the user message.
+                context = "\n\n".join(docs)
             system_prompt = f"Answer the question [{message}] using the following context. ONLY USE CONTEXT, DO NOT USE YOUR OWN INFORMATION:"
-            resp = lite_llm.send_message(system_prompt, context)
-            logging.getLogger("api_server").info("RAG context: %s", context)
+            with metrics.stage_timer("llm"):
+                resp = lite_llm.send_message(system_prompt, context)
+            log_payload(logging.getLogger("api_server.rag"), logging.INFO, "RAG context", context)
             # logging.getLogger("api_server").info("llm response: %s", resp)
             if resp is None:
                 raise HTTPException(status_code=500, detail="LLM call failed")
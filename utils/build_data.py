@@ -0,0 +1,445 @@
+"""Incremental build of the served data from scraper output.
+
+    python -m utils.build_data                      # scraped_files -> utils/data (+ indexes)
+    python -m utils.build_data --professors scraper/scraped_files/sdsu_professors.json
+    python -m utils.build_data --dry-run            # show which stages would run
+    python -m utils.build_data --force course_similarity
+
+Stages form a DAG; each one reads files and writes files:
+
+    catalog                  courses.json               -> sdsu_cs_courses.json
+    courses_with_professors  courses.json, profs.json   -> sdsu_cs_courses_with_professors.json
+    professors_llm           profs.json                 -> sdsu_cs_professors_llm.json
+    course_similarity        the three data files       -> course_similarity.npz
+    vector_index             the three data files       -> utils/index/ (NumPy backend)
+
+- Content-hashed: a stage's key is the sha256 of its inputs' bytes, its
+  config and its version. Stages whose key matches the previous build are
+  skipped. Editing one professor re-runs the joins and indexes, but not the
+  catalog copy. Re-running with unchanged scrapes does nothing.
+- Parallel: stages whose inputs are ready run concurrently on a thread pool
+  (the joins together, then the similarity and vector indexes together).
+- Atomic per artifact: stages write into a staging area (utils/.build/).
+  Outputs whose content changed are then published: all changed data files
+  are first copied next to their targets, then moved into place one after
+  another with os.replace. The vector index is swapped as one directory,
+  under the index lock of utils/deploy.py. Readers never see a half-written
+  file, and a failed stage or copy publishes nothing. utils/data itself is a
+  plain (tracked) directory, so the data files are not swapped as one set: a
+  process that reads several of them while a build publishes can see old and
+  new files mixed. The API reads them at startup and on
+  /admin/jobs/reload-catalog; reload after the build has finished.
+
+Data files are written as compact JSON (`--indent 2` for diff-friendly output).
+The vector_index stage runs by default only with VECTOR_BACKEND=numpy (or
+--vector-index); chroma deployments build their index with utils/deploy.py.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils import join_class_prof, versioned
+
+
+UTILS_DIR = Path(__file__).resolve().parent
+DATA_DIR = UTILS_DIR / "data"
+BUILD_DIR = UTILS_DIR / ".build"
+MANIFEST = "manifest.json"
+
+COURSES_JSON = "sdsu_cs_courses.json"
+COURSES_WITH_PROFS_JSON = join_class_prof.COURSES_WITH_PROFS_PATH.name
+PROFS_LLM_JSON = join_class_prof.PROFS_LLM_PATH.name
+SIMILARITY_NPZ = "course_similarity.npz"
+# mode of newly published files: the API may run as another user than the build
+PUBLISHED_MODE = 0o644
+
+logger = logging.getLogger("build_data")
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tree_hash(path: Path) -> str:
+    """Hash of a file, or of every file (name and bytes) under a directory."""
+    if path.is_file():
+        return file_hash(path)
+    digest = hashlib.sha256()
+    for p in sorted(q for q in path.rglob("*") if q.is_file()):
+        digest.update(str(p.relative_to(path)).encode("utf-8") + b"\0" + file_hash(p).encode("ascii"))
+    return digest.hexdigest()
+
+
+def _match_mode(tmp: Path | str, dst: Path) -> None:
+    """Give a temp file (mkstemp makes them 0600) the mode of the file it replaces, or 0644."""
+    try:
+        mode = stat.S_IMODE(dst.stat().st_mode)
+    except FileNotFoundError:
+        mode = PUBLISHED_MODE
+    os.chmod(tmp, mode)
+
+
+def _write_json(path: Path, data: Any, indent: Optional[int]) -> None:
+    separators = None if indent else (",", ":")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=indent, separators=separators, ensure_ascii=False)
+        _match_mode(tmp, path)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class Stage:
+    """One build step: `run(inputs, outputs)` turns input paths into output paths.
+
+    `inputs` / `outputs` map a role name to a path; outputs are under the
+    staging directory and are published to `publish` (same role names).
+    Bump `version` when the stage's code changes its output.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Path], Dict[str, Path]], None],
+        inputs: Dict[str, Path],
+        outputs: Dict[str, Path],
+        publish: Dict[str, Path],
+        config: Optional[Dict[str, Any]] = None,
+        version: str = "1",
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.publish = publish
+        self.config = config or {}
+        self.version = version
+
+    def key(self) -> str:
+        """Content hash of everything this stage's output depends on."""
+        payload = {
+            "stage": self.name,
+            "version": self.version,
+            "config": self.config,
+            "inputs": {role: tree_hash(path) for role, path in sorted(self.inputs.items())},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def make_stages(
+    courses: Path,
+    professors: Path,
+    build_dir: Path = BUILD_DIR,
+    data_dir: Path = DATA_DIR,
+    index_dir: Optional[Path] = None,
+    vector_index: Optional[bool] = None,
+    similarity_text: str = "embedding",
+    indent: Optional[int] = None,
+) -> List[Stage]:
+    """The scrape -> join -> LLM records -> indexes DAG, in a valid run order."""
+    from utils.course_similarity import DEFAULT_K, DEFAULT_WEIGHTS
+    from utils.deploy import default_backend
+
+    staged = build_dir / "data"
+    data_files = {
+        "catalog": staged / COURSES_JSON,
+        "courses_with_professors": staged / COURSES_WITH_PROFS_JSON,
+        "professors_llm": staged / PROFS_LLM_JSON,
+    }
+
+    def catalog(inputs, outputs):
+        _write_json(outputs["data"], join_class_prof.load_json(inputs["courses"]), indent)
+
+    def courses_with_professors(inputs, outputs):
+        profs = join_class_prof.load_json(inputs["professors"])
+        course_to_profs = join_class_prof.build_course_to_profs(profs)
+        courses_data = join_class_prof.load_json(inputs["courses"])
+        _write_json(outputs["data"], join_class_prof.attach_professors_to_courses(courses_data, course_to_profs), indent)
+
+    def professors_llm(inputs, outputs):
+        profs = join_class_prof.load_json(inputs["professors"])
+        _write_json(outputs["data"], join_class_prof.build_llm_professor_records(profs), indent)
+
+    def course_similarity(inputs, outputs):
+        from utils.course_similarity import build_from_data
+
+        build_from_data(staged, text=similarity_text).save(outputs["index"])
+
+    def numpy_index(inputs, outputs):
+        from utils.numpy_store import build_index
+
+        build_index(staged, outputs["index"])
+
+    fmt = {"indent": indent}
+    embedding = {k: v for k, v in os.environ.items() if k.startswith("EMBEDDING_")}
+    stages = [
+        Stage(
+            "catalog", catalog,
+            inputs={"courses": courses},
+            outputs={"data": data_files["catalog"]},
+            publish={"data": data_dir / COURSES_JSON},
+            config=fmt,
+        ),
+        Stage(
+            "courses_with_professors", courses_with_professors,
+            inputs={"courses": courses, "professors": professors},
+            outputs={"data": data_files["courses_with_professors"]},
+            publish={"data": data_dir / COURSES_WITH_PROFS_JSON},
+            config=fmt,
+        ),
+        Stage(
+            "professors_llm", professors_llm,
+            inputs={"professors": professors},
+            outputs={"data": data_files["professors_llm"]},
+            publish={"data": data_dir / PROFS_LLM_JSON},
+            config=fmt,
+        ),
+        Stage(
+            "course_similarity", course_similarity,
+            inputs=data_files,
+            outputs={"index": build_dir / SIMILARITY_NPZ},
+            publish={"index": data_dir / SIMILARITY_NPZ},
+            config={
+                "text": similarity_text,
+                "k": DEFAULT_K,
+                "weights": list(DEFAULT_WEIGHTS),
+                "embedding": embedding if similarity_text == "embedding" else {},
+            },
+        ),
+    ]
+    if vector_index if vector_index is not None else default_backend() == "numpy":
+        from utils.numpy_store import DEFAULT_INDEX_DIR
+
+        stages.append(
+            Stage(
+                "vector_index", numpy_index,
+                inputs=data_files,
+                outputs={"index": build_dir / "index"},
+                publish={"index": index_dir or DEFAULT_INDEX_DIR},
+                config={"embedding": embedding},
+            )
+        )
+    return stages
+
+
+def _dependencies(stages: Sequence[Stage]) -> Dict[str, set]:
+    producer = {path: s.name for s in stages for path in s.outputs.values()}
+    return {s.name: {producer[p] for p in s.inputs.values() if p in producer} for s in stages}
+
+
+def _read_manifest(build_dir: Path) -> Dict[str, Any]:
+    try:
+        return json.loads((build_dir / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _is_current(stage: Stage, key: str, manifest: Dict[str, Any]) -> bool:
+    entry = manifest.get(stage.name) or {}
+    return entry.get("key") == key and all(path.exists() for path in stage.outputs.values())
+
+
+def _stage_file(src: Path, dst: Path) -> Optional[Path]:
+    """Copy `src` to a temp file next to `dst` unless `dst` already has its content."""
+    if dst.exists() and file_hash(dst) == file_hash(src):
+        return None
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}", suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp)
+        _match_mode(tmp, dst)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return Path(tmp)
+
+
+def _publish_dir(src: Path, dst: Path) -> bool:
+    from utils.deploy import LOCK_PATH
+    from utils.locking import file_lock
+
+    if dst.exists() and tree_hash(dst) == tree_hash(src):
+        return False
+    version = versioned.new_version(dst)
+    try:
+        shutil.copytree(src, version, dirs_exist_ok=True)
+        with file_lock(LOCK_PATH):
+            versioned.publish(version, dst)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+    return True
+
+
+def publish(stages: Sequence[Stage]) -> List[str]:
+    """Publish every staged output whose content differs from the published one; returns those paths.
+
+    Changed files are all copied before the first one replaces its target,
+    so a failed copy leaves every published file as it was.
+    """
+    published = []
+    files: List[tuple] = []
+    try:
+        for stage in stages:
+            for role, src in stage.outputs.items():
+                if src.is_file():
+                    tmp = _stage_file(src, stage.publish[role])
+                    if tmp is not None:
+                        files.append((tmp, stage.publish[role]))
+        for tmp, dst in files:
+            os.replace(tmp, dst)
+            published.append(str(dst))
+    finally:
+        for tmp, _ in files:
+            tmp.unlink(missing_ok=True)
+    for stage in stages:
+        for role, src in stage.outputs.items():
+            if src.is_dir() and _publish_dir(src, stage.publish[role]):
+                published.append(str(stage.publish[role]))
+    return published
+
+
+def build(
+    stages: Sequence[Stage],
+    build_dir: Path = BUILD_DIR,
+    workers: int = 4,
+    force: Sequence[str] = (),
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Run the stages that are out of date (respecting dependencies), then publish.
+
+    Returns {"stages": {name: {"status": "ran"|"skipped"|"pending", "seconds"}}, "published": [...]}.
+    `force` names stages to run regardless of their key ("all" for every stage).
+    With `dry_run` nothing is run or published; a stage downstream of one
+    that would run is reported as pending, because its key is not known yet.
+    """
+    build_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(build_dir)
+    deps = _dependencies(stages)
+    by_name = {s.name: s for s in stages}
+    report: Dict[str, Dict[str, Any]] = {}
+    done: set = set()
+    changed: set = set()
+    failed: Optional[Exception] = None
+
+    def run(stage: Stage) -> float:
+        started = time.perf_counter()
+        for path in stage.outputs.values():
+            path.parent.mkdir(parents=True, exist_ok=True)
+        stage.run(stage.inputs, stage.outputs)
+        return time.perf_counter() - started
+
+    def schedule(pool, running: Dict[Any, tuple]) -> bool:
+        """Start (or settle) every stage whose dependencies are done; True if anything changed."""
+        progress = False
+        active = {stage.name for stage, _ in running.values()}
+        for name, stage in by_name.items():
+            if name in done or name in active or not deps[name] <= done:
+                continue
+            progress = True
+            if dry_run and deps[name] & changed:
+                report[name] = {"status": "pending"}
+            else:
+                key = stage.key()
+                if _is_current(stage, key, manifest) and name not in force and "all" not in force:
+                    report[name] = {"status": "skipped"}
+                    done.add(name)
+                    continue
+                if not dry_run:
+                    logger.info("Running stage %s", name)
+                    running[pool.submit(run, stage)] = (stage, key)
+                    continue
+                report[name] = {"status": "would run"}
+            done.add(name)
+            changed.add(name)
+        return progress
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="build") as pool:
+        running: Dict[Any, tuple] = {}
+        while len(done) < len(stages) and failed is None:
+            while schedule(pool, running):
+                pass
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, key = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    logger.exception("Stage %s failed", stage.name)
+                    failed = failed or e
+                    continue
+                manifest[stage.name] = {
+                    "key": key,
+                    "outputs": {role: tree_hash(p) for role, p in stage.outputs.items()},
+                    "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                }
+                _write_json(build_dir / MANIFEST, manifest, 2)
+                report[stage.name] = {"status": "ran", "seconds": round(seconds, 3)}
+                done.add(stage.name)
+                changed.add(stage.name)
+        # stages already started finish before the failure is reported
+        wait(running)
+    if failed is not None:
+        raise failed
+    return {"stages": report, "published": [] if dry_run else publish(stages)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build utils/data and the indexes from scraper output.")
+    parser.add_argument("--courses", type=Path, default=join_class_prof.COURSES_PATH, help="scraped catalog JSON")
+    parser.add_argument("--professors", type=Path, default=join_class_prof.PROFS_PATH, help="scraped RMP professors JSON")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="where data artifacts are published")
+    parser.add_argument("--build-dir", type=Path, default=BUILD_DIR, help="staging area and build manifest")
+    parser.add_argument("--workers", type=int, default=4, help="stages run in parallel")
+    parser.add_argument("--similarity-text", choices=("embedding", "tfidf"), default="embedding")
+    parser.add_argument("--vector-index", action=argparse.BooleanOptionalAction, default=None,
+                        help="build the NumPy vector index (default: when VECTOR_BACKEND=numpy)")
+    parser.add_argument("--indent", type=int, help="indent data JSON (default: compact)")
+    parser.add_argument("--force", nargs="*", metavar="STAGE", help="re-run these stages (no names: all)")
+    parser.add_argument("--dry-run", action="store_true", help="report what would run; publish nothing")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    for path in (args.courses, args.professors):
+        if not path.exists():
+            parser.error(f"input not found: {path}")
+    stages = make_stages(
+        args.courses,
+        args.professors,
+        build_dir=args.build_dir,
+        data_dir=args.data_dir,
+        vector_index=args.vector_index,
+        similarity_text=args.similarity_text,
+        indent=args.indent,
+    )
+    force = () if args.force is None else args.force or ["all"]
+    result = build(stages, args.build_dir, args.workers, force, args.dry_run)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,250 @@
+"""Opt-in capture of production traffic for later replay.
+
+When CAPTURE_DIR is set, requests to the captured routes are appended to
+rotating JSONL files in that directory, one record per request:
+
+    {"ts": 1700000000.123, "method": "POST", "path": "/rag", "query": "",
+     "body": {...}, "status": 200, "latency_ms": 1834.2,
+     "stages": {"embed": 12.1, "vector_query": 3.4, "context": 0.1, "llm": 1810.0}}
+
+Bodies and query-string values are scrubbed of obvious PII (emails, phone
+numbers, long digit runs such as RedIDs) before they are written, and client addresses are never
+recorded. Writing happens on a background thread through a bounded queue;
+when the queue is full records are dropped rather than slowing requests.
+
+Environment:
+- CAPTURE_DIR          enable capture and write files here
+- CAPTURE_SAMPLE_RATE  fraction of requests captured (default 1.0)
+- CAPTURE_MAX_BYTES    rotate after this many bytes per file (default 50 MB)
+- CAPTURE_BACKUPS      number of files kept (default 10)
+
+Replay captured traffic with `python -m benchmarks.replay`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from utils.metrics import request_stages
+
+
+CAPTURED_ROUTES = ("/rag", "/llm", "/courses/search", "/chroma/query")
+MAX_BODY_BYTES = 64 * 1024
+
+logger = logging.getLogger("api_server.capture")
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_RE = re.compile(r"(?<!\w)(?:\+?1[\s.-]?)?\(?\d{3}\)?[\s.-]\d{3}[\s.-]\d{4}(?!\w)")
+_LONG_NUMBER_RE = re.compile(r"(?<!\w)\d{7,}(?!\w)")
+
+
+def scrub_text(text: str) -> str:
+    """Mask emails, phone numbers and long digit runs (student / card ids)."""
+    text = _EMAIL_RE.sub("<email>", text)
+    text = _PHONE_RE.sub("<phone>", text)
+    return _LONG_NUMBER_RE.sub("<number>", text)
+
+
+def scrub_query(query_string: str) -> str:
+    """Scrub each decoded value of a URL query string and re-encode it.
+
+    Values are decoded first, so "q=jane.doe%40sdsu.edu" is caught as well.
+    """
+    pairs = parse_qsl(query_string, keep_blank_values=True)
+    return urlencode([(key, scrub_text(value)) for key, value in pairs])
+
+
+def scrub(value: Any) -> Any:
+    """Recursively scrub every string inside a JSON-like value."""
+    if isinstance(value, str):
+        return scrub_text(value)
+    if isinstance(value, dict):
+        return {k: scrub(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [scrub(v) for v in value]
+    return value
+
+
+# open writers; one at-fork hook restarts them in forked children
+_writers: "weakref.WeakSet[CaptureWriter]" = weakref.WeakSet()
+
+
+def _restart_writers_after_fork() -> None:
+    for writer in list(_writers):
+        writer._start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_writers_after_fork)
+
+
+class CaptureWriter:
+    """Append JSON records to size-rotated files from a background thread."""
+
+    def __init__(self, directory: Path | str, max_bytes: int = 50 * 1024 * 1024, backups: int = 10, queue_size: int = 10000):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict]]"
+        self._queue_size = queue_size
+        self._start()
+        _writers.add(self)
+
+    def _start(self) -> None:
+        # also runs in forked children: the writer thread does not survive fork,
+        # and each process writes its own capture files
+        self._queue = queue.Queue(maxsize=self._queue_size)
+        self._fh = None
+        self._written = 0
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        _writers.discard(self)
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _open_new(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = time.strftime("capture-%Y%m%dT%H%M%S", time.gmtime()) + f"-{os.getpid()}.jsonl"
+        self._fh = (self.directory / name).open("a", encoding="utf-8")
+        self._written = 0
+        files = sorted(self.directory.glob("capture-*.jsonl"))
+        for old in files[: max(0, len(files) - self.backups)]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                if self._fh is None or self._written >= self.max_bytes:
+                    self._open_new()
+                line = json.dumps(record, ensure_ascii=False) + "\n"
+                self._fh.write(line)
+                self._written += len(line.encode("utf-8"))
+                if self._queue.empty():
+                    self._fh.flush()
+            except Exception:
+                logger.exception("Failed to write capture record")
+        if self._fh is not None:
+            self._fh.close()
+
+
+class CaptureMiddleware:
+    """ASGI middleware recording request bodies and stage timings."""
+
+    def __init__(self, app, writer: CaptureWriter, sample_rate: float = 1.0, routes=CAPTURED_ROUTES):
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.routes = set(routes)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope.get("path") not in self.routes
+            or (self.sample_rate < 1.0 and random.random() >= self.sample_rate)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) < MAX_BODY_BYTES:
+                body.extend(message.get("body", b"")[: MAX_BODY_BYTES - len(body)])
+            return message
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stages: Dict[str, float] = {}
+        token = request_stages.set(stages)
+        ts = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            latency = time.perf_counter() - started
+            request_stages.reset(token)
+            self.writer.submit(self._record(scope, bytes(body), status["code"], ts, latency, stages))
+
+    @staticmethod
+    def _record(scope, body: bytes, status: int, ts: float, latency: float, stages: Dict[str, float]) -> Dict:
+        parsed: Any = None
+        if body:
+            try:
+                parsed = json.loads(body)
+            except ValueError:
+                parsed = body.decode("utf-8", "replace")
+        return {
+            "ts": round(ts, 3),
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "query": scrub_query(scope.get("query_string", b"").decode("latin-1")),
+            "body": scrub(parsed),
+            "status": status,
+            "latency_ms": round(latency * 1e3, 3),
+            "stages": {k: round(v * 1e3, 3) for k, v in stages.items()},
+        }
+
+
+def writer_from_env() -> Optional[CaptureWriter]:
+    """Return a CaptureWriter if CAPTURE_DIR is set, else None."""
+    directory = os.getenv("CAPTURE_DIR")
+    if not directory:
+        return None
+    return CaptureWriter(
+        directory,
+        max_bytes=int(os.getenv("CAPTURE_MAX_BYTES", str(50 * 1024 * 1024))),
+        backups=int(os.getenv("CAPTURE_BACKUPS", "10")),
+    )
+
+
+def read_captures(paths: List[Path | str]) -> Iterator[Dict]:
+    """Yield records from capture files (or directories of them) in timestamp order."""
+    files: List[Path] = []
+    for p in map(Path, paths):
+        files.extend(sorted(p.glob("capture-*.jsonl")) if p.is_dir() else [p])
+    records = []
+    for f in files:
+        with f.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+    records.sort(key=lambda r: r.get("ts", 0))
+    return iter(records)
@@ -1,4 +1,5 @@
 import json
+import threading
 import uuid
 from pathlib import Path
 import logging
@@ -6,20 +7,67 @@ import logging
 import chromadb
 import shutil
 
+from utils.embeddings import get_embedder
+from utils.chunking import chunk_records, load_records, parent_text
+from utils.metrics import stage_timer
+
+# chroma rejects very large add() calls; stay well below its max batch size
+ADD_BATCH_SIZE = 1000
+
 
 class ChromaVectorStore:
-    def __init__(self, db_path: str = "./chroma_db"):
+    def __init__(self, db_path: str = "./chroma_db", embedder=None, reset: bool = True, read_only: bool = False):
+        """Open the persistent store at `db_path`.
+
+        - reset: remove any existing DB first so the store starts empty
+          (single-process mode, where every server start re-populates).
+        - read_only: open a prebuilt DB (see utils/deploy.py) without
+          modifying it; write methods raise PermissionError.
+        """
         self.db_path = Path(db_path)
+        self.read_only = read_only
         # Ensure the persistent chroma DB directory is removed on startup so
         # the store starts empty every time the server process starts.
-        try:
-            if self.db_path.exists():
-                shutil.rmtree(self.db_path)
-        except Exception:
-            logging.getLogger("chroma").exception("Failed to clear existing chroma DB at %s", self.db_path)
+        if reset and not read_only:
+            try:
+                if self.db_path.is_symlink():
+                    # published by utils/deploy.py; leave that version to its readers
+                    self.db_path.unlink()
+                elif self.db_path.exists():
+                    shutil.rmtree(self.db_path)
+            except Exception:
+                logging.getLogger("chroma").exception("Failed to clear existing chroma DB at %s", self.db_path)
 
         self.client = chromadb.PersistentClient(path=str(self.db_path))
+        # Embeddings are computed by the shared, batched embedder (see
+        # utils/embeddings.py) so ingest and queries can be tuned and timed.
+        # Every add and query passes its vectors, so chromadb is given no
+        # embedding function of its own.
+        self.embedding_function = embedder or get_embedder()
         self.collection = self.client.get_or_create_collection(name="allData")
+        # parent_id -> full source record, for parent-document expansion
+        self._parents = {}
+        # guards the live collection against a rebuild's swap; while
+        # rebuild_from_dir runs, writes are also journaled for replay
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_parents = None
+        parents_path = self.db_path / "parents.json"
+        if parents_path.exists():
+            try:
+                self._parents = json.loads(parents_path.read_text(encoding="utf-8"))
+            except Exception:
+                logging.getLogger("chroma").exception("Failed to load parent documents from %s", parents_path)
+
+    def close(self):
+        """Release the client's sqlite connections and background threads."""
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError("Vector store is read-only in this deployment; rebuild it with `python -m utils.deploy build`")
 
     def _get_collection(self, collection_name: str):
         if not collection_name:
@@ -27,9 +75,7 @@ class ChromaVectorStore:
         return self.collection
 
     def add_document(self, document_text: str, collection_name: str):
-        document_id = str(uuid.uuid4())
-        self.collection.add(documents=[document_text], ids=[document_id])
-        return document_id
+        return self.add_documents([document_text], collection_name)[0]
 
     def add_documents(self, document_texts, collection_name: str):
         """Add a list of documents to the named collection and return their ids.
@@ -37,17 +83,108 @@ class ChromaVectorStore:
         document_texts: iterable of strings
         collection_name: string name for the collection
         """
+        self._check_writable()
         if not isinstance(document_texts, (list, tuple)):
             raise ValueError("'document_texts' must be a list or tuple of strings")
         ids = [str(uuid.uuid4()) for _ in document_texts]
-        self.collection.add(documents=list(document_texts), ids=ids)
+        embeddings = self.embedding_function.embed_documents(document_texts)
+        self._put(None, ids, list(embeddings), list(document_texts))
+        return ids
+
+    def add_chunks(self, chunks, collection_name: str):
+        """Add chunk dicts (id, parent_id, section, text) and return the ids added.
+
+        Chunk ids are deterministic, so a chunk seen twice is only stored once.
+        """
+        self._check_writable()
+        return self._upsert_chunks(None, chunks)
+
+    def _upsert_chunks(self, collection, chunks):
+        unique = {}
+        for chunk in chunks:
+            unique.setdefault(chunk["id"], chunk)
+        ids = list(unique)
+        for i in range(0, len(ids), ADD_BATCH_SIZE):
+            batch = [unique[k] for k in ids[i:i + ADD_BATCH_SIZE]]
+            embeddings = self.embedding_function.embed_documents([c["text"] for c in batch])
+            self._put(
+                collection,
+                [c["id"] for c in batch],
+                list(embeddings),
+                [c["text"] for c in batch],
+                [{"parent_id": c["parent_id"], "section": c["section"]} for c in batch],
+            )
         return ids
 
+    def _put(self, collection, ids, embeddings, documents, metadatas=None):
+        """Upsert into `collection`, or into the live collection when it is None.
+
+        Writes to the live collection made during a rebuild are journaled so
+        they can be replayed into the rebuilt collection.
+        """
+        if collection is not None:
+            collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+            return
+        with self._lock:
+            self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+            if self._journal is not None:
+                self._journal.append((ids, embeddings, documents, metadatas))
+
+    def _add_parents(self, parents):
+        with self._lock:
+            self._parents.update(parents)
+            if self._journal_parents is not None:
+                self._journal_parents.update(parents)
+        self._save_parents()
+
+    def query_chunks(self, query_text, n_results, collection_name: str):
+        """Return the `n_results` closest chunks as dicts ordered by distance.
+
+        Each hit has id, parent_id, section, text and distance. Documents added
+        without chunk metadata are their own parent.
+        """
+        with stage_timer("embed"):
+            query_embeddings = [self.embedding_function.embed_query(query_text)]
+        with stage_timer("vector_query"):
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                include=["documents", "metadatas", "distances"],
+            )
+        hits = []
+        ids = (results.get("ids") or [[]])[0]
+        docs = (results.get("documents") or [[]])[0]
+        metas = (results.get("metadatas") or [[]])[0] or [None] * len(ids)
+        dists = (results.get("distances") or [[]])[0] or [None] * len(ids)
+        for chunk_id, text, meta, dist in zip(ids, docs, metas, dists):
+            meta = meta or {}
+            hits.append({
+                "id": chunk_id,
+                "parent_id": meta.get("parent_id", chunk_id),
+                "section": meta.get("section"),
+                "text": text,
+                "distance": dist,
+            })
+        return hits
+
+    def get_parent(self, parent_id: str):
+        """Return the full text of a parent record, or None if unknown."""
+        record = self._parents.get(parent_id)
+        return parent_text(record) if record is not None else None
+
     def query_similar_documents(self, query_text, n_results, collection_name: str):
-        results = self.collection.query(query_texts=[query_text], n_results=n_results)
+        with stage_timer("embed"):
+            query_embeddings = [self.embedding_function.embed_query(query_text)]
+        with stage_timer("vector_query"):
+            results = self.collection.query(query_embeddings=query_embeddings, n_results=n_results)
         return results.get("documents")
 
+    def collection_sizes(self):
+        """Return {collection_name: document_count} for the store's collection."""
+        return {self.collection.name: self.collection.count()}
+
     def clear_collection(self, collection_name: str):
+        self._check_writable()
         # delete then recreate to ensure a clean state
         try:
             self.client.delete_collection(name=collection_name)
@@ -70,73 +207,97 @@ class ChromaVectorStore:
     def populate_from_dir(self, data_dir: str | Path, collection_name: str = "allData", force: bool = False):
         """Load all JSON files from `data_dir` and add them to the given collection.
 
-        - If `force` is False the method will skip population when the chroma
-          database path already exists and contains files (to avoid duplicate
-          population on every server start).
-        - Each top-level JSON array element becomes one document. If an element
-          contains a `text` field it will be used verbatim; otherwise the
-          element is converted to a compact JSON string.
+        - If `force` is False the method will skip population when the
+          collection already holds documents (to avoid duplicate population
+          on every server start).
+        - Each top-level JSON array element is split into field-aware chunks
+          (see utils/chunking.py) that keep the element's parent id; the full
+          elements are kept for parent expansion via `get_parent`.
         """
         data_path = Path(data_dir)
         logger = logging.getLogger("chroma.populate")
 
-        # If DB path already exists and is non-empty, skip unless forced
-        if not force and self.db_path.exists():
+        # If the collection is already populated, skip unless forced
+        if not force or self.read_only:
             try:
-                if any(self.db_path.iterdir()):
-                    logger.info("Chroma DB at %s already exists and is non-empty; skipping auto-populate", self.db_path)
+                if self.collection.count() > 0:
+                    logger.info("Chroma DB at %s is already populated; skipping auto-populate", self.db_path)
                     return
             except Exception:
-                # if we can't read the dir, proceed to attempt population
+                # if we can't count, proceed to attempt population
                 pass
+        self._check_writable()
 
         if not data_path.exists() or not data_path.is_dir():
             logger.warning("Data directory %s does not exist; nothing to populate", data_path)
             return
 
-        documents = []
-        for p in sorted(data_path.iterdir()):
-            if p.is_file() and p.suffix.lower() == ".json":
-                try:
-                    text = p.read_text(encoding="utf-8")
-                    parsed = json.loads(text)
-                except Exception as e:
-                    logger.exception("Failed to read/parse %s: %s", p, e)
-                    continue
-
-                # If the file is a list, iterate elements; otherwise treat whole file as one document
-                if isinstance(parsed, list):
-                    for item in parsed:
-                        if isinstance(item, dict) and "text" in item and isinstance(item["text"], str):
-                            documents.append(item["text"])
-                        else:
-                            documents.append(json.dumps(item, ensure_ascii=False))
-                else:
-                    if isinstance(parsed, dict) and "text" in parsed and isinstance(parsed["text"], str):
-                        documents.append(parsed["text"])
-                    else:
-                        documents.append(json.dumps(parsed, ensure_ascii=False))
-
-        if not documents:
+        records = load_records(data_path)
+        if not records:
             logger.info("No documents found in %s to populate", data_path)
             return
 
+        chunks, parents = chunk_records(records)
         try:
-            self.add_documents(documents, collection_name)
-            logger.info("Populated chroma collection '%s' with %d documents from %s", collection_name, len(documents), data_path)
+            self.add_chunks(chunks, collection_name)
+            self._add_parents(parents)
+            logger.info(
+                "Populated chroma collection '%s' with %d chunks of %d records from %s",
+                collection_name, len(chunks), len(records), data_path,
+            )
         except Exception as e:
             logger.exception("Failed to populate chroma collection: %s", e)
 
+    def rebuild_from_dir(self, data_dir: str | Path, collection_name: str = "allData", before_swap=None):
+        """Re-embed `data_dir` into a side collection and swap it in once complete.
 
-# Initialize a module-level Chroma store and auto-populate it from the
-# `utils/data` directory on import. This ensures chroma starts empty every
-# server start and is populated with the project's JSON data automatically.
-try:
-    _data_dir = Path(__file__).parent / "data"
-    chroma_store = ChromaVectorStore()
-    # Force population to ensure the freshly-created DB is filled.
-    chroma_store.populate_from_dir(_data_dir, collection_name="allData", force=True)
-except Exception:
-    logging.getLogger("chroma").exception("Failed to initialize chroma store on import")
+        Queries keep hitting the current collection until the swap, so the
+        store is never empty during a rebuild. Documents added meanwhile go
+        to the current collection and are replayed into the new one (with
+        their parents) at the swap. `before_swap()` runs just before the
+        swap; if it raises (e.g. the job was cancelled) the side collection
+        is dropped and the current one stays.
+        """
+        self._check_writable()
+        staging_name = f"{collection_name}-rebuild"
+        try:
+            self.client.delete_collection(name=staging_name)  # left over from an interrupted rebuild
+        except Exception:
+            pass
+        staging = self.client.create_collection(name=staging_name)
+        with self._lock:
+            self._journal, self._journal_parents = [], {}
+        try:
+            try:
+                chunks, parents = chunk_records(load_records(Path(data_dir)))
+                self._upsert_chunks(staging, chunks)
+                if before_swap is not None:
+                    before_swap()
+            except BaseException:
+                self.client.delete_collection(name=staging_name)
+                raise
+            # writes wait here until the new collection is live
+            with self._lock:
+                for ids, embeddings, documents, metadatas in self._journal:
+                    staging.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+                parents.update(self._journal_parents)
+                old, self.collection = self.collection, staging
+                self._parents = parents
+                self.client.delete_collection(name=old.name)
+                staging.modify(name=collection_name)
+        finally:
+            with self._lock:
+                self._journal = self._journal_parents = None
+        self._save_parents()
+        logging.getLogger("chroma.populate").info(
+            "Rebuilt chroma collection '%s' with %d chunks from %s", collection_name, len(chunks), data_dir
+        )
 
+    def _save_parents(self):
+        try:
+            self.db_path.mkdir(parents=True, exist_ok=True)
+            with open(self.db_path / "parents.json", "w", encoding="utf-8") as fh:
+                json.dump(self._parents, fh, ensure_ascii=False)
+        except Exception:
+            logging.getLogger("chroma").exception("Failed to persist parent documents")
 
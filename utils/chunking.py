@@ -0,0 +1,244 @@
+"""Field-aware chunking of catalog and professor records for retrieval.
+
+Indexing a whole course as one `json.dumps` blob has two problems: long
+records (many professors) exceed the embedding model's input window and are
+silently truncated, and every hit drags the entire blob into the /rag prompt.
+Instead each record is split into small, self-describing sections:
+
+- course records -> overview, description, prerequisites, offering, professors
+- professor records (with a `text` field) -> one chunk
+- anything else -> its compact JSON, split on size
+
+Every chunk carries `parent_id` (the course code, or "prof:<id>") so retrieval
+can run over chunks and still return - or expand to - the parent record.
+
+- chunk_record(record) -> list[dict]  (id, parent_id, section, text)
+- parent_id(record) -> str
+- load_records(data_dir) / chunk_records(records): what vector stores index
+- data_fingerprint(data_dir): content hash used to detect stale indexes
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# ~1000 characters stays inside all-MiniLM-L6-v2's 256 word-piece window
+MAX_CHUNK_CHARS = 1000
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;])\s+")
+
+
+def parent_id(record: Dict[str, Any]) -> str:
+    """Stable id of the record a chunk belongs to."""
+    if record.get("code"):
+        return str(record["code"]).strip().upper()
+    if record.get("id") is not None:
+        return f"prof:{record['id']}"
+    return _content_id(json.dumps(record, sort_keys=True, ensure_ascii=False))
+
+
+def _content_id(text: str) -> str:
+    return "doc:" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def split_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """Split `text` into pieces under `max_chars`, preferring sentence boundaries."""
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+    pieces: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        while len(sentence) > max_chars:  # a single overlong sentence
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _fmt(value: Any, suffix: str = "") -> str:
+    if value is None or value == "":
+        return "N/A"
+    if isinstance(value, float):
+        return f"{value:.1f}{suffix}"
+    return f"{value}{suffix}"
+
+
+def _professor_line(p: Dict[str, Any]) -> str:
+    return (
+        f"{p.get('name') or 'Unknown'} (quality {_fmt(p.get('overall_quality'))}/5, "
+        f"difficulty {_fmt(p.get('overall_difficulty'))}, {_fmt(p.get('num_ratings'))} ratings, "
+        f"{_fmt(p.get('would_take_again_percent'), '%')} would take again)"
+    )
+
+
+def _sentence(label: str, value: Any) -> str:
+    return f"{label}: {str(value).strip().rstrip('.')}."
+
+
+def course_sections(course: Dict[str, Any]) -> Dict[str, str]:
+    """Map section name -> body text for a course record (empty sections omitted)."""
+    sections: Dict[str, str] = {}
+
+    overview = [_sentence("Units", course["units"]) if course.get("units") else ""]
+    if course.get("general_education"):
+        overview.append(_sentence("General education", course["general_education"]))
+    sections["overview"] = " ".join(p for p in overview if p)
+
+    if course.get("description"):
+        sections["description"] = "Description: " + str(course["description"]).strip()
+
+    prereq = []
+    if course.get("prereqs"):
+        prereq.append(_sentence("Prerequisites", course["prereqs"]))
+    if course.get("restrictions"):
+        prereq.append(_sentence("Restrictions", course["restrictions"]))
+    if prereq:
+        sections["prerequisites"] = " ".join(prereq)
+
+    offering = []
+    if course.get("typically_offered"):
+        offering.append(_sentence("Typically offered", course["typically_offered"]))
+    if course.get("grading_method"):
+        offering.append(_sentence("Grading", course["grading_method"]))
+    if course.get("max_credits"):
+        offering.append(_sentence("Maximum credits", course["max_credits"]))
+    if course.get("notes"):
+        offering.append(_sentence("Notes", course["notes"]))
+    if offering:
+        sections["offering"] = " ".join(offering)
+
+    profs = course.get("professors") or []
+    if profs:
+        sections["professors"] = "Taught by: " + "; ".join(_professor_line(p) for p in profs) + "."
+    return sections
+
+
+def chunk_course(course: Dict[str, Any], max_chars: int = MAX_CHUNK_CHARS) -> List[Dict[str, str]]:
+    pid = parent_id(course)
+    # every chunk starts with the course identity so it embeds / reads standalone
+    header = f"{course.get('code', '')} {course.get('name') or ''}".strip()
+    chunks: List[Dict[str, str]] = []
+    for section, body in course_sections(course).items():
+        pieces = split_text(body, max_chars - len(header) - 3) or [""]
+        for i, piece in enumerate(pieces):
+            text = f"{header} - {piece}" if piece else header
+            chunk_id = f"{pid}#{section}" + (f"-{i}" if len(pieces) > 1 else "")
+            chunks.append({"id": chunk_id, "parent_id": pid, "section": section, "text": text})
+    return chunks
+
+
+def chunk_text_record(record: Dict[str, Any], max_chars: int = MAX_CHUNK_CHARS) -> List[Dict[str, str]]:
+    pid = parent_id(record)
+    pieces = split_text(str(record["text"]), max_chars)
+    return [
+        {"id": pid + (f"#{i}" if len(pieces) > 1 else ""), "parent_id": pid, "section": "text", "text": piece}
+        for i, piece in enumerate(pieces)
+    ]
+
+
+def chunk_record(record: Any, max_chars: int = MAX_CHUNK_CHARS) -> List[Dict[str, str]]:
+    """Split one JSON record into retrieval chunks (see module docstring)."""
+    if isinstance(record, dict) and record.get("code"):
+        return chunk_course(record, max_chars)
+    if isinstance(record, dict) and isinstance(record.get("text"), str):
+        return chunk_text_record(record, max_chars)
+    blob = record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)
+    pid = parent_id(record) if isinstance(record, dict) else _content_id(blob)
+    pieces = split_text(blob, max_chars)
+    return [
+        {"id": f"{pid}#{i}", "parent_id": pid, "section": "json", "text": piece} for i, piece in enumerate(pieces)
+    ]
+
+
+def load_records(data_dir: Path | str) -> Dict[str, Any]:
+    """Read every JSON file in `data_dir` into {parent_id: record}.
+
+    Each top-level array element is one record. Records describing the same
+    parent (e.g. a course present in both the plain and the with-professors
+    catalog) are merged.
+    """
+    logger = logging.getLogger("chroma.populate")
+    records: Dict[str, Any] = {}
+    for p in sorted(Path(data_dir).iterdir()):
+        if p.is_file() and p.suffix.lower() == ".json":
+            try:
+                parsed = json.loads(p.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.exception("Failed to read/parse %s: %s", p, e)
+                continue
+            for item in parsed if isinstance(parsed, list) else [parsed]:
+                if isinstance(item, dict):
+                    pid = parent_id(item)
+                    records[pid] = {**records.get(pid, {}), **item}
+                else:
+                    records[json.dumps(item, ensure_ascii=False)] = item
+    return records
+
+
+def data_fingerprint(data_dir: Path | str) -> str:
+    """Content hash of the JSON files in `data_dir`, to tell whether an index is stale."""
+    digest = hashlib.sha256()
+    for p in sorted(Path(data_dir).glob("*.json")):
+        digest.update(p.name.encode("utf-8") + b"\0")
+        digest.update(p.read_bytes())
+    return digest.hexdigest()
+
+
+def chunk_records(records: Dict[str, Any]) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    """Chunk every record; return (chunks, {parent_id: record})."""
+    chunks: List[Dict[str, str]] = []
+    parents: Dict[str, Any] = {}
+    for record in records.values():
+        record_chunks = chunk_record(record)
+        chunks.extend(record_chunks)
+        if record_chunks:
+            parents[record_chunks[0]["parent_id"]] = record
+    return chunks, parents
+
+
+def parent_text(record: Any) -> str:
+    """Full text handed to the LLM when a parent document is expanded."""
+    if isinstance(record, dict) and isinstance(record.get("text"), str):
+        return record["text"]
+    return record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)
+
+
+def group_by_parent(hits: Iterable[Dict[str, Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Group ranked chunk hits by parent, keeping the parents' first-hit order.
+
+    Returns [{"parent_id", "sections": [hit, ...]}] with at most `limit` parents.
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for hit in hits:
+        pid = hit.get("parent_id") or hit.get("id")
+        group = groups.get(pid)
+        if group is None:
+            if limit is not None and len(groups) >= limit:
+                continue
+            group = groups[pid] = {"parent_id": pid, "sections": []}
+        group["sections"].append(hit)
+    return list(groups.values())
+
+
+def format_context(groups: List[Dict[str, Any]]) -> List[str]:
+    """One context block per parent containing only its matched sections."""
+    blocks = []
+    for g in groups:
+        blocks.append("\n".join(h["text"] for h in g["sections"]))
+    return blocks
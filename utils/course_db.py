@@ -6,6 +6,9 @@ This provides a small, ergonomic API inspired by the project's chroma wrapper:
 - get(code) -> dict | None - retrieve a course by its code (case-insensitive, trims whitespace)
 - get_all() -> list[dict] - all courses in original order
 - query_codes(prefix) -> list[dict] - retrieve courses whose code starts with the prefix
+- project(courses, fields) -> list[dict] - field-projected views (a few field sets cached)
+- paginate(courses, cursor, limit) -> (page, next_cursor) - cursor pagination helper
+- iter_pages(limit, fields) - iterate over the whole catalog one page at a time
 - reload() - reload from disk
 
 The implementation uses an in-memory hashmap keyed by a normalized course code
@@ -15,11 +18,15 @@ for O(1) lookups. It's intentionally tiny and dependency-free.
 from __future__ import annotations
 
 import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 
 DEFAULT_JSON = Path(__file__).resolve().parent / "data" / "sdsu_cs_courses.json"
+# projected catalog copies kept, least recently used evicted first
+MAX_PROJECTIONS = 8
 
 
 class CourseDB:
@@ -33,6 +40,17 @@ class CourseDB:
         self.json_path = Path(json_path) if json_path else DEFAULT_JSON
         self._courses: List[Dict] = []
         self._by_code: Dict[str, Dict] = {}
+        # normalized code -> position in `_courses`, used to map query results
+        # back onto the cached projected views
+        self._position: Dict[str, int] = {}
+        # field set -> projected copy of `_courses` (same order); only field
+        # sets made of known fields are cached, at most MAX_PROJECTIONS of them
+        self._projections: "OrderedDict[Tuple[str, ...], List[Dict]]" = OrderedDict()
+        self._fields: frozenset = frozenset()
+        self._projection_lock = threading.Lock()
+        # projection cache statistics (exported by the API's /metrics)
+        self.projection_hits = 0
+        self.projection_misses = 0
         if load_on_init:
             self.load()
 
@@ -50,6 +68,8 @@ class CourseDB:
             # empty DB if file missing
             self._courses = []
             self._by_code = {}
+            self._position = {}
+            self._projections, self._fields = OrderedDict(), frozenset()
             return
 
         with self.json_path.open("r", encoding="utf-8") as fh:
@@ -58,12 +78,20 @@ class CourseDB:
         if not isinstance(data, list):
             raise ValueError(f"Expected a list of course objects in {self.json_path}")
 
-        self._courses = data
-        self._by_code = {}
-        for course in self._courses:
+        # build the new index first and swap it in, so concurrent readers see
+        # either the old or the new catalog (reloads run in the background)
+        by_code: Dict[str, Dict] = {}
+        position: Dict[str, int] = {}
+        for i, course in enumerate(data):
             code = course.get("code")
             if code:
-                self._by_code[self._normalize_code(code)] = course
+                norm = self._normalize_code(code)
+                by_code[norm] = course
+                position[norm] = i
+        fields = frozenset(f for course in data if isinstance(course, dict) for f in course)
+        with self._projection_lock:
+            self._courses, self._by_code, self._position = data, by_code, position
+            self._projections, self._fields = OrderedDict(), fields
 
     def reload(self) -> None:
         """Alias for load() to match familiar naming patterns."""
@@ -114,3 +142,101 @@ class CourseDB:
             if term_low in code or term_low in name:
                 out.append(c)
         return out
+
+    # --- projection / pagination ---
+    @staticmethod
+    def normalize_fields(fields: Optional[Iterable[str] | str]) -> Optional[Tuple[str, ...]]:
+        """Turn `fields` ("code,name" or an iterable) into a sorted, de-duplicated key.
+
+        Returns None when no projection is requested (all fields).
+        """
+        if fields is None:
+            return None
+        if isinstance(fields, str):
+            fields = fields.split(",")
+        key = tuple(sorted({f.strip() for f in fields if f and f.strip()}))
+        return key or None
+
+    def _projected_all(self, key: Tuple[str, ...]) -> Tuple[List[Dict], Optional[List[Dict]]]:
+        """Return (courses, projected view of every one of them) for `key`, caching the view.
+
+        Returns None for field sets with fields no course has. Those are
+        projected per page instead, so arbitrary `fields` values cannot grow
+        the cache.
+        """
+        with self._projection_lock:
+            courses = self._courses
+            if not self._fields.issuperset(key):
+                return courses, None
+            view = self._projections.get(key)
+            if view is not None:
+                self._projections.move_to_end(key)
+                self.projection_hits += 1
+                return courses, view
+            self.projection_misses += 1
+        view = [{f: c.get(f) for f in key} for c in courses]
+        with self._projection_lock:
+            if courses is self._courses:
+                self._projections[key] = view
+                while len(self._projections) > MAX_PROJECTIONS:
+                    self._projections.popitem(last=False)
+        return courses, view
+
+    def project(self, courses: Sequence[Dict], fields: Optional[Iterable[str] | str]) -> List[Dict]:
+        """Return `courses` reduced to `fields`.
+
+        Projected dicts are computed once per field set for the whole catalog
+        and reused across calls (for the MAX_PROJECTIONS most recently used
+        field sets); courses that aren't part of the loaded catalog, and field
+        sets naming unknown fields, are projected on the fly. With no fields
+        the input is returned as-is.
+        """
+        key = self.normalize_fields(fields)
+        if key is None:
+            return list(courses)
+        base, view = self._projected_all(key)
+        if view is None:
+            return [{f: c.get(f) for f in key} for c in courses]
+        out: List[Dict] = []
+        for c in courses:
+            pos = self._position.get(self._normalize_code(c.get("code") or ""))
+            if pos is not None and pos < len(base) and base[pos] is c:
+                out.append(view[pos])
+            else:
+                out.append({f: c.get(f) for f in key})
+        return out
+
+    @staticmethod
+    def paginate(courses: Sequence[Dict], cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Slice `courses` starting at `cursor` and return (page, next_cursor).
+
+        The cursor is an opaque string (currently the offset of the next item);
+        `next_cursor` is None once the end of the sequence is reached.
+        """
+        start = 0
+        if cursor:
+            try:
+                start = int(cursor)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+            if start < 0:
+                raise ValueError(f"Invalid cursor: {cursor!r}")
+        if limit is None:
+            return list(courses[start:]), None
+        if limit < 1:
+            raise ValueError("limit must be a positive integer")
+        end = start + limit
+        page = list(courses[start:end])
+        next_cursor = str(end) if end < len(courses) else None
+        return page, next_cursor
+
+    def iter_pages(self, limit: int = 100, fields: Optional[Iterable[str] | str] = None) -> Iterator[List[Dict]]:
+        """Yield the catalog in pages of at most `limit` (optionally projected) courses."""
+        courses = self.project(self._courses, fields)
+        cursor: Optional[str] = None
+        while True:
+            page, cursor = self.paginate(courses, cursor, limit)
+            if page:
+                yield page
+            if cursor is None:
+                return
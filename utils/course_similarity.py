@@ -0,0 +1,369 @@
+"""Precomputed "similar courses" index.
+
+For every course the k most similar other courses are computed once per
+catalog build, so `/courses/{code}/similar` is a dictionary lookup instead of
+an LLM round trip. The similarity of two courses blends:
+
+- text        cosine similarity of course embeddings (code, name, description,
+              prerequisites); TF-IDF vectors when no embedding model is used
+- professors  Jaccard overlap of the professors who teach them
+- prereqs     Jaccard overlap of their prerequisite courses, or 1.0 when one
+              is a direct prerequisite of the other
+
+    python -m utils.course_similarity build             # embeddings (EMBEDDING_* config)
+    python -m utils.course_similarity build --text tfidf
+    python -m utils.course_similarity similar "CS 460"
+
+The index is saved next to the catalog as utils/data/course_similarity.npz
+(not JSON, so it is not indexed into the vector store). It is only built by
+the CLI above or by `python -m utils.build_data`; a TF-IDF build of the
+shipped data is committed so a fresh checkout can serve it. The server just
+loads it: without one, `/courses/{code}/similar` answers 503, and a warning
+is logged when the index was built from different data files.
+
+Scores are computed in blocks of rows, with TF-IDF vectors and the
+professor / prerequisite sets kept sparse. Memory stays at O(n * k) plus
+one block, never an n x n matrix.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.chunking import data_fingerprint, load_records
+from utils.join_class_prof import normalize_course_code
+
+
+DATA_DIR = Path(__file__).parent / "data"
+INDEX_PATH = DATA_DIR / "course_similarity.npz"
+DEFAULT_K = 20
+# blend weights for (text, professors, prereqs)
+DEFAULT_WEIGHTS = (0.7, 0.15, 0.15)
+# score cells (rows x courses) computed at a time
+BLOCK_CELLS = 1 << 22
+# sparse columns in more than this fraction of rows are multiplied densely
+DENSE_FRACTION = 1 / 32
+MAX_DENSE_COLUMNS = 512
+
+# "CS 210", "COMPE 160" and spaced multi-letter subjects such as "B A 323"
+_COURSE_CODE_RE = re.compile(r"(?<![A-Za-z])((?:[A-Z] ){1,3}[A-Z]|[A-Z]{2,5}) ?(\d{2,3}[A-Z]?)\b")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the to with credit courses course "
+    "students prerequisites prerequisite recommended concurrent registration".split()
+)
+
+logger = logging.getLogger("course_similarity")
+
+
+def prereq_codes(course: Dict[str, Any]) -> set:
+    """Course codes mentioned in a course's prerequisites, normalized like the catalog join ("BA 323")."""
+    return {normalize_course_code(f"{dept} {num}") for dept, num in _COURSE_CODE_RE.findall(course.get("prereqs") or "")}
+
+
+def course_text(course: Dict[str, Any]) -> str:
+    parts = [f"{course.get('code', '')} {course.get('name') or ''}."]
+    if course.get("description"):
+        parts.append(str(course["description"]))
+    if course.get("prereqs"):
+        parts.append(f"Prerequisites: {course['prereqs']}")
+    return " ".join(parts)
+
+
+class SparseRows:
+    """Rows of a sparse matrix in CSR form, for row-block products with itself.
+
+    Columns used by more than `dense_fraction` of the rows (common words) are
+    also kept as a dense n x (few) matrix and multiplied with BLAS. Walking
+    their postings would cost O(df^2) each. The rest go through an inverted
+    index.
+    """
+
+    def __init__(self, rows: Sequence[Dict[int, float]], n_cols: int, dense_fraction: float = DENSE_FRACTION):
+        lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        self.indptr = np.concatenate([[0], np.cumsum(lengths)])
+        self.indices = np.fromiter((c for r in rows for c in r), dtype=np.int64, count=int(self.indptr[-1]))
+        self.data = np.fromiter((v for r in rows for v in r.values()), dtype=np.float32, count=int(self.indptr[-1]))
+        self.shape = (len(rows), n_cols)
+        row_of = np.repeat(np.arange(len(rows)), lengths)
+        df = np.bincount(self.indices, minlength=n_cols)
+        frequent = np.flatnonzero(df > max(1, dense_fraction * len(rows)))
+        frequent = frequent[np.argsort(-df[frequent], kind="stable")][:MAX_DENSE_COLUMNS]
+        self._dense_col = np.full(n_cols, -1, dtype=np.int64)
+        self._dense_col[frequent] = np.arange(len(frequent))
+        in_dense = self._dense_col[self.indices] >= 0
+        self._dense = np.zeros((len(rows), len(frequent)), dtype=np.float32)
+        self._dense[row_of[in_dense], self._dense_col[self.indices[in_dense]]] = self.data[in_dense]
+        self._sparse_entry = ~in_dense
+        # column-major copy of the remaining entries: which rows use each column
+        sparse_cols = self.indices[~in_dense]
+        order = np.argsort(sparse_cols, kind="stable")
+        self._col_rows = row_of[~in_dense][order]
+        self._col_data = self.data[~in_dense][order]
+        self._col_ptr = np.concatenate([[0], np.cumsum(np.bincount(sparse_cols, minlength=n_cols))])
+
+    @classmethod
+    def from_sets(cls, sets: Sequence[set]) -> "SparseRows":
+        items = {x: i for i, x in enumerate(sorted({x for s in sets for x in s}))}
+        return cls([{items[x]: 1.0 for x in s} for s in sets], len(items))
+
+    def row_lengths(self) -> np.ndarray:
+        return np.diff(self.indptr).astype(np.float32)
+
+    def block_dot(self, start: int, stop: int) -> np.ndarray:
+        """Dense (stop - start) x n_rows block of self @ self.T."""
+        n = self.shape[0]
+        out = self._dense[start:stop] @ self._dense.T
+        lo, hi = self.indptr[start], self.indptr[stop]
+        keep = self._sparse_entry[lo:hi]
+        if not keep.any():
+            return out
+        local = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))[keep]
+        cols, vals = self.indices[lo:hi][keep], self.data[lo:hi][keep]
+        # expand every (row, column) entry into that column's postings
+        begin, count = self._col_ptr[cols], self._col_ptr[cols + 1] - self._col_ptr[cols]
+        offsets = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count)
+        postings = np.repeat(begin, count) + offsets
+        weights = np.repeat(vals, count) * self._col_data[postings]
+        cells = np.repeat(local, count) * n + self._col_rows[postings]
+        out += np.bincount(cells, weights=weights, minlength=(stop - start) * n).reshape(stop - start, n).astype(np.float32)
+        return out
+
+
+def tfidf_matrix(texts: Sequence[str]) -> SparseRows:
+    """Sparse, L2-normalized TF-IDF rows (sublinear tf, smoothed idf)."""
+    docs = [Counter(t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS) for text in texts]
+    vocab: Dict[str, int] = {}
+    for d in docs:
+        for t in d:
+            vocab.setdefault(t, len(vocab))
+    df = np.zeros(len(vocab), dtype=np.float32)
+    for d in docs:
+        for t in d:
+            df[vocab[t]] += 1
+    idf = np.log((1 + len(docs)) / (1 + df)) + 1.0
+    rows = []
+    for d in docs:
+        row = {vocab[t]: (1 + math.log(n)) * float(idf[vocab[t]]) for t, n in d.items()}
+        norm = math.sqrt(sum(v * v for v in row.values())) or 1.0
+        rows.append({c: v / norm for c, v in row.items()})
+    return SparseRows(rows, len(vocab))
+
+
+def _jaccard_block(incidence: SparseRows, sizes: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Jaccard similarity of rows start..stop with every row."""
+    inter = incidence.block_dot(start, stop)
+    union = sizes[start:stop, None] + sizes[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+class SimilarityIndex:
+    """Top-k neighbours per course with the blended score and its components."""
+
+    COMPONENTS = ("text", "professors", "prereqs")
+
+    def __init__(self, codes: List[str], neighbors: np.ndarray, scores: np.ndarray, components: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        self.codes = codes
+        self.neighbors = neighbors
+        self.scores = scores
+        self.components = components
+        self.meta = meta
+        self._row = {c.strip().upper(): i for i, c in enumerate(codes)}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def k(self) -> int:
+        return int(self.neighbors.shape[1]) if self.neighbors.ndim == 2 else 0
+
+    def similar(self, code: str, k: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """The `k` most similar courses to `code`, or None if the course is unknown."""
+        row = self._row.get((code or "").strip().upper())
+        if row is None:
+            return None
+        out = []
+        for j in range(min(k, self.k)):
+            other = int(self.neighbors[row, j])
+            if other < 0:
+                break
+            out.append({
+                "code": self.codes[other],
+                "score": round(float(self.scores[row, j]), 4),
+                **{name: round(float(self.components[name][row, j]), 4) for name in self.COMPONENTS},
+            })
+        return out
+
+    def save(self, path: Path | str = INDEX_PATH) -> None:
+        path = Path(path)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            codes=np.array(self.codes),
+            neighbors=self.neighbors,
+            scores=self.scores,
+            meta=np.array(json.dumps(self.meta)),
+            **{f"component_{name}": arr for name, arr in self.components.items()},
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path | str = INDEX_PATH) -> "SimilarityIndex":
+        with np.load(path) as data:
+            components = {name: data[f"component_{name}"] for name in cls.COMPONENTS}
+            return cls(
+                [str(c) for c in data["codes"]], data["neighbors"], data["scores"], components, json.loads(str(data["meta"]))
+            )
+
+
+def build_similarity(
+    courses: Sequence[Dict[str, Any]],
+    embed: Optional[Callable[[Sequence[str]], np.ndarray]] = None,
+    k: int = DEFAULT_K,
+    weights: Sequence[float] = DEFAULT_WEIGHTS,
+    text_model: Optional[str] = None,
+    block_cells: int = BLOCK_CELLS,
+) -> SimilarityIndex:
+    """Blend the similarities of each block of rows and keep each course's top `k`.
+
+    `embed` maps texts to L2-normalized vectors; sparse TF-IDF is used when
+    omitted. At most `block_cells` scores are held at once.
+    """
+    courses = [c for c in courses if c.get("code")]
+    codes = [c["code"] for c in courses]
+    n = len(codes)
+    texts = [course_text(c) for c in courses]
+    if embed is not None:
+        vectors = np.asarray(embed(texts), dtype=np.float32)
+
+        def text_block(start: int, stop: int) -> np.ndarray:
+            return vectors[start:stop] @ vectors.T
+    else:
+        tfidf = tfidf_matrix(texts)
+        text_block = tfidf.block_dot
+
+    profs = SparseRows.from_sets([{p.get("name") for p in c.get("professors") or [] if p.get("name")} for c in courses])
+    prereqs = [prereq_codes(c) for c in courses]
+    prereq_rows = SparseRows.from_sets(prereqs)
+    prof_sizes, prereq_sizes = profs.row_lengths(), prereq_rows.row_lengths()
+    # direct prerequisite links count as full prereq similarity, both ways
+    position = {normalize_course_code(code): i for i, code in enumerate(codes)}
+    direct: Dict[int, set] = {}
+    for i, reqs in enumerate(prereqs):
+        for req in reqs:
+            j = position.get(req)
+            if j is not None and j != i:
+                direct.setdefault(i, set()).add(j)
+                direct.setdefault(j, set()).add(i)
+
+    w_text, w_prof, w_prereq = weights
+    k = max(0, min(k, n - 1))
+    neighbors = np.zeros((n, k), dtype=np.int32)
+    picked = {name: np.zeros((n, k), dtype=np.float32) for name in ("blended",) + SimilarityIndex.COMPONENTS}
+    block = max(1, block_cells // max(1, n))
+    for start in range(0, n if k else 0, block):
+        stop = min(n, start + block)
+        rows = np.arange(stop - start)
+        text_sim = np.clip(text_block(start, stop), 0.0, 1.0)
+        prof_sim = _jaccard_block(profs, prof_sizes, start, stop)
+        prereq_sim = _jaccard_block(prereq_rows, prereq_sizes, start, stop)
+        for i in range(start, stop):
+            for j in direct.get(i, ()):
+                prereq_sim[i - start, j] = 1.0
+        blended = w_text * text_sim + w_prof * prof_sim + w_prereq * prereq_sim
+        blended[rows, rows + start] = -np.inf
+
+        top = np.argpartition(-blended, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(blended, top, axis=1).argsort(axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+        neighbors[start:stop] = top
+        for name, matrix in (("blended", blended), ("text", text_sim), ("professors", prof_sim), ("prereqs", prereq_sim)):
+            picked[name][start:stop] = np.take_along_axis(matrix, top, axis=1)
+
+    meta = {
+        "text_model": text_model or ("embedding" if embed is not None else "tfidf"),
+        "weights": list(weights),
+        "k": k,
+        "courses": n,
+    }
+    scores = picked.pop("blended")
+    return SimilarityIndex(codes, neighbors, scores, picked, meta)
+
+
+def build_from_data(data_dir: Path | str = DATA_DIR, text: str = "embedding", k: int = DEFAULT_K, weights=DEFAULT_WEIGHTS) -> SimilarityIndex:
+    """Build from the (merged) course records in `data_dir`."""
+    courses = [r for r in load_records(data_dir).values() if isinstance(r, dict) and r.get("code")]
+    embed, text_model = None, "tfidf"
+    if text == "embedding":
+        from utils.embeddings import get_embedder
+
+        embedder = get_embedder()
+        embed, text_model = embedder.embed_documents, embedder.name
+    started = time.perf_counter()
+    index = build_similarity(courses, embed, k, weights, text_model)
+    index.meta.update({"data_hash": data_fingerprint(data_dir), "build_s": round(time.perf_counter() - started, 3)})
+    return index
+
+
+def load_index(path: Path | str = INDEX_PATH, data_dir: Path | str = DATA_DIR) -> Optional[SimilarityIndex]:
+    """Load the saved index, or None if there is none (it is never built here).
+
+    Logs a warning when the index was built from other data than `data_dir`.
+    """
+    try:
+        index = SimilarityIndex.load(path)
+    except FileNotFoundError:
+        logger.warning("No course similarity index at %s; build it with `python -m utils.course_similarity build`", path)
+        return None
+    except Exception:
+        logger.exception("Failed to load course similarity index from %s", path)
+        return None
+    built = index.meta.get("data_hash")
+    if built is not None and built != data_fingerprint(data_dir):
+        logger.warning(
+            "Course similarity index at %s was built from different data than %s; rebuild it with "
+            "`python -m utils.build_data`", path, data_dir,
+        )
+    return index
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query the course similarity index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    build.add_argument("--out", type=Path, default=INDEX_PATH)
+    build.add_argument("--text", choices=("embedding", "tfidf"), default="embedding")
+    build.add_argument("--k", type=int, default=DEFAULT_K)
+    build.add_argument("--weights", type=float, nargs=3, default=list(DEFAULT_WEIGHTS), metavar=("TEXT", "PROFS", "PREREQS"))
+    query = sub.add_parser("similar")
+    query.add_argument("code")
+    query.add_argument("-k", type=int, default=5)
+    query.add_argument("--index", type=Path, default=INDEX_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        index = build_from_data(args.data_dir, args.text, args.k, tuple(args.weights))
+        index.save(args.out)
+        print(json.dumps(index.meta, indent=2))
+        return 0
+    index = load_index(args.index)
+    if index is None:
+        return 1
+    for hit in index.similar(args.code, args.k) or []:
+        print(f"{hit['score']:.3f}  {hit['code']:<10} text={hit['text']:.2f} profs={hit['professors']:.2f} prereqs={hit['prereqs']:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,248 @@
+"""Multi-process deployment: build the vector index once, share it read-only.
+
+In the default single-process mode every server start wipes ./chroma_db and
+re-embeds utils/data. That breaks with more than one worker process: each
+worker deletes the DB under the others and embeds the corpus again. With
+DEPLOY_MODE=multiprocess instead:
+
+1. The index is built once, under an exclusive file lock, and only when the
+   data or the embedder settings changed (the data's content hash and the
+   EMBEDDING_* config are recorded next to the index). Run it as a separate
+   step, or let the first process to start do it:
+
+       python -m utils.deploy build [--backend numpy|chroma] [--force]
+
+2. Every build goes into a new versioned directory, and CHROMA_DB_PATH (or
+   VECTOR_INDEX_DIR) is a symlink that is swapped to it in one rename (see
+   utils/versioned.py). A running worker keeps reading the version it opened
+   and never sees a deleted or half-built DB. Workers open the index
+   read-only and lazily in each process, after fork. They reopen it when
+   the link moves to a new version. /chroma/add* return 409.
+
+3. With gunicorn's preload (see gunicorn.conf.py) the app - course catalog,
+   parent documents, config - is loaded once in the master before forking,
+   so workers share those pages copy-on-write. The NumPy index is mmapped
+   and shared through the page cache either way.
+
+    gunicorn -c gunicorn.conf.py utils.api_server:app
+    DEPLOY_MODE=multiprocess uvicorn utils.api_server:app --workers 4
+
+Environment: DEPLOY_MODE, VECTOR_BACKEND, CHROMA_DB_PATH (default ./chroma_db),
+VECTOR_INDEX_DIR, INDEX_LOCK_PATH (default utils/.index.lock).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from utils import versioned
+from utils.chunking import data_fingerprint
+from utils.embeddings import embedding_config
+from utils.locking import file_lock
+
+
+DEFAULT_DATA_DIR = Path(__file__).parent / "data"
+CHROMA_DB_PATH = Path(os.getenv("CHROMA_DB_PATH", "./chroma_db"))
+LOCK_PATH = Path(os.getenv("INDEX_LOCK_PATH", str(Path(__file__).parent / ".index.lock")))
+CHROMA_BUILD_MARKER = "build.json"
+# seconds between checks of the published index version in each process
+VERSION_CHECK_INTERVAL = 2.0
+# seconds a replaced store stays open for the requests still using it
+CLOSE_DELAY = 60.0
+
+logger = logging.getLogger("deploy")
+
+
+def multiprocess_enabled() -> bool:
+    return os.getenv("DEPLOY_MODE", "single").strip().lower() in ("multiprocess", "multi", "prefork")
+
+
+def default_backend() -> str:
+    return os.getenv("VECTOR_BACKEND", "chroma").strip().lower()
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def index_path(backend: str) -> Path:
+    """The published (symlinked) location of the index for `backend`."""
+    if backend == "numpy":
+        from utils.numpy_store import DEFAULT_INDEX_DIR
+
+        return DEFAULT_INDEX_DIR
+    return CHROMA_DB_PATH
+
+
+def store_version(backend: Optional[str] = None) -> Path:
+    """The version directory the index for `backend` currently points at."""
+    return versioned.current(index_path(backend or default_backend()))
+
+
+def index_is_fresh(backend: str, data_dir: Path | str = DEFAULT_DATA_DIR) -> bool:
+    """True if the built index for `backend` matches the current data files and EMBEDDING_* settings."""
+    marker = _read_json(store_version(backend) / ("meta.json" if backend == "numpy" else CHROMA_BUILD_MARKER))
+    built = marker.get("data_hash")
+    return built is not None and built == data_fingerprint(data_dir) and marker.get("embedding") == embedding_config()
+
+
+def _build_chroma(data_dir: str, db_path: str) -> None:
+    # runs in a spawned child: chromadb caches clients per path in-process, and
+    # that state must not be inherited by forked workers. `db_path` is a fresh
+    # version directory that no worker has open.
+    from utils.chroma import ChromaVectorStore
+
+    store = ChromaVectorStore(db_path=db_path, reset=False)
+    store.populate_from_dir(data_dir, collection_name="allData", force=True)
+    if not store.collection.count():
+        # populate_from_dir logs and swallows embedding errors; never publish an empty index
+        raise RuntimeError(f"No chunks were indexed from {data_dir}")
+    marker = {
+        "data_hash": data_fingerprint(data_dir),
+        "embedding": embedding_config(),
+        "count": store.collection.count(),
+    }
+    (Path(db_path) / CHROMA_BUILD_MARKER).write_text(json.dumps(marker), encoding="utf-8")
+
+
+def ensure_index(backend: Optional[str] = None, data_dir: Path | str = DEFAULT_DATA_DIR, force: bool = False) -> bool:
+    """Build the index for `backend` unless an up-to-date one exists. Returns True if built.
+
+    Safe to call from every worker: the exclusive lock lets one process build
+    while the others wait, and then find the index fresh.
+    """
+    backend = backend or default_backend()
+    with file_lock(LOCK_PATH):
+        if not force and index_is_fresh(backend, data_dir):
+            logger.info("Vector index (%s) is up to date", backend)
+            return False
+        logger.info("Building vector index (%s) from %s", backend, data_dir)
+        if backend == "numpy":
+            from utils.numpy_store import build_index
+
+            build_index(data_dir)
+        else:
+            version = versioned.new_version(CHROMA_DB_PATH)
+            proc = multiprocessing.get_context("spawn").Process(
+                target=_build_chroma, args=(str(data_dir), str(version)), name="chroma-build"
+            )
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                shutil.rmtree(version, ignore_errors=True)
+                raise RuntimeError(f"Chroma index build failed (exit code {proc.exitcode})")
+            versioned.publish(version, CHROMA_DB_PATH)
+        return True
+
+
+def open_store(backend: Optional[str] = None):
+    """Open the current version of the prebuilt index read-only.
+
+    The link is resolved once, so the store keeps reading that version even
+    if a newer one is published while it is open.
+    """
+    backend = backend or default_backend()
+    version = store_version(backend)
+    if backend == "numpy":
+        from utils.numpy_store import NumpyVectorStore
+
+        return NumpyVectorStore(version, read_only=True)
+    from utils.chroma import ChromaVectorStore
+
+    return ChromaVectorStore(db_path=str(version), reset=False, read_only=True)
+
+
+class LazyStore:
+    """Proxy that opens the real store on first use in each process.
+
+    Opening after fork keeps client state (sqlite connections, threads) out of
+    the pre-fork master; a store inherited across fork is reopened. With
+    `version` (e.g. store_version), the store is also reopened when that
+    value changes, i.e. when a rebuilt index has been published. `version`
+    is checked at most every `check_interval` seconds. A replaced store is
+    closed `close_delay` seconds later, once requests still using it are done.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        version: Optional[Callable[[], Any]] = None,
+        check_interval: float = VERSION_CHECK_INTERVAL,
+        close_delay: float = CLOSE_DELAY,
+    ):
+        self._factory = factory
+        self._version = version or (lambda: None)
+        self._check_interval = check_interval
+        self._close_delay = close_delay
+        self._store = None
+        self._pid: Optional[int] = None
+        self._opened_version: Any = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _get(self):
+        fresh = time.monotonic() - self._checked_at < self._check_interval
+        if self._store is not None and self._pid == os.getpid() and fresh:
+            return self._store
+        with self._lock:
+            if self._store is None or self._pid != os.getpid():
+                # first use, or a store inherited across fork: not ours to close
+                self._opened_version = self._version()
+                self._store = self._factory()
+                self._pid = os.getpid()
+            elif time.monotonic() - self._checked_at >= self._check_interval:
+                version = self._version()
+                if version != self._opened_version:
+                    old, self._store = self._store, self._factory()
+                    self._opened_version = version
+                    self._close_later(old)
+            self._checked_at = time.monotonic()
+            return self._store
+
+    def _close_later(self, store) -> None:
+        close = getattr(store, "close", None)
+        if close is None:
+            return
+
+        def run():
+            try:
+                close()
+            except Exception:
+                logger.exception("Failed to close the replaced vector store")
+
+        timer = threading.Timer(self._close_delay, run)
+        timer.daemon = True
+        timer.start()
+
+    def __getattr__(self, name: str):
+        return getattr(self._get(), name)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the shared vector index for multi-process deployments.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the index if the data changed")
+    build.add_argument("--backend", choices=("chroma", "numpy"), default=default_backend())
+    build.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    build.add_argument("--force", action="store_true", help="rebuild even if the index is up to date")
+    args = parser.parse_args(argv)
+
+    built = ensure_index(args.backend, args.data_dir, force=args.force)
+    print(f"{args.backend} index {'built' if built else 'already up to date'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
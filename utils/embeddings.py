@@ -0,0 +1,330 @@
+"""Pluggable, batched embedding functions shared by the vector stores.
+
+Environment:
+- EMBEDDING_BACKEND         "default" (chromadb's built-in all-MiniLM-L6-v2),
+                            "onnx" (same model on a tuned onnxruntime session) or
+                            "sentence-transformers"
+- EMBEDDING_MODEL           sentence-transformers model name (default all-MiniLM-L6-v2)
+- EMBEDDING_BATCH_SIZE      texts per forward pass (default 32)
+- EMBEDDING_THREADS         intra-op threads for onnx / torch (default: runtime's choice)
+- EMBEDDING_WORKERS         batches embedded concurrently during ingest (default 1)
+- EMBEDDING_MAX_SEQ_LENGTH  tokens kept per text (default 256)
+- EMBEDDING_QUANTIZE        "int8" for dynamic int8 quantization (onnx / sentence-transformers)
+- EMBEDDING_BATCH_WINDOW_MS queries arriving within this window share one forward
+                            pass (default 2; 0 disables micro-batching)
+
+All backends return L2-normalized float32 vectors. Every embedder is also a
+chromadb-compatible embedding function (`embedder(input) -> list of vectors`).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils import metrics
+
+
+logger = logging.getLogger("embeddings")
+
+EMBED_BATCH_SIZE = metrics.histogram(
+    "embedding_batch_size",
+    "Texts per embedding forward pass",
+    ("kind",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+def _env_int(name: str, default: Optional[int], env: Mapping[str, str] = os.environ) -> Optional[int]:
+    value = env.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class Embedder:
+    """Base class: subclasses implement `_embed_batch(texts) -> np.ndarray`."""
+
+    name = "embedder"
+
+    def __init__(self, batch_size: int = 32, workers: int = 1, batch_window_ms: float = 2.0):
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self._batcher: Optional[MicroBatcher] = None
+        if batch_window_ms > 0:
+            self._batcher = MicroBatcher(self._embed_normalized, batch_window_ms / 1e3, self.batch_size)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def _embed_normalized(self, texts: List[str]) -> np.ndarray:
+        return _normalize(np.asarray(self._embed_batch(texts), dtype=np.float32))
+
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts` in batches of `batch_size`, `workers` batches at a time."""
+        texts = [str(t) for t in texts]
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        for b in batches:
+            EMBED_BATCH_SIZE.observe(len(b), kind="documents")
+        if self.workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embed") as pool:
+                parts = list(pool.map(self._embed_normalized, batches))
+        else:
+            parts = [self._embed_normalized(b) for b in batches]
+        return np.vstack(parts)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed one query; concurrent callers are micro-batched together."""
+        if self._batcher is not None:
+            return self._batcher.submit(str(text))
+        EMBED_BATCH_SIZE.observe(1, kind="query")
+        return self._embed_normalized([str(text)])[0]
+
+    def __call__(self, input: Sequence[str]) -> List[np.ndarray]:
+        return list(self.embed_documents(input))
+
+
+class MicroBatcher:
+    """Coalesce single-text embedding requests that arrive within `window` seconds."""
+
+    def __init__(self, embed_fn, window: float, max_batch: int):
+        self.embed_fn = embed_fn
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        # started lazily so forked worker processes get their own thread
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, text: str) -> np.ndarray:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            EMBED_BATCH_SIZE.observe(len(batch), kind="query")
+            try:
+                vectors = self.embed_fn([text for text, _ in batch])
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+class ChromaDefaultEmbedder(Embedder):
+    """chromadb's DefaultEmbeddingFunction (ONNX all-MiniLM-L6-v2, fixed settings)."""
+
+    name = "all-MiniLM-L6-v2"
+
+    def __init__(self, **kwargs):
+        from chromadb.utils import embedding_functions
+
+        self._fn = embedding_functions.DefaultEmbeddingFunction()
+        super().__init__(**kwargs)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self._fn(texts), dtype=np.float32)
+
+
+class OnnxEmbedder(Embedder):
+    """all-MiniLM-L6-v2 on an onnxruntime session with configurable threads.
+
+    Uses the model files chromadb downloads (~/.cache/chroma/onnx_models),
+    pads each batch only to its longest text instead of always to 256 tokens,
+    and optionally runs a dynamically int8-quantized copy of the model.
+    """
+
+    name = "all-MiniLM-L6-v2"
+    MODEL_DIR = Path.home() / ".cache" / "chroma" / "onnx_models" / "all-MiniLM-L6-v2" / "onnx"
+
+    def __init__(
+        self,
+        model_dir: Optional[Path | str] = None,
+        threads: Optional[int] = None,
+        max_seq_length: int = 256,
+        quantize: Optional[str] = None,
+        **kwargs,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir) if model_dir else self.MODEL_DIR
+        if not (model_dir / "model.onnx").exists():
+            # let chromadb fetch (and checksum) the model the first time
+            from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+            ONNXMiniLM_L6_V2()(["warm up"])
+        model_path = model_dir / "model.onnx"
+        if quantize == "int8":
+            model_path = self._quantized(model_path)
+            self.name = f"{self.name}-int8"
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.log_severity_level = 3
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        super().__init__(**kwargs)
+
+    @staticmethod
+    def _quantized(model_path: Path) -> Path:
+        target = model_path.with_name("model.int8.onnx")
+        if not target.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info("Quantizing %s to int8", model_path)
+            tmp = target.with_suffix(f".tmp{os.getpid()}.onnx")
+            quantize_dynamic(str(model_path), str(tmp), weight_type=QuantType.QInt8)
+            os.replace(tmp, target)
+        return target
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        hidden = self.session.run(
+            None,
+            {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": np.zeros_like(input_ids)},
+        )[0]
+        # mean pooling over real (non-padding) tokens
+        mask = attention_mask[..., None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Any sentence-transformers model on CPU, optionally int8-quantized."""
+
+    def __init__(
+        self,
+        model: str = "all-MiniLM-L6-v2",
+        threads: Optional[int] = None,
+        max_seq_length: int = 256,
+        quantize: Optional[str] = None,
+        **kwargs,
+    ):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model, device="cpu")
+        self.model.max_seq_length = max_seq_length
+        if quantize == "int8":
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.name = model + ("-int8" if quantize == "int8" else "")
+        super().__init__(**kwargs)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+
+
+BACKENDS = {
+    "default": ChromaDefaultEmbedder,
+    "onnx": OnnxEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+}
+
+_embedder: Optional[Embedder] = None
+_embedder_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # model runtimes (onnxruntime / torch thread pools) are not fork-safe:
+    # forked workers build their own embedder on first use
+    global _embedder, _embedder_lock
+    _embedder = None
+    _embedder_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def embedder_from_env(env: Optional[Mapping[str, str]] = None) -> Embedder:
+    """Build a new embedder from the EMBEDDING_* environment variables (or those in `env`)."""
+    env = os.environ if env is None else env
+    backend = env.get("EMBEDDING_BACKEND", "default").strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; choose from {sorted(BACKENDS)}")
+    kwargs = {
+        "batch_size": _env_int("EMBEDDING_BATCH_SIZE", 32, env),
+        "workers": _env_int("EMBEDDING_WORKERS", 1, env),
+        "batch_window_ms": float(env.get("EMBEDDING_BATCH_WINDOW_MS", "2")),
+    }
+    if backend != "default":
+        kwargs.update(
+            threads=_env_int("EMBEDDING_THREADS", None, env),
+            max_seq_length=_env_int("EMBEDDING_MAX_SEQ_LENGTH", 256, env),
+            quantize=(env.get("EMBEDDING_QUANTIZE") or "").strip().lower() or None,
+        )
+    if backend == "sentence-transformers":
+        kwargs["model"] = env.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    logger.info("Using %s embedder (%s)", backend, kwargs)
+    return BACKENDS[backend](**kwargs)
+
+
+def embedding_config(env: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """The EMBEDDING_* settings that change the vectors (not threads or batching).
+
+    Index builds record this, so an index built under other settings is
+    rebuilt instead of being served with incomparable vectors.
+    """
+    env = os.environ if env is None else env
+    backend = env.get("EMBEDDING_BACKEND", "default").strip().lower()
+    config: Dict[str, Any] = {"backend": backend}
+    if backend != "default":
+        config["max_seq_length"] = _env_int("EMBEDDING_MAX_SEQ_LENGTH", 256, env)
+        config["quantize"] = (env.get("EMBEDDING_QUANTIZE") or "").strip().lower() or None
+    if backend == "sentence-transformers":
+        config["model"] = env.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    return config
+
+
+def get_embedder() -> Embedder:
+    """Process-wide shared embedder, created on first use."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = embedder_from_env()
+    return _embedder
@@ -0,0 +1,195 @@
+"""In-process background jobs for long-running maintenance work.
+
+Ingesting a large batch, rebuilding the vector collection or reloading the
+catalog can take longer than a client or proxy will wait, and running them
+inside a request ties up a serving thread. Instead they are submitted to a
+JobManager, which runs them on its own worker threads (separate from the
+request threadpool) and returns a job id immediately:
+
+    job = jobs.submit("ingest", ingest_fn, total=len(documents))
+    jobs.get(job.id).to_dict()   # {"id", "kind", "status", "progress", ...}
+    jobs.cancel(job.id)
+
+A job function receives its Job and reports progress with `job.update(done)`;
+it should call `job.check_cancelled()` between units of work, which raises
+JobCancelled once cancellation was requested. Worker threads run at lowered
+OS scheduling priority where supported, so maintenance yields the CPU to
+request handling.
+
+Environment:
+- JOB_WORKERS   concurrent jobs (default 1)
+- JOB_HISTORY   finished jobs kept for status queries (default 100)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+# added to the worker threads' nice value (Linux: per-thread priority)
+JOB_NICENESS = 10
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+logger = logging.getLogger("api_server.jobs")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, total: Optional[int] = None, params: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.params = params or {}
+        self.status = QUEUED
+        self.done = 0
+        self.total = total
+        self.message: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+
+    def update(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict[str, Any]:
+        progress = None
+        if self.total:
+            progress = round(min(1.0, self.done / self.total), 4)
+        elif self.status == SUCCEEDED:
+            progress = 1.0
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "done": self.done,
+            "total": self.total,
+            "progress": progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_s": round(end - self.started_at, 3) if self.started_at else None,
+            "cancel_requested": self.cancel_requested,
+        }
+
+
+def _lower_thread_priority() -> None:
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), JOB_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+class JobManager:
+    """Run job functions on a bounded worker pool and keep their status."""
+
+    def __init__(self, workers: int = JOB_WORKERS, history: int = JOB_HISTORY):
+        self.workers = max(1, workers)
+        self.history = history
+        self._queue: "queue.Queue[Tuple[Job, Callable[[Job], Any]]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ensure_workers(self) -> None:
+        # daemon threads, started lazily: they never block interpreter exit and
+        # forked worker processes start their own
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(self.workers - len(self._threads)):
+                t = threading.Thread(target=self._worker, name=f"job-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self) -> None:
+        _lower_thread_priority()
+        while True:
+            job, fn = self._queue.get()
+            self._run(job, fn)
+
+    def submit(self, kind: str, fn: Callable[[Job], Any], total: Optional[int] = None, params: Optional[Dict[str, Any]] = None) -> Job:
+        job = Job(kind, total, params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._ensure_workers()
+        self._queue.put((job, fn))
+        logger.info("Queued %s job %s", kind, job.id)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        if job.cancel_requested:
+            return
+        job.status, job.started_at = RUNNING, time.time()
+        try:
+            job.result = fn(job)
+            job.status = SUCCEEDED
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            logger.exception("%s job %s failed", job.kind, job.id)
+            job.status, job.error = FAILED, f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = time.time()
+            logger.info("%s job %s %s in %.2fs", job.kind, job.id, job.status, job.finished_at - job.started_at)
+
+    def _prune(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.status in FINISHED]
+        for job_id in finished[: max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, status: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j for j in reversed(jobs) if status is None or j.status == status]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; queued jobs never start, running ones stop at their next check."""
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED:
+            job._cancel.set()
+            if job.status == QUEUED:
+                job.status, job.finished_at = CANCELLED, time.time()
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        out = {s: 0 for s in (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)}
+        for job in self.list():
+            out[job.status] += 1
+        return out
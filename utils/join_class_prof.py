@@ -1,4 +1,11 @@
+"""Join the scraped catalog with RateMyProfessors data (one-off, full rebuild).
+
+`python -m utils.build_data` runs these steps as incremental, content-hashed
+stages and publishes the results to utils/data.
+"""
+
 import json
+import re
 from pathlib import Path
 from typing import Any, Dict, List
 
@@ -15,6 +22,9 @@ PROFS_PATH = DATA_DIR / "sdsu_cs_professors.json"
 COURSES_WITH_PROFS_PATH = DATA_DIR / "sdsu_cs_courses_with_professors.json"
 PROFS_LLM_PATH = DATA_DIR / "sdsu_cs_professors_llm.json"
 
+# subject letters (optionally split by spaces), then 2-3 digits and an optional suffix letter
+_COURSE_CODE_RE = re.compile(r"([A-Za-z]+(?:\s+[A-Za-z]+)*?)\s*([0-9]{2,3}[A-Za-z]?)\s*$")
+
 
 def load_json(path: Path) -> Any:
     if not path.exists():
@@ -25,23 +35,20 @@ def load_json(path: Path) -> Any:
 
 def normalize_course_code(code: str) -> str:
     """
-    Normalize course code to a canonical form like 'CS 150'.
-    Accepts 'cs150', 'CS150', 'cs 150', etc.
+    Normalize course code to a canonical form like 'CS 150', for any subject.
+    Accepts 'cs150', 'CS150', 'cs 150', 'cs 150l', etc.; multi-word subjects
+    are joined so catalog 'B A 323' and RateMyProfessors 'BA323' agree ('BA 323').
     """
     code = code.strip()
     # quick guard
     if not code:
         return code
 
-    # Uppercase and ensure there is exactly one space between prefix and number
-    # e.g., 'cs150' -> 'CS 150', 'cs 150' -> 'CS 150'
-    import re
-
-    m = re.match(r"(?i)\s*cs\s*([0-9]{2,3})\s*$", code)
+    m = _COURSE_CODE_RE.match(code)
     if m:
-        return f"CS {m.group(1)}"
+        return f"{''.join(m.group(1).split()).upper()} {m.group(2).upper()}"
 
-    # If it already looks like 'CS 150', leave it
+    # not a course code: leave it, upper-cased
     return code.upper()
 
 
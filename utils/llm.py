@@ -5,6 +5,7 @@ load_dotenv(override=True)
 
 import litellm
 from utils.log import logger
+from utils.metrics import LLM_CALLS, LLM_TOKENS
 
 class LiteLLM():
     def __init__(self, model_name, base_url, api_key):
@@ -29,11 +30,19 @@ class LiteLLM():
                 messages=m,
                 model=self.model_name,
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
         except Exception as e:
+            LLM_CALLS.inc(outcome="error")
             logger.error(f"Failed to send message: {e}")
             return None
 
+        LLM_CALLS.inc(outcome="ok")
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, kind="prompt")
+            LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, kind="completion")
+        return content
+
 LITELLM_MODEL_NAME = os.getenv("LITELLM_MODEL_NAME")
 LITELLM_API_BASE = os.getenv("LITELLM_API_BASE")
 LITELLM_API_KEY = os.getenv("LITELLM_API_KEY")
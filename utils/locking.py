@@ -0,0 +1,72 @@
+"""Cross-process file locks for coordinating index builds between workers.
+
+    with file_lock("utils/.index.lock"):               # exclusive (writers)
+        build()
+    with file_lock("utils/.index.lock", shared=True):  # shared (readers)
+        open_index()
+
+Uses flock on POSIX and msvcrt on Windows (where every lock is exclusive).
+Locks are advisory and released when the process exits, so a crashed
+builder never leaves a stale lock behind.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+def _try_lock(fd: int, shared: bool) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: Path | str, shared: bool = False, timeout: Optional[float] = None, poll: float = 0.1) -> Iterator[None]:
+    """Hold a lock on `path` (created if missing) for the duration of the block.
+
+    Raises LockTimeout if the lock is not acquired within `timeout` seconds
+    (None waits forever).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(str(path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not _try_lock(fd, shared):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise LockTimeout(f"Timed out waiting for lock {path}")
+            time.sleep(poll)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
@@ -1,12 +1,217 @@
+"""Logging setup for the backend.
+
+Records are handed to a bounded in-memory queue (`QueueHandler`) and written
+by a background listener thread, so request threads never block on stream
+or file I/O. If the queue is full the record is dropped (and counted) rather
+than stalling the caller.
+
+Environment:
+- LOG_LEVEL                level for the root logger (default INFO)
+- LOG_FORMAT               "json" (default) for one JSON object per line, or "text"
+- LOG_QUEUE_SIZE           max records buffered before dropping (default 10000)
+- LOG_MAX_PAYLOAD          max characters of a payload kept by log_payload (default 2000)
+- LOG_PAYLOAD_SAMPLE_RATE  default fraction of payload records kept (default 0.05)
+- LOG_SAMPLE_RATES         per-logger overrides, e.g. "api_server.rag=0.2,chroma=1"
+
+Nothing is configured at import: the process entry point calls
+`setup_logging()` (`create_app()` does), so importing this module from a
+library, test or script leaves the caller's logging setup alone.
+
+Large payloads (retrieved RAG context, LLM replies) should go through
+`log_payload()`, which checks the level first, samples per logger and truncates
+before anything is formatted.
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
+import time
+from typing import Dict, Optional
+
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
-LOG_LEVEL = os.getenv("LOG_LEVEL")
+LOG_LEVEL = os.getenv("LOG_LEVEL") or "INFO"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").strip().lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_PAYLOAD = int(os.getenv("LOG_MAX_PAYLOAD", "2000"))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.05"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(filename)s:%(lineno)d] %(message)s"
+
+# attributes every LogRecord has; anything else was passed via `extra=`
+_STANDARD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects, including `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + ".%03dZ" % record.msecs,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "where": f"{record.filename}:{record.lineno}",
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                out[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args into the message here (cheap) but leave structured
+        # extras untouched for the formatter on the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+class PayloadSampler:
+    """Decide per logger whether a payload record is kept."""
+
+    def __init__(self, default_rate: float = LOG_PAYLOAD_SAMPLE_RATE, rates: Optional[Dict[str, float]] = None):
+        self.default_rate = default_rate
+        self.rates: Dict[str, float] = dict(rates or {})
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse(spec: str) -> Dict[str, float]:
+        rates: Dict[str, float] = {}
+        for part in (spec or "").split(","):
+            if "=" not in part:
+                continue
+            name, rate = part.split("=", 1)
+            try:
+                rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+            except ValueError:
+                continue
+        return rates
+
+    def set_rate(self, logger_name: str, rate: float) -> None:
+        with self._lock:
+            self.rates[logger_name] = max(0.0, min(1.0, rate))
+
+    def rate_for(self, logger_name: str) -> float:
+        # most specific configured ancestor wins: "api_server.rag" > "api_server"
+        name = logger_name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return self.default_rate
+
+    def keep(self, logger_name: str) -> bool:
+        rate = self.rate_for(logger_name)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+sampler = PayloadSampler(rates=PayloadSampler.parse(os.getenv("LOG_SAMPLE_RATES", "")))
+
+
+def truncate(text: str, limit: int = LOG_MAX_PAYLOAD) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"... [{len(text) - limit} more chars]"
+
+
+def log_payload(log: logging.Logger, level: int, msg: str, payload, max_chars: int = LOG_MAX_PAYLOAD) -> None:
+    """Log `msg` with a large `payload`, sampled per logger and truncated.
+
+    Does nothing (and formats nothing) unless the level is enabled and the
+    record survives sampling.
+    """
+    if not log.isEnabledFor(level) or not sampler.keep(log.name):
+        return
+    text = payload if isinstance(payload, str) else str(payload)
+    log.log(
+        level,
+        msg,
+        extra={
+            "payload": truncate(text, max_chars),
+            "payload_chars": len(text),
+            "sample_rate": sampler.rate_for(log.name),
+        },
+        stacklevel=2,
+    )
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level: Optional[str] = None) -> logging.handlers.QueueListener:
+    """Route root logging through a queue drained by a listener thread. Idempotent."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        if LOG_FORMAT == "text":
+            formatter: logging.Formatter = logging.Formatter(TEXT_FORMAT)
+        else:
+            formatter = JsonFormatter()
+        stream = logging.StreamHandler()
+        stream.setFormatter(formatter)
+
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        root = logging.getLogger()
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        root.addHandler(_DroppingQueueHandler(log_queue))
+        root.setLevel(level or LOG_LEVEL)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+def _restart_after_fork() -> None:
+    # threads do not survive fork(): give each forked worker process its own
+    # queue and drain thread (the parent's queue lock may have been held)
+    global _listener
+    if _listener is None:
+        return
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    for h in logging.getLogger().handlers:
+        if isinstance(h, _DroppingQueueHandler):
+            h.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def dropped_records() -> int:
+    return _DroppingQueueHandler.dropped
+
 
-logging.basicConfig(
-    level=LOG_LEVEL,
-    format="%(asctime)s %(levelname)s %(filename)s:%(lineno)d] %(message)s",
-)
 logger = logging.getLogger()
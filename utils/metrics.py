@@ -0,0 +1,277 @@
+"""Minimal Prometheus-style metrics for the API server.
+
+Dependency-free on purpose (like CourseDB): a small registry of counters,
+gauges and histograms that renders the Prometheus text exposition format,
+served by the API at `GET /metrics`.
+
+- counter(name, help, labels) / gauge(...) / histogram(...) - register metrics
+- stage_timer(stage) - time a step of a request (e.g. the LLM call in /rag);
+  observations are labelled with the route currently being served
+- MetricsMiddleware - ASGI middleware recording latency and status per route
+- REGISTRY.add_collector(name, fn) - callback run at scrape time for values that are
+  cheaper to read on demand (collection sizes, cache hit ratios)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# route template of the request being served (set by MetricsMiddleware)
+current_route: contextvars.ContextVar[str] = contextvars.ContextVar("current_route", default="")
+# optional per-request {stage: seconds} sink (set by e.g. the traffic capture middleware)
+request_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_stages", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = row
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines: List[str] = []
+        for key, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(row[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {_format_value(row[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], None]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type/labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def add_collector(self, name: str, fn: Callable[[], None]) -> None:
+        """Register (or replace) a callback that refreshes gauges right before rendering."""
+        with self._lock:
+            self._collectors[name] = fn
+
+    def render(self) -> str:
+        for fn in list(self._collectors.values()):
+            try:
+                fn()
+            except Exception:
+                logging.getLogger("api_server.metrics").exception("Metrics collector failed")
+        lines: List[str] = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            body = metric.render()
+            if not body:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(body)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labels))
+
+
+def gauge(name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labels))
+
+
+def histogram(name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labels, buckets))
+
+
+# --- metrics shared across modules ---
+REQUEST_LATENCY = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("route", "method")
+)
+REQUESTS = counter("http_requests_total", "HTTP requests by route and status", ("route", "method", "status"))
+STAGE_LATENCY = histogram(
+    "request_stage_duration_seconds", "Time spent in individual request stages", ("route", "stage")
+)
+CACHE_LOOKUPS = gauge("cache_lookups", "Cache lookups since start by cache and result", ("cache", "result"))
+CACHE_HIT_RATIO = gauge("cache_hit_ratio", "Fraction of cache lookups that were hits", ("cache",))
+LLM_TOKENS = counter("llm_tokens_total", "LLM tokens used", ("kind",))
+LLM_CALLS = counter("llm_requests_total", "LLM calls by outcome", ("outcome",))
+VECTOR_COLLECTION_SIZE = gauge("vector_collection_documents", "Documents per vector collection", ("collection",))
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Record how long the enclosed block takes as `stage` of the current route."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.observe(elapsed, route=current_route.get() or "none", stage=stage)
+        sink = request_stages.get()
+        if sink is not None:
+            sink[stage] = sink.get(stage, 0.0) + elapsed
+
+
+def record_cache(cache: str, hits: int, misses: int) -> None:
+    """Publish absolute hit/miss counts for a cache (called from collectors)."""
+    CACHE_LOOKUPS.set(hits, cache=cache, result="hit")
+    CACHE_LOOKUPS.set(misses, cache=cache, result="miss")
+    total = hits + misses
+    CACHE_HIT_RATIO.set(hits / total if total else 0.0, cache=cache)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template.
+
+    Paths are mapped onto the matching route's template (`/courses/{code}`)
+    so label cardinality stays bounded; unmatched paths are reported as
+    "unmatched".
+    """
+
+    def __init__(self, app, router=None):
+        self.app = app
+        self.router = router
+
+    def _route_for(self, scope) -> str:
+        if self.router is not None:
+            from starlette.routing import Match
+
+            for route in self.router.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    return getattr(route, "path", scope.get("path", ""))
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route_for(scope)
+        method = scope.get("method", "")
+        token = current_route.set(route)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - started, route=route, method=method)
+            REQUESTS.inc(route=route, method=method, status=str(status["code"]))
+            current_route.reset(token)
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,341 @@
+"""In-process vector store over precomputed, memory-mapped embeddings.
+
+The corpus (a few hundred to a few thousand chunks) is far too small to need
+a vector database: exact top-k over L2-normalized vectors is one matrix-vector
+product. Embeddings are computed once by the build step and saved next to
+utils/data:
+
+    utils/index/
+        embeddings.npy   float32 [n_chunks, dim], rows L2-normalized
+        chunks.json      [{id, parent_id, section, text}, ...] in row order
+        parents.json     {parent_id: record}
+        meta.json        {model, dim, count, data_hash, embedding, built_at}
+
+    python -m utils.numpy_store build            # (re)build utils/index
+    python -m utils.numpy_store query "data structures"
+
+utils/index is a symlink to a versioned directory that a rebuild swaps
+atomically (utils/versioned.py); a store reads all files from the version it
+resolved when loading. Loading fails with a clear error when the index was
+built with a different embedding model or dimension than the runtime
+embedder (EMBEDDING_*), since its vectors would not be comparable.
+
+The server memory-maps embeddings.npy read-only, so startup does no embedding
+and every worker process shares the same page-cache pages. Documents added at
+runtime (/chroma/add) live in an in-memory overlay and are not persisted.
+
+Select this backend with VECTOR_BACKEND=numpy; VECTOR_INDEX_DIR overrides the
+index location. The interface matches ChromaVectorStore.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils import versioned
+from utils.chunking import chunk_records, data_fingerprint, load_records, parent_text
+from utils.embeddings import embedding_config, get_embedder
+from utils.metrics import stage_timer
+
+
+DEFAULT_INDEX_DIR = Path(os.getenv("VECTOR_INDEX_DIR", str(Path(__file__).parent / "index")))
+DEFAULT_DATA_DIR = Path(__file__).parent / "data"
+
+EMBED_BATCH_SIZE = 64
+
+logger = logging.getLogger("vector_index")
+
+
+def default_embedding_function() -> Callable[[Sequence[str]], Any]:
+    """The shared embedder configured by EMBEDDING_* (see utils/embeddings.py)."""
+    return get_embedder()
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def embed_texts(embedding_function, texts: Sequence[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    """Embed `texts` in batches into one L2-normalized float32 matrix."""
+    if hasattr(embedding_function, "embed_documents"):
+        return embedding_function.embed_documents(texts)
+    parts = []
+    for i in range(0, len(texts), batch_size):
+        parts.append(np.asarray(embedding_function(list(texts[i:i + batch_size])), dtype=np.float32))
+    if not parts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return _normalize(np.vstack(parts)).astype(np.float32, copy=False)
+
+
+def build_index(
+    data_dir: Path | str = DEFAULT_DATA_DIR,
+    index_dir: Path | str = DEFAULT_INDEX_DIR,
+    embedding_function=None,
+    model_name: Optional[str] = None,
+    before_publish: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """Chunk and embed every record in `data_dir` and publish the index to `index_dir`.
+
+    Files are written to a new version directory and `index_dir` (a symlink)
+    is then switched to it in one rename, so readers never observe a missing
+    or half-written index. If `before_publish()` raises, nothing is published.
+    """
+    # the EMBEDDING_* settings are only known to apply to the shared embedder
+    embedding = embedding_config() if embedding_function is None else None
+    embedding_function = embedding_function or default_embedding_function()
+    chunks, parents = chunk_records(load_records(data_dir))
+    started = time.perf_counter()
+    matrix = embed_texts(embedding_function, [c["text"] for c in chunks])
+    meta = {
+        "model": model_name or getattr(embedding_function, "name", "unknown"),
+        "dim": int(matrix.shape[1]) if matrix.size else 0,
+        "count": len(chunks),
+        "data_hash": data_fingerprint(data_dir),
+        "embedding": embedding,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "embed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+    index_dir = Path(index_dir)
+    version = versioned.new_version(index_dir)
+    try:
+        np.save(version / "embeddings.npy", matrix)
+        (version / "chunks.json").write_text(json.dumps(chunks, ensure_ascii=False), encoding="utf-8")
+        (version / "parents.json").write_text(json.dumps(parents, ensure_ascii=False), encoding="utf-8")
+        (version / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        if before_publish is not None:
+            before_publish()
+        versioned.publish(version, index_dir)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+    logger.info("Built vector index at %s: %d chunks, dim %d", index_dir, meta["count"], meta["dim"])
+    return meta
+
+
+class NumpyVectorStore:
+    """Exact cosine-similarity search over a memory-mapped embedding matrix."""
+
+    def __init__(
+        self,
+        index_dir: Path | str = DEFAULT_INDEX_DIR,
+        embedding_function=None,
+        mmap: bool = True,
+        read_only: bool = False,
+    ):
+        self.index_dir = Path(index_dir)
+        self.mmap = mmap
+        self.read_only = read_only
+        self._embedding_function = embedding_function
+        self._lock = threading.Lock()
+        self.meta: Dict[str, Any] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._chunks: List[Dict[str, Any]] = []
+        self._parents: Dict[str, Any] = {}
+        # runtime additions, kept in memory on top of the read-only index
+        self._extra_vectors: List[np.ndarray] = []
+        self._extra_chunks: List[Dict[str, Any]] = []
+        self._extra_matrix: Optional[np.ndarray] = None
+        if (self.index_dir / "embeddings.npy").exists():
+            self.load()
+
+    @property
+    def embedding_function(self):
+        # resolved lazily so opening an index never loads the model until a query needs it
+        if self._embedding_function is None:
+            fn = default_embedding_function()
+            self._check_model(self.meta, fn)
+            self._embedding_function = fn
+        return self._embedding_function
+
+    def _check_model(self, meta: Dict[str, Any], fn) -> None:
+        built, runtime = meta.get("model"), getattr(fn, "name", None)
+        if built and runtime and built != runtime:
+            raise ValueError(
+                f"Vector index at {self.index_dir} was built with embedding model {built!r}, but the runtime "
+                f"embedder is {runtime!r}; rebuild the index (python -m utils.numpy_store build) or set EMBEDDING_* to match"
+            )
+
+    def _check_dim(self, query: np.ndarray, matrix: np.ndarray) -> None:
+        if matrix.size and query.shape[-1] != matrix.shape[1]:
+            raise ValueError(
+                f"Vector index at {self.index_dir} has {matrix.shape[1]}-dimensional embeddings "
+                f"({self.meta.get('model')!r}), but the runtime embedder returns {query.shape[-1]} dimensions; "
+                "rebuild the index or set EMBEDDING_* to match"
+            )
+
+    def load(self) -> None:
+        """(Re)open the current version of the index in `index_dir`.
+
+        Raises ValueError if the index does not match the runtime embedder.
+        """
+        directory = versioned.current(self.index_dir)
+        matrix = np.load(directory / "embeddings.npy", mmap_mode="r" if self.mmap else None)
+        chunks = json.loads((directory / "chunks.json").read_text(encoding="utf-8"))
+        parents = json.loads((directory / "parents.json").read_text(encoding="utf-8"))
+        meta_path = directory / "meta.json"
+        meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.exists() else {}
+        if len(chunks) != matrix.shape[0]:
+            raise ValueError(f"Index at {directory} is inconsistent: {matrix.shape[0]} vectors, {len(chunks)} chunks")
+        if meta.get("dim") and matrix.size and meta["dim"] != matrix.shape[1]:
+            raise ValueError(f"Index at {directory} is inconsistent: meta.json says dim {meta['dim']}, vectors have {matrix.shape[1]}")
+        if self._embedding_function is not None:
+            self._check_model(meta, self._embedding_function)
+        with self._lock:
+            self._matrix, self._chunks, self._parents, self.meta = matrix, chunks, parents, meta
+
+    # --- writes (in-memory overlay) ---
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise PermissionError("Vector store is read-only in this deployment; rebuild it with `python -m utils.deploy build`")
+
+    def _add(self, chunks: List[Dict[str, Any]]) -> None:
+        self._check_writable()
+        vectors = embed_texts(self.embedding_function, [c["text"] for c in chunks])
+        with self._lock:
+            self._extra_vectors.append(vectors)
+            self._extra_chunks.extend(chunks)
+            self._extra_matrix = None
+
+    def add_document(self, document_text: str, collection_name: str):
+        return self.add_documents([document_text], collection_name)[0]
+
+    def add_documents(self, document_texts, collection_name: str):
+        if not isinstance(document_texts, (list, tuple)):
+            raise ValueError("'document_texts' must be a list or tuple of strings")
+        ids = [str(uuid.uuid4()) for _ in document_texts]
+        self._add([
+            {"id": i, "parent_id": i, "section": None, "text": str(t)} for i, t in zip(ids, document_texts)
+        ])
+        return ids
+
+    def add_chunks(self, chunks, collection_name: str):
+        known = {c["id"] for c in self._chunks} | {c["id"] for c in self._extra_chunks}
+        unique: Dict[str, Dict[str, Any]] = {}
+        for chunk in chunks:
+            if chunk["id"] not in known:
+                unique.setdefault(chunk["id"], chunk)
+        if unique:
+            self._add(list(unique.values()))
+        return list(unique)
+
+    # --- reads ---
+
+    def _search(self, query_text: str, n_results: int):
+        with stage_timer("embed"):
+            fn = self.embedding_function
+            if hasattr(fn, "embed_query"):
+                query = fn.embed_query(query_text)
+            else:
+                query = embed_texts(fn, [query_text])[0]
+        with stage_timer("vector_query"):
+            with self._lock:
+                matrix, chunks = self._matrix, self._chunks
+                if self._extra_vectors and self._extra_matrix is None:
+                    self._extra_matrix = np.vstack(self._extra_vectors)
+                extra, extra_chunks = self._extra_matrix, self._extra_chunks
+            self._check_dim(np.asarray(query), matrix)
+            scores = matrix @ query if len(chunks) else np.zeros(0, dtype=np.float32)
+            if extra is not None:
+                scores = np.concatenate([scores, extra @ query])
+                chunks = chunks + extra_chunks
+            k = min(n_results, len(scores))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+        return [(chunks[i], float(scores[i])) for i in top]
+
+    def query_chunks(self, query_text, n_results, collection_name: str):
+        """Return the `n_results` closest chunks (cosine distance) as dicts."""
+        return [
+            {
+                "id": chunk["id"],
+                "parent_id": chunk.get("parent_id") or chunk["id"],
+                "section": chunk.get("section"),
+                "text": chunk["text"],
+                "distance": 1.0 - score,
+            }
+            for chunk, score in self._search(query_text, n_results)
+        ]
+
+    def query_similar_documents(self, query_text, n_results, collection_name: str):
+        # same list-of-lists shape chromadb returns for a single query
+        return [[chunk["text"] for chunk, _ in self._search(query_text, n_results)]]
+
+    def get_parent(self, parent_id: str):
+        record = self._parents.get(parent_id)
+        return parent_text(record) if record is not None else None
+
+    def collection_sizes(self):
+        return {"allData": len(self._chunks) + len(self._extra_chunks)}
+
+    # --- maintenance ---
+
+    def clear_collection(self, collection_name: str):
+        self._check_writable()
+        with self._lock:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+            self._chunks, self._parents = [], {}
+            self._extra_vectors, self._extra_chunks, self._extra_matrix = [], [], None
+
+    def reset_all_collections(self):
+        self.clear_collection("allData")
+
+    def populate_from_dir(self, data_dir: str | Path, collection_name: str = "allData", force: bool = False):
+        """Open the prebuilt index, building it from `data_dir` first if missing (or `force`)."""
+        if not self.read_only and (force or not (self.index_dir / "embeddings.npy").exists()):
+            logger.info("Building vector index at %s from %s", self.index_dir, data_dir)
+            build_index(data_dir, self.index_dir, self.embedding_function)
+        self.load()
+
+    def rebuild_from_dir(self, data_dir: str | Path, collection_name: str = "allData", before_swap=None):
+        """Build a new index from `data_dir` and switch to it once complete.
+
+        The current index keeps serving queries while the new one is embedded.
+        Runtime additions are dropped with the old index.
+        """
+        self._check_writable()
+        build_index(data_dir, self.index_dir, self.embedding_function, before_publish=before_swap)
+        self.load()
+        with self._lock:
+            self._extra_vectors, self._extra_chunks, self._extra_matrix = [], [], None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query the precomputed vector index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="chunk, embed and publish utils/data")
+    build.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    build.add_argument("--index-dir", type=Path, default=DEFAULT_INDEX_DIR)
+    query = sub.add_parser("query", help="print the top chunks for a question")
+    query.add_argument("text")
+    query.add_argument("-n", type=int, default=5)
+    query.add_argument("--index-dir", type=Path, default=DEFAULT_INDEX_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        print(json.dumps(build_index(args.data_dir, args.index_dir), indent=2))
+        return 0
+    store = NumpyVectorStore(args.index_dir)
+    for hit in store.query_chunks(args.text, args.n, "allData"):
+        print(f"{hit['distance']:.3f}  {hit['id']:<28} {hit['text'][:100]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
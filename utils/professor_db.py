@@ -0,0 +1,223 @@
+"""Indexed professor store with precomputed per-course rankings.
+
+Professors are loaded from the RateMyProfessors export
+(utils/data/sdsu_cs_professors_llm.json) and joined with the professor lists
+inside the course catalog (utils/data/sdsu_cs_courses_with_professors.json):
+
+- ProfessorDB() - load both files (missing files give an empty DB)
+- get(prof_id) -> dict | None - one professor, with their ranking fields
+- get_all() -> list[dict] - all professors, best ranked first
+- for_course(code) -> list[dict] | None - professors of a course, best first
+- courses_of(prof_id) -> list[str] - course codes a professor teaches
+- search(term, course=None) -> list[dict] - name substring search, best first
+- reload() - reload from disk
+
+Raw averages over a handful of ratings are noisy (one 5.0 review beats 200
+reviews averaging 4.8), so every metric is Bayesian-adjusted toward the
+department mean, weighted by `num_ratings`:
+
+    adjusted = (n * value + PRIOR_RATINGS * mean) / (n + PRIOR_RATINGS)
+
+and the ranking `score` (0..1) blends adjusted quality, would-take-again and
+easiness (5 - difficulty) with SCORE_WEIGHTS. Scores and the per-course
+orderings are computed once per load with NumPy, so ranking queries are
+lookups.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.join_class_prof import normalize_course_code
+
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+DEFAULT_PROFESSORS_JSON = DATA_DIR / "sdsu_cs_professors_llm.json"
+DEFAULT_COURSES_JSON = DATA_DIR / "sdsu_cs_courses_with_professors.json"
+
+# pseudo-ratings of the department mean added to every professor
+PRIOR_RATINGS = float(os.getenv("PROFESSOR_PRIOR_RATINGS", "10"))
+# blend of (quality, would take again, easiness) in the ranking score
+SCORE_WEIGHTS = (0.6, 0.3, 0.1)
+
+# fields copied from the source records into the public professor dicts
+_FIELDS = ("id", "name", "url", "department", "overall_quality", "overall_difficulty", "num_ratings", "would_take_again_percent")
+
+logger = logging.getLogger("professor_db")
+
+
+def _normalize_code(code: str) -> str:
+    # same canonical form as the catalog/RMP join ("B A 323" and "BA323" -> "BA 323")
+    return normalize_course_code(code or "")
+
+
+def _read_list(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    with path.open("r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a list of objects in {path}")
+    return data
+
+
+def _column(records: Sequence[Dict[str, Any]], field: str) -> np.ndarray:
+    """`field` of every record as float64, NaN where missing or negative (RMP uses -1)."""
+    values = np.array([r.get(field) if r.get(field) is not None else np.nan for r in records], dtype=np.float64)
+    values[values < 0] = np.nan
+    return values
+
+
+def bayesian_adjust(
+    values: np.ndarray,
+    counts: np.ndarray,
+    prior: float = PRIOR_RATINGS,
+    groups: Optional[Sequence[Any]] = None,
+) -> np.ndarray:
+    """Shrink `values` toward their group's rating-weighted mean; NaN values get that mean.
+
+    `groups` gives the group (department) of every value; without it, or for
+    a group with no known values, the overall mean is used.
+    """
+    known = ~np.isnan(values) & (counts > 0)
+    if not known.any():
+        return np.full(values.shape, np.nan)
+    mean = np.full(values.shape, np.average(values[known], weights=counts[known]))
+    if groups is not None:
+        labels, inverse = np.unique(np.array([g or "" for g in groups], dtype=object), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        weights = np.where(known, counts, 0.0)
+        totals = np.bincount(inverse, weights=weights, minlength=len(labels))
+        sums = np.bincount(inverse, weights=weights * np.nan_to_num(values), minlength=len(labels))
+        has_mean = totals[inverse] > 0
+        mean[has_mean] = (sums / np.where(totals > 0, totals, 1.0))[inverse][has_mean]
+    n = np.where(known, counts, 0.0)
+    return (n * np.nan_to_num(values) + prior * mean) / (n + prior)
+
+
+def rank_scores(records: Sequence[Dict[str, Any]], prior: float = PRIOR_RATINGS, weights: Sequence[float] = SCORE_WEIGHTS) -> Dict[str, np.ndarray]:
+    """Adjusted metrics and the blended 0..1 score for `records`, as arrays."""
+    counts = np.nan_to_num(_column(records, "num_ratings"))
+    departments = [r.get("department") for r in records]
+    quality = bayesian_adjust(_column(records, "overall_quality"), counts, prior, departments)
+    take_again = bayesian_adjust(_column(records, "would_take_again_percent"), counts, prior, departments)
+    difficulty = bayesian_adjust(_column(records, "overall_difficulty"), counts, prior, departments)
+    w_quality, w_again, w_easy = weights
+    # NaN only when no professor has the metric at all; score it neutrally
+    score = (
+        w_quality * np.nan_to_num((quality - 1.0) / 4.0, nan=0.5)
+        + w_again * np.nan_to_num(take_again / 100.0, nan=0.5)
+        + w_easy * np.nan_to_num((5.0 - difficulty) / 4.0, nan=0.5)
+    )
+    return {"quality": quality, "take_again": take_again, "difficulty": difficulty, "score": score}
+
+
+class ProfessorDB:
+    """In-memory professor index with course <-> professor maps."""
+
+    def __init__(
+        self,
+        professors_path: Optional[Path | str] = None,
+        courses_path: Optional[Path | str] = None,
+        load_on_init: bool = True,
+    ):
+        self.professors_path = Path(professors_path) if professors_path else DEFAULT_PROFESSORS_JSON
+        self.courses_path = Path(courses_path) if courses_path else DEFAULT_COURSES_JSON
+        self._professors: List[Dict[str, Any]] = []  # ranked, best first
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_course: Dict[str, List[Dict[str, Any]]] = {}
+        self._courses_of: Dict[str, List[str]] = {}
+        if load_on_init:
+            self.load()
+
+    def load(self) -> None:
+        """Load both files and rebuild the maps and rankings."""
+        records: Dict[str, Dict[str, Any]] = {}
+        courses_of: Dict[str, set] = {}
+
+        def add(prof: Dict[str, Any], codes) -> None:
+            pid = str(prof.get("id") or "").strip()
+            if not pid:
+                return
+            merged = records.setdefault(pid, {})
+            for field in _FIELDS:
+                if merged.get(field) is None and prof.get(field) is not None:
+                    merged[field] = prof[field]
+            merged["id"] = pid
+            courses_of.setdefault(pid, set()).update(_normalize_code(c) for c in codes if c)
+
+        for prof in _read_list(self.professors_path):
+            add(prof, prof.get("courses") or [])
+        for course in _read_list(self.courses_path):
+            for prof in course.get("professors") or []:
+                add(prof, [course.get("code")])
+
+        ids = list(records)
+        ranks = rank_scores([records[pid] for pid in ids])
+        order = np.argsort(-ranks["score"], kind="stable")
+        professors: List[Dict[str, Any]] = []
+        for rank, i in enumerate(order, start=1):
+            prof = {field: records[ids[i]].get(field) for field in _FIELDS}
+            prof.update({
+                "courses": sorted(courses_of[ids[i]]),
+                "adjusted_quality": _round(ranks["quality"][i]),
+                "adjusted_would_take_again": _round(ranks["take_again"][i], 1),
+                "adjusted_difficulty": _round(ranks["difficulty"][i]),
+                "score": _round(ranks["score"][i], 4),
+                "rank": rank,
+            })
+            professors.append(prof)
+
+        # per-course orderings: since `professors` is already sorted by score,
+        # appending in that order keeps every course list ranked
+        by_course: Dict[str, List[Dict[str, Any]]] = {}
+        for prof in professors:
+            for code in prof["courses"]:
+                by_course.setdefault(code, []).append(prof)
+
+        # everything is built first and then swapped in (reloads run in the background)
+        self._professors = professors
+        self._by_id = {p["id"]: p for p in professors}
+        self._by_course = by_course
+        self._courses_of = {p["id"]: p["courses"] for p in professors}
+        logger.info("Loaded %d professors across %d courses", len(professors), len(by_course))
+
+    def reload(self) -> None:
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._professors)
+
+    def get(self, prof_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(str(prof_id or "").strip())
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        """All professors, best ranked first."""
+        return list(self._professors)
+
+    def for_course(self, code: str) -> Optional[List[Dict[str, Any]]]:
+        """Professors teaching `code` best first, or None if no professor is linked to it."""
+        profs = self._by_course.get(_normalize_code(code))
+        return list(profs) if profs is not None else None
+
+    def courses_of(self, prof_id: str) -> List[str]:
+        return list(self._courses_of.get(str(prof_id or "").strip(), []))
+
+    def search(self, term: str, course: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Case-insensitive substring match on the professor name, best ranked first.
+
+        With `course`, only professors teaching that course are searched.
+        """
+        term = (term or "").strip().lower()
+        profs = self._by_course.get(_normalize_code(course), []) if course else self._professors
+        return [p for p in profs if term in (p.get("name") or "").lower()]
+
+
+def _round(value: float, ndigits: int = 2) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), ndigits)
@@ -0,0 +1,181 @@
+"""Opt-in, admin-only profiling of individual API requests.
+
+A request is profiled when it carries `X-Profile: 1` (or `?profile=1`) *and*
+an `X-Admin-Token` header matching the `ADMIN_TOKEN` environment variable.
+Profiling is disabled entirely when ADMIN_TOKEN is unset.
+
+Profiled requests run their endpoint under cProfile, so the report covers
+everything the endpoint calls (CourseDB, ChromaVectorStore, LiteLLM). The
+response gets an `X-Profile-Id` header; the report is written to a bounded
+on-disk ring (PROFILE_DIR, default ./profiles, keeping the newest
+PROFILE_MAX_REPORTS reports, default 50) as both a text summary (`.txt`) and
+raw pstats data (`.prof`, loadable with snakeviz / pstats).
+
+Endpoints opt in with the `@profiled` decorator (cProfile is per-thread, and
+sync endpoints run on a worker thread, so the profiler has to be enabled
+there rather than in the middleware).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import functools
+import hmac
+import io
+import logging
+import os
+import pstats
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+
+logger = logging.getLogger("api_server.profiling")
+
+# cProfile.Profile for the request being served, if it is being profiled
+active_profile: contextvars.ContextVar[Optional[cProfile.Profile]] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+
+_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$")
+
+
+def admin_token() -> str:
+    return os.getenv("ADMIN_TOKEN", "")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Constant-time check of `token` against ADMIN_TOKEN (False if unset)."""
+    expected = admin_token()
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+
+def profiled(fn):
+    """Run a sync endpoint under the request's profiler when one is active."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = active_profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+
+    return wrapper
+
+
+class ProfileStore:
+    """Bounded ring of profile reports on disk."""
+
+    def __init__(self, directory: Optional[Path | str] = None, max_reports: Optional[int] = None):
+        self.directory = Path(directory or os.getenv("PROFILE_DIR", "./profiles"))
+        self.max_reports = max_reports or int(os.getenv("PROFILE_MAX_REPORTS", "50"))
+
+    @staticmethod
+    def new_id() -> str:
+        now = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + "%06d" % int((now % 1) * 1e6)
+        return stamp + "-" + uuid.uuid4().hex[:8]
+
+    def save(self, profile_id: str, profile: cProfile.Profile, title: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(str(self.directory / f"{profile_id}.prof"))
+
+        buf = io.StringIO()
+        buf.write(f"{title}\n\n")
+        stats = pstats.Stats(profile, stream=buf)
+        stats.sort_stats("cumulative").print_stats(60)
+        txt_path = self.directory / f"{profile_id}.txt"
+        txt_path.write_text(buf.getvalue(), encoding="utf-8")
+
+        self._trim()
+        return txt_path
+
+    def _trim(self) -> None:
+        ids = self.list_ids()
+        for old in ids[: max(0, len(ids) - self.max_reports)]:
+            for suffix in (".txt", ".prof"):
+                try:
+                    (self.directory / f"{old}{suffix}").unlink()
+                except FileNotFoundError:
+                    pass
+
+    def list_ids(self) -> List[str]:
+        """Report ids, oldest first (ids start with a UTC timestamp)."""
+        if not self.directory.exists():
+            return []
+        return sorted(p.stem for p in self.directory.glob("*.txt") if _ID_RE.match(p.stem))
+
+    def read(self, profile_id: str) -> Optional[str]:
+        if not _ID_RE.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.txt"
+        if not path.exists():
+            return None
+        return path.read_text(encoding="utf-8")
+
+
+def _wants_profile(scope) -> bool:
+    headers = dict(scope.get("headers") or [])
+    if headers.get(b"x-profile", b"").strip() in (b"1", b"true"):
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[-1] in ("1", "true")
+
+
+def _admin_header(scope) -> Optional[str]:
+    value = dict(scope.get("headers") or []).get(b"x-admin-token")
+    return value.decode("latin-1") if value is not None else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that arms cProfile for admin requests asking for it."""
+
+    def __init__(self, app, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.store = store or ProfileStore()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope) or not is_admin(_admin_header(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        import anyio
+        import anyio.to_thread
+
+        profile = cProfile.Profile()
+        profile_id = self.store.new_id()
+        token = active_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode("ascii"))
+                ]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            active_profile.reset(token)
+            elapsed = time.perf_counter() - started
+            title = f"{scope.get('method')} {scope.get('path')} - {elapsed * 1000:.1f} ms wall"
+            try:
+                # pstats formatting and the file write take a while; keep them
+                # off the event loop, and finish them even if the request was cancelled
+                with anyio.CancelScope(shield=True):
+                    await anyio.to_thread.run_sync(self.store.save, profile_id, profile, title)
+                logger.info("Saved profile %s for %s", profile_id, title)
+            except Exception:
+                logger.exception("Failed to save profile %s", profile_id)
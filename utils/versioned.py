@@ -0,0 +1,98 @@
+"""Publish directories that running processes keep reading, atomically.
+
+A published path (./chroma_db, utils/index, utils/data) is a symlink to a
+versioned sibling directory:
+
+    chroma_db -> .chroma_db-20261019T101500-3f2a9c1d
+
+A new version is written into a fresh sibling (new_version) and published by
+replacing the link with one rename() (publish). A reader therefore sees either
+the old tree or the new one, never a missing or half-written directory.
+
+Readers that keep files open (sqlite, mmaps) should resolve the link once
+(current) and read everything from that directory. They can compare current()
+later to notice a new version and reopen. publish() keeps the `keep` most
+recent previous versions, so in-flight readers of the last one are not pulled
+out from under them.
+
+A plain directory left at the path by an older build is moved into a version
+the first time something is published there. That one-time rename is the only
+moment the path is briefly missing.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+
+KEEP_PREVIOUS = 1
+
+
+def _prefix(path: Path) -> str:
+    return f".{path.name}-v"
+
+
+def current(path: Path | str) -> Path:
+    """The directory `path` points at right now (or `path` itself if it is not a link)."""
+    path = Path(path)
+    if path.is_symlink():
+        return path.parent / os.readlink(path)
+    return path
+
+
+def new_version(path: Path | str) -> Path:
+    """Create and return an empty version directory next to `path`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    version = Path(tempfile.mkdtemp(prefix=f"{_prefix(path)}{stamp}-", dir=path.parent))
+    # mkdtemp makes it 0700; the server may run as another user than the build
+    version.chmod(0o755)
+    return version
+
+
+def versions(path: Path | str) -> List[Path]:
+    """Version directories of `path`, oldest first."""
+    path = Path(path)
+    if not path.parent.exists():
+        return []
+    found = []
+    for p in path.parent.iterdir():
+        if p.name.startswith(_prefix(path)) and p.is_dir() and not p.is_symlink():
+            try:
+                found.append((p.stat().st_mtime_ns, p.name, p))
+            except FileNotFoundError:  # pruned concurrently
+                continue
+    return [p for _, _, p in sorted(found)]
+
+
+def publish(version: Path | str, path: Path | str, keep: int = KEEP_PREVIOUS) -> None:
+    """Point `path` at `version` atomically, then prune all but `keep` older versions."""
+    version, path = Path(version), Path(path)
+    if path.exists() and not path.is_symlink():
+        # directory from before versioning: adopt it as a version
+        legacy = new_version(path)
+        legacy.rmdir()
+        os.replace(path, legacy)
+    link = path.with_name(f".{path.name}-link-{uuid.uuid4().hex[:8]}")
+    os.symlink(version.name, link, target_is_directory=True)
+    try:
+        os.replace(link, path)
+    except BaseException:
+        link.unlink(missing_ok=True)
+        raise
+    prune(path, keep)
+
+
+def prune(path: Path | str, keep: int = KEEP_PREVIOUS) -> None:
+    """Remove versions of `path` other than the current one and the `keep` newest others."""
+    live = current(path).resolve()
+    older = [v for v in versions(path) if v.resolve() != live]
+    for stale in older[:max(0, len(older) - keep)]:
+        shutil.rmtree(stale, ignore_errors=True)